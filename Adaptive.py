@@ -0,0 +1,242 @@
+import math
+import random
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from GameTools import REPEAT_METHODS, Tools, Tournament, _init_worker, _strategy_class
+
+# The outcome of an adaptive run, with strategies in the order of the tournament.
+#   scores: float64 array of the estimated overall score of each strategy, standard_errors their standard errors.
+#   order: the strategy indices sorted by highest estimated score.
+#   confidences: the probability that each neighbouring pair in order is ranked the right way round.
+#   samples: int64 array of shape (N, N), the number of times the match of row against column was played.
+#   turns_played: the turns simulated. turns_saved: the turns a fixed number of repetitions would have added, giving
+#       every match as many samples as the most sampled one.
+#   rounds: the number of batches played. converged: True if every pair reached the target confidence.
+AdaptiveResult = namedtuple('AdaptiveResult', ['names', 'scores', 'standard_errors', 'order', 'confidences',
+                                               'samples', 'turns_played', 'turns_saved', 'rounds', 'converged',
+                                               'elapsed'])
+
+
+class AdaptiveRepetition:
+    """
+    Repeats the matches of a noisy tournament until its ranking is settled, instead of replaying the whole tournament
+    a fixed number of times. Each match is sampled on its own. After every batch, the difference between the
+    estimated overall scores of each pair of strategies next to each other on the leaderboard is compared with its
+    standard error, which is summed from the sample variances of the matches it is made of. Only the matches that
+    feed a pair still short of the target confidence are played again. Sample k of match m is seeded like match m of
+    repetition k in Tournament.repeat.
+    :param tournament: the Tournament whose strategies and settings are used. Each match is played between fresh
+        objects, as by run_tournament.
+    :param method: 'round_robin' or 'tournament', the matches making up the overall scores. Unlike a serial
+        round_robin, no object is reused from one match to the next.
+    :param confidence: the probability of being ranked the right way round that every neighbouring pair must reach
+    :param initial: the number of samples every match starts with. Matches that cannot vary, between deterministic
+        strategies without noise, are played once.
+    :param batch: the number of samples added to each match that is played again
+    :param max_samples: the most samples any one match is given
+    :param time_budget: wall time in seconds after which no more batches are started, or None
+    """
+
+    def __init__(self, tournament, method='round_robin', confidence=0.95, initial=5, batch=5, max_samples=1000,
+                 time_budget=None, workers=None):
+        if method not in REPEAT_METHODS:
+            raise ValueError(f"Unknown method {method!r}, expected one of {REPEAT_METHODS}")
+        if initial < 2:
+            raise ValueError("At least two initial samples are needed to estimate a variance")
+        self.tournament = tournament
+        self.names = tournament.strategy_names
+        self.confidence = confidence
+        self.initial = initial
+        self.batch = batch
+        self.max_samples = max_samples
+        self.time_budget = time_budget
+        self.workers = tournament.workers if workers is None else workers
+        self.seed = random.getrandbits(128) if tournament.seed is None else tournament.seed
+
+        size = len(self.names)
+        if method == 'round_robin':
+            self.matches = [(i, j) for i in range(size) for j in range(i, size)]
+        else:
+            self.matches = [(i, j) for i in range(size) for j in range(size)]
+        first = np.array([i for i, _ in self.matches])
+        second = np.array([j for _, j in self.matches])
+        # Which side of each match counts towards each strategy's score. Self-play is credited with player 1's only.
+        self.player1_credit = (first == np.arange(size)[:, np.newaxis]).astype(np.float64)
+        self.player2_credit = ((second == np.arange(size)[:, np.newaxis]) & (first != second)).astype(np.float64)
+        classes = tournament.strategy_classes
+        self.fixed = np.array([tournament.fixed(classes[i], classes[j]) for i, j in self.matches])
+
+        # Running sums of each match's samples: count, both scores, their squares and their product.
+        self.counts = np.zeros(len(self.matches), dtype=np.int64)
+        self.sums = np.zeros((len(self.matches), 2))
+        self.squares = np.zeros((len(self.matches), 2))
+        self.products = np.zeros(len(self.matches))
+
+    def add(self, match, player1_score, player2_score):
+        self.counts[match] += 1
+        self.sums[match] += (player1_score, player2_score)
+        self.squares[match] += (player1_score ** 2, player2_score ** 2)
+        self.products[match] += player1_score * player2_score
+
+    def moments(self):
+        """
+        :return: float64 arrays of the mean and the sample variance of both players' scores in each match, shape
+            (M, 2), and of the sample covariance between them, shape (M,). Variances are zero for matches played once.
+        """
+        counts = np.maximum(self.counts, 1)
+        spread = np.where(self.counts > 1, counts - 1, np.inf)
+        means = self.sums / counts[:, np.newaxis]
+        variances = np.maximum(self.squares - counts[:, np.newaxis] * means ** 2, 0.0) / spread[:, np.newaxis]
+        covariances = (self.products - counts * means[:, 0] * means[:, 1]) / spread
+        return means, variances, covariances
+
+    def estimates(self):
+        """The estimated overall score of each strategy, float64 array of shape (N,)."""
+        means, _, _ = self.moments()
+        return self.player1_credit @ means[:, 0] + self.player2_credit @ means[:, 1]
+
+    def match_variances(self, upper, lower):
+        """
+        Each match's share of the variance of the estimated difference between the overall scores of strategies
+        upper[p] and lower[p].
+        :return: float64 array of shape (len(upper), M)
+        """
+        _, variances, covariances = self.moments()
+        # The difference takes alpha * player 1's score plus beta * player 2's from each match, so its variance is a
+        # sum over the matches of the variance of that combination over the samples.
+        alpha = self.player1_credit[upper] - self.player1_credit[lower]
+        beta = self.player2_credit[upper] - self.player2_credit[lower]
+        return (alpha ** 2 * variances[:, 0] + beta ** 2 * variances[:, 1]
+                + 2 * alpha * beta * covariances) / np.maximum(self.counts, 1)
+
+    def standard_errors(self):
+        """The standard error of each strategy's estimated overall score. No match credits both sides to one."""
+        _, variances, _ = self.moments()
+        counts = np.maximum(self.counts, 1)
+        return np.sqrt(self.player1_credit @ (variances[:, 0] / counts)
+                       + self.player2_credit @ (variances[:, 1] / counts))
+
+    def pair_confidences(self, scores, order):
+        """
+        The probability that each neighbouring pair in order is ranked the right way round, by a normal test.
+        :return: float64 array of the len(order) - 1 confidences, float64 array of shape (len(order) - 1, M) of the
+            share of each match in the variance of each pair
+        """
+        upper, lower = order[:-1], order[1:]
+        match_variances = self.match_variances(upper, lower)
+        differences = scores[upper] - scores[lower]
+        deviations = np.sqrt(match_variances.sum(axis=1))
+        confidences = np.ones(len(upper))
+        unsure = deviations > 0
+        confidences[unsure] = [0.5 * math.erfc(-z / math.sqrt(2))
+                               for z in (differences[unsure] / deviations[unsure]).tolist()]
+        return confidences, match_variances
+
+    def run(self):
+        """
+        Plays batches until every neighbouring pair on the leaderboard is ranked with the target confidence, the
+        time budget runs out or no unsettled pair has a match left below max_samples.
+        :return: AdaptiveResult
+        """
+        start_time = time.perf_counter()
+        tournament = self.tournament
+        settings = dict(num_games_per_match=tournament.num_games_per_match, noise=tournament.noise,
+                        engine=tournament.engine, payoff_matrix=tournament.payoff_matrix)
+        classes = tournament.strategy_classes
+        wanted = np.where(self.fixed, 1, self.initial)
+        executor = None
+        if self.workers is not None and self.workers > 1:
+            executor = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker)
+            classes = [(strategy_class.__module__, strategy_class.__qualname__) for strategy_class in classes]
+        rounds = 0
+        converged = False
+        try:
+            while True:
+                units = [(sample, m, classes[self.matches[m][0]], classes[self.matches[m][1]])
+                         for m in np.flatnonzero(wanted > self.counts).tolist()
+                         for sample in range(self.counts[m], wanted[m])]
+                self.play(units, settings, executor)
+                rounds += 1
+
+                scores = self.estimates()
+                order = np.argsort(-scores, kind='stable')
+                confidences, match_variances = self.pair_confidences(scores, order)
+                unsettled = confidences < self.confidence
+                if not unsettled.any():
+                    converged = True
+                    break
+                if self.time_budget is not None and time.perf_counter() - start_time >= self.time_budget:
+                    break
+                # Every match that adds to the variance of an unsettled pair is played again.
+                feeding = (match_variances[unsettled] > 0).any(axis=0)
+                feeding &= self.counts < self.max_samples
+                if not feeding.any():
+                    break
+                wanted = np.where(feeding, np.minimum(self.counts + self.batch, self.max_samples), self.counts)
+        finally:
+            if executor is not None:
+                executor.shutdown()
+
+        num_games = tournament.num_games_per_match
+        turns_played = int(self.counts.sum()) * num_games
+        turns_fixed = len(self.matches) * int(self.counts.max()) * num_games
+        size = len(self.names)
+        samples = np.zeros((size, size), dtype=np.int64)
+        for (i, j), count in zip(self.matches, self.counts.tolist()):
+            samples[i, j] = count
+        return AdaptiveResult(self.names, scores, self.standard_errors(), order, confidences, samples, turns_played,
+                              turns_fixed - turns_played, rounds, converged, time.perf_counter() - start_time)
+
+    def play(self, units, settings, executor):
+        """Plays (sample, match, class 1, class 2) units, in this process or sharded across the executor."""
+        if executor is None:
+            results = _play_samples(settings, self.seed, units)
+        else:
+            shard_count = min(len(units), 4 * self.workers)
+            shards = [units[k::shard_count] for k in range(shard_count)]
+            results = [result for shard_results in executor.map(_play_samples, [settings] * shard_count,
+                                                                 [self.seed] * shard_count, shards)
+                       for result in shard_results]
+        for match, player1_score, player2_score in results:
+            self.add(match, player1_score, player2_score)
+
+    @staticmethod
+    def summary(result):
+        """
+        :return: str of the estimated overall scores sorted by highest, in the style of the tournament leaderboard,
+            with the confidence that each strategy is ranked above the next
+        """
+        lines = ['*' * 44, " Estimated scores, sorted by highest ranking:", '*' * 44,
+                 f"Rounds: {result.rounds}, {'converged' if result.converged else 'stopped'}, turns played: "
+                 f"{result.turns_played}, saved: {result.turns_saved}, time: {result.elapsed:.2f}s", '']
+        for place, i in enumerate(result.order.tolist()):
+            above = f"  ({result.confidences[place]:.1%} above next)" if place < len(result.confidences) else ''
+            lines.append(f"{result.names[i]:>20}: {result.scores[i]:>10.1f} +/- {result.standard_errors[i]:.1f}"
+                         f"{above}")
+        lines.append('*' * 44)
+        return '\n'.join(lines)
+
+
+def _play_samples(settings, seed, units):
+    """
+    Plays samples of matches, in this process or a worker. Sample k of match m is played with the seed of match m in
+    repetition k of Tournament.repeat.
+    :param units: list of tuples of int (sample), int (match index), and both strategy classes, or their (module,
+        name) in a worker
+    :return: list of tuples of int (match index), int (strategy 1 score), int (strategy 2 score)
+    """
+    by_sample = dict()
+    for sample, match, class1, class2 in units:
+        pair = tuple(strategy_class if isinstance(strategy_class, type) else _strategy_class(*strategy_class)
+                     for strategy_class in (class1, class2))
+        by_sample.setdefault(sample, dict())[match] = pair
+    results = list()
+    for sample, pairs in by_sample.items():
+        tournament = Tournament([], verbose=False, seed=Tools.child_seed(seed, sample), **settings)
+        played = tournament.play_serial(pairs, list(pairs))
+        results.extend((match, played[match][0], played[match][1]) for match in pairs)
+    return results
@@ -0,0 +1,365 @@
+import time
+from collections import namedtuple
+
+import numpy as np
+
+from GameTools import Tools
+
+PROCESSES = ('moran', 'wright-fisher')
+
+# The outcome of a batch of replicate populations.
+#   fixation_probabilities: fraction of replicates in which each strategy took over the whole population.
+#   mean_fixation_generations: mean number of generations that took, NaN for strategies that never fixed.
+#   unfixed: number of replicates in which no strategy had taken over by the end.
+#   final_counts: int64 array of shape (replicates, N), the population of every replicate at the end.
+#   generations: number of generations run. elapsed: wall time in seconds.
+FixationResult = namedtuple('FixationResult', ['names', 'fixation_probabilities', 'mean_fixation_generations',
+                                               'unfixed', 'final_counts', 'generations', 'elapsed'])
+
+
+class MoranProcess:
+    """
+    Evolves finite populations of strategies using a pairwise payoff matrix, such as Tournament.payoffs, instead of
+    replaying matches. An individual's payoff is its mean payoff against everyone else in the population, and its
+    fitness is 1 - w + w * payoff for selection intensity w.
+    In the Moran process one individual is chosen to reproduce in proportion to fitness and one to die uniformly at
+    random each step, and population_size steps make a generation. In the Wright-Fisher process the whole population
+    is replaced each generation by a multinomial draw. With the mutation rate, an offspring becomes a strategy picked
+    uniformly at random.
+    Many replicate populations are evolved at once as rows of a (replicates, N) count array.
+    """
+
+    def __init__(self, payoffs, population_size, mutation_rate=0.0, selection_intensity=1.0, process='moran',
+                 names=None, seed=None):
+        if process not in PROCESSES:
+            raise ValueError(f"Unknown process {process!r}, expected one of {PROCESSES}")
+        self.payoffs = np.asarray(payoffs, dtype=np.float64)
+        if self.payoffs.ndim != 2 or self.payoffs.shape[0] != self.payoffs.shape[1]:
+            raise ValueError(f"Expected a square payoff matrix, got shape {self.payoffs.shape}")
+        if np.isnan(self.payoffs).any():
+            raise ValueError("The payoff matrix has missing pairs")
+        if population_size < 2:
+            raise ValueError("The population needs at least two individuals")
+        self.population_size = population_size
+        self.mutation_rate = mutation_rate
+        self.selection_intensity = selection_intensity
+        self.process = process
+        self.names = list(range(len(self.payoffs))) if names is None else list(names)
+        self.rng = Tools.numpy_rng(None if seed is None else np.random.SeedSequence(seed))
+
+    @classmethod
+    def from_tournament(cls, tournament, population_size, **kwargs):
+        """A process over the strategies of a tournament that has been played, using its payoffs per turn."""
+        return cls(tournament.payoffs, population_size, names=tournament.strategy_names, **kwargs)
+
+    def position(self, strategy):
+        """The index of a strategy given by name or index."""
+        return strategy if isinstance(strategy, (int, np.integer)) else self.names.index(strategy)
+
+    def fitness(self, counts, totals):
+        """
+        :param counts: int64 array of shape (replicates, N)
+        :param totals: payoff of each strategy summed over the whole population, counts @ payoffs.T
+        :return: float64 array of shape (replicates, N)
+        """
+        # Individuals do not play themselves.
+        payoffs = (totals - np.diagonal(self.payoffs)) / (self.population_size - 1)
+        return np.maximum(1 - self.selection_intensity + self.selection_intensity * payoffs, 0)
+
+    def initial_counts(self, initial, replicates):
+        if initial is None:
+            # As even a split as the population size allows.
+            size = len(self.payoffs)
+            initial = np.full(size, self.population_size // size)
+            initial[:self.population_size % size] += 1
+        counts = np.array(np.broadcast_to(initial, (replicates, len(self.payoffs))), dtype=np.int64)
+        if (counts.sum(axis=1) != self.population_size).any():
+            raise ValueError(f"Initial populations must add up to {self.population_size}")
+        return counts
+
+    def run(self, initial=None, replicates=1000, max_generations=10000):
+        """
+        Evolves the replicate populations until every one has fixed or max_generations have passed. Without mutation
+        a fixed population stays fixed, so it stops evolving. With mutation, fixation records the first time a
+        strategy took over, and every population runs for max_generations.
+        :param initial: counts of each strategy, shape (N,) to start every replicate the same or (replicates, N).
+            Defaults to an even split.
+        :return: FixationResult
+        """
+        start_time = time.perf_counter()
+        if initial is not None and np.ndim(initial) == 2:
+            replicates = len(initial)
+        counts = self.initial_counts(initial, replicates)
+        fixed_on = np.full(replicates, -1)
+        fixed_at = np.zeros(replicates)
+        self.check_fixation(counts, fixed_on, fixed_at, 0)
+
+        step = self.moran_generation if self.process == 'moran' else self.wright_fisher_generation
+        generation = 0
+        while generation < max_generations:
+            active = np.flatnonzero(fixed_on < 0) if self.mutation_rate == 0 else np.arange(replicates)
+            if not len(active):
+                break
+            counts[active] = step(counts[active])
+            generation += 1
+            self.check_fixation(counts, fixed_on, fixed_at, generation)
+
+        size = len(self.payoffs)
+        fixations = np.bincount(fixed_on[fixed_on >= 0], minlength=size)
+        times = np.bincount(fixed_on[fixed_on >= 0], weights=fixed_at[fixed_on >= 0], minlength=size)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean_times = times / fixations
+        return FixationResult(self.names, fixations / replicates, mean_times, int((fixed_on < 0).sum()), counts,
+                              generation, time.perf_counter() - start_time)
+
+    def check_fixation(self, counts, fixed_on, fixed_at, generation):
+        newly_fixed = np.flatnonzero((fixed_on < 0) & (counts.max(axis=1) == self.population_size))
+        fixed_on[newly_fixed] = counts[newly_fixed].argmax(axis=1)
+        fixed_at[newly_fixed] = generation
+
+    def moran_generation(self, counts):
+        """population_size birth-death steps for every replicate."""
+        rows = np.arange(len(counts))
+        size = len(self.payoffs)
+        # Payoff of each strategy against the whole population, updated as individuals are born and die.
+        totals = counts @ self.payoffs.T
+        for _ in range(self.population_size):
+            weights = counts * self.fitness(counts, totals)
+            cumulative = np.cumsum(weights, axis=1)
+            # Where every fitness is zero, reproduction is uniform.
+            stalled = cumulative[:, -1] <= 0
+            if stalled.any():
+                cumulative[stalled] = np.cumsum(counts[stalled], axis=1)
+            births = (cumulative < self.rng.random(len(counts))[:, None] * cumulative[:, -1:]).sum(axis=1)
+            if self.mutation_rate:
+                mutants = self.rng.random(len(counts)) < self.mutation_rate
+                births[mutants] = self.rng.integers(0, size, mutants.sum())
+            deaths = (np.cumsum(counts, axis=1) <= self.rng.integers(0, self.population_size, len(counts))[:, None]
+                      ).sum(axis=1)
+            counts[rows, births] += 1
+            counts[rows, deaths] -= 1
+            totals += self.payoffs.T[births] - self.payoffs.T[deaths]
+        return counts
+
+    def wright_fisher_generation(self, counts):
+        """The next generation of every replicate, drawn at once."""
+        weights = counts * self.fitness(counts, counts @ self.payoffs.T)
+        totals = weights.sum(axis=1, keepdims=True)
+        # Where every fitness is zero, reproduction is uniform.
+        weights = np.where(totals > 0, weights, counts)
+        probabilities = weights / weights.sum(axis=1, keepdims=True)
+        if self.mutation_rate:
+            probabilities = (1 - self.mutation_rate) * probabilities + self.mutation_rate / len(self.payoffs)
+        return self.rng.multinomial(self.population_size, probabilities)
+
+    def fixation_probability(self, mutant, resident, replicates=1000, max_generations=10000):
+        """
+        Simulates a single mutant invading a population of residents.
+        :return: float (fraction of replicates in which the mutant took over), FixationResult
+        """
+        mutant, resident = self.position(mutant), self.position(resident)
+        initial = np.zeros(len(self.payoffs), dtype=np.int64)
+        initial[resident] = self.population_size - 1
+        initial[mutant] = 1
+        result = self.run(initial, replicates, max_generations)
+        return result.fixation_probabilities[mutant], result
+
+    def exact_fixation_probability(self, mutant, resident):
+        """
+        The fixation probability of a single mutant among residents in the Moran process without mutation, from the
+        standard birth-death formula 1 / (1 + sum over k of the product over j <= k of g_j / f_j), where f_j and g_j
+        are the fitness of mutants and residents when there are j mutants.
+        """
+        mutant, resident = self.position(mutant), self.position(resident)
+        a = self.payoffs
+        size = self.population_size
+        j = np.arange(1, size)
+        w = self.selection_intensity
+        mutant_fitness = 1 - w + w * (a[mutant, mutant] * (j - 1) + a[mutant, resident] * (size - j)) / (size - 1)
+        resident_fitness = 1 - w + w * (a[resident, mutant] * j + a[resident, resident] * (size - j - 1)) / (size - 1)
+        return 1 / (1 + np.cumprod(resident_fitness / mutant_fitness).sum())
+
+    @staticmethod
+    def summary(result):
+        """
+        :return: str of the fixation probabilities sorted by highest, in the style of the tournament leaderboard
+        """
+        lines = ['*' * 44, " Fixation probabilities, sorted by highest:", '*' * 44,
+                 f"Generations: {result.generations}, unfixed: {result.unfixed}, time: {result.elapsed:.2f}s", '']
+        order = np.argsort(-result.fixation_probabilities, kind='stable')
+        for i in order.tolist():
+            lines.append(f"{result.names[i]:>20}: {result.fixation_probabilities[i]:.4f}"
+                         f"  ({result.mean_fixation_generations[i]:.1f} generations)")
+        lines.append('*' * 44)
+        return '\n'.join(lines)
+
+
+REPLICATOR_METHODS = ('continuous', 'discrete')
+
+# The outcome of a batch of replicator dynamics runs, one row per initial condition.
+#   shares: float64 array of shape (runs, N), the population shares at the end.
+#   times: time (continuous) or generations (discrete) at which each run stopped.
+#   converged: bool array, True where a run came to rest before max_time.
+#   steps: number of steps each run took, rejected steps not included. elapsed: wall time in seconds.
+ReplicatorResult = namedtuple('ReplicatorResult', ['names', 'shares', 'times', 'converged', 'steps', 'elapsed'])
+
+
+class ReplicatorDynamics:
+    """
+    Deterministic population dynamics over a pairwise payoff matrix, such as Tournament.payoffs: the shares of the
+    strategies in an infinite population, as in Axelrod's ecological tournament.
+    The continuous method integrates dx_i/dt = x_i * ((A x)_i - x . A x) with an embedded Runge-Kutta 3(2) pair, and
+    every run adapts its own step size to keep the local error in the shares below tolerance. The discrete method is
+    Axelrod's generation by generation update x_i <- x_i * (A x)_i / (x . A x), which needs positive payoffs.
+    Many initial conditions are integrated at once as the rows of a 2-D array, and each run stops once the shares
+    change by less than convergence per unit of time (or per generation).
+    """
+
+    def __init__(self, payoffs, names=None, method='continuous', tolerance=1e-5, convergence=1e-6, seed=None):
+        if method not in REPLICATOR_METHODS:
+            raise ValueError(f"Unknown method {method!r}, expected one of {REPLICATOR_METHODS}")
+        self.payoffs = np.asarray(payoffs, dtype=np.float64)
+        if self.payoffs.ndim != 2 or self.payoffs.shape[0] != self.payoffs.shape[1]:
+            raise ValueError(f"Expected a square payoff matrix, got shape {self.payoffs.shape}")
+        if np.isnan(self.payoffs).any():
+            raise ValueError("The payoff matrix has missing pairs")
+        if method == 'discrete' and (self.payoffs <= 0).any():
+            raise ValueError("The discrete method needs positive payoffs")
+        self.names = list(range(len(self.payoffs))) if names is None else list(names)
+        self.method = method
+        self.tolerance = tolerance
+        self.convergence = convergence
+        self.rng = Tools.numpy_rng(None if seed is None else np.random.SeedSequence(seed))
+
+    @classmethod
+    def from_tournament(cls, tournament, **kwargs):
+        """Dynamics over the strategies of a tournament that has been played, using its payoffs per turn."""
+        return cls(tournament.payoffs, names=tournament.strategy_names, **kwargs)
+
+    def initial_shares(self, initial):
+        size = len(self.payoffs)
+        shares = np.full((1, size), 1 / size) if initial is None else np.atleast_2d(np.asarray(initial, np.float64))
+        if shares.shape[1] != size or (shares < 0).any():
+            raise ValueError(f"Initial shares must be non-negative with {size} columns")
+        return shares / shares.sum(axis=1, keepdims=True)
+
+    def run(self, initial=None, max_time=10000):
+        """
+        :param initial: shares of each strategy, shape (N,) or (runs, N). Rows are normalised to sum to 1.
+            Defaults to equal shares.
+        :param max_time: the time (continuous) or number of generations (discrete) after which to stop
+        :return: ReplicatorResult
+        """
+        start_time = time.perf_counter()
+        shares = self.initial_shares(initial)
+        if self.method == 'discrete':
+            times, converged, steps = self.iterate(shares, max_time)
+        else:
+            times, converged, steps = self.integrate(shares, max_time)
+        return ReplicatorResult(self.names, shares, times, converged, steps, time.perf_counter() - start_time)
+
+    def iterate(self, shares, max_generations):
+        runs = len(shares)
+        times = np.zeros(runs)
+        converged = np.zeros(runs, dtype=bool)
+        active = np.arange(runs)
+        generation = 0
+        while len(active) and generation < max_generations:
+            current = shares[active]
+            fitness = current @ self.payoffs.T
+            updated = current * fitness / (current * fitness).sum(axis=1, keepdims=True)
+            shares[active] = updated
+            generation += 1
+            times[active] = generation
+            settled = np.abs(updated - current).max(axis=1) < self.convergence
+            converged[active[settled]] = True
+            active = active[~settled]
+        return times, converged, times.astype(np.int64)
+
+    def growth_rates(self, logs):
+        """
+        The replicator equation in log shares, d(log x_i)/dt = (A x)_i - x . A x.
+        :return: float64 array of growth rates, the shares they were computed from
+        """
+        shares = np.exp(logs - logs.max(axis=1, keepdims=True))
+        shares /= shares.sum(axis=1, keepdims=True)
+        fitness = shares @ self.payoffs.T
+        return fitness - (shares * fitness).sum(axis=1, keepdims=True), shares
+
+    def integrate(self, shares, max_time):
+        """
+        Integrates the log shares rather than the shares. Strategies on their way to extinction then decay linearly
+        instead of exponentially, so they do not hold the step size down, and shares can never go negative. The step
+        error is measured on the shares.
+        """
+        runs = len(shares)
+        times = np.zeros(runs)
+        converged = np.zeros(runs, dtype=bool)
+        steps = np.zeros(runs, dtype=np.int64)
+        # Working copies of the runs still going, compacted whenever some of them stop. Extinct strategies have a log
+        # share of -inf and stay extinct.
+        active = np.arange(runs)
+        with np.errstate(divide='ignore'):
+            u = np.log(shares)
+        k1, x = self.growth_rates(u)
+        t = np.zeros(runs)
+        n = np.zeros(runs, dtype=np.int64)
+        step_sizes = np.full(runs, 0.1)
+        while len(active):
+            h = np.minimum(step_sizes, max_time - t)
+            column = h[:, None]
+            # Bogacki-Shampine: a third order step with a second order estimate of its error.
+            k2, _ = self.growth_rates(u + column * k1 / 2)
+            k3, _ = self.growth_rates(u + column * 3 * k2 / 4)
+            u_new = u + column * (2 * k1 + 3 * k2 + 4 * k3) / 9
+            k4, x_new = self.growth_rates(u_new)
+            error = (np.maximum(x, x_new) * np.abs(column * (-5 * k1 / 72 + k2 / 12 + k3 / 9 - k4 / 8))).max(axis=1)
+
+            accepted = error <= self.tolerance
+            u = np.where(accepted[:, None], u_new, u)
+            k1 = np.where(accepted[:, None], k4, k1)
+            x = np.where(accepted[:, None], x_new, x)
+            t += np.where(accepted, h, 0)
+            n += accepted
+            with np.errstate(divide='ignore'):
+                scale = 0.9 * (self.tolerance / error) ** (1 / 3)
+            step_sizes = h * np.clip(np.nan_to_num(scale, posinf=5.0), 0.2, 5.0)
+
+            at_rest = np.abs(x * k1).max(axis=1) < self.convergence
+            settled = accepted & (at_rest | (t >= max_time))
+            if settled.any():
+                rows = active[settled]
+                shares[rows], times[rows], steps[rows], converged[rows] = x[settled], t[settled], n[settled], \
+                    at_rest[settled]
+                going = ~settled
+                active, u, k1, x, t, n, step_sizes = active[going], u[going], k1[going], x[going], t[going], \
+                    n[going], step_sizes[going]
+        return times, converged, steps
+
+    def sample_initial(self, samples):
+        """Initial conditions drawn uniformly from the simplex."""
+        return self.rng.dirichlet(np.ones(len(self.payoffs)), size=samples)
+
+    def basins(self, samples=1000, max_time=10000, threshold=0.5):
+        """
+        Estimates the basins of attraction from initial conditions drawn uniformly from the simplex.
+        :param threshold: the share a strategy needs at the end for the run to count towards its basin
+        :return: float64 array of the fraction of runs ending dominated by each strategy, ReplicatorResult
+        """
+        result = self.run(self.sample_initial(samples), max_time)
+        winners = result.shares.argmax(axis=1)[result.shares.max(axis=1) >= threshold]
+        return np.bincount(winners, minlength=len(self.payoffs)) / samples, result
+
+    @staticmethod
+    def summary(result, run=0):
+        """
+        :return: str of the final shares of one run sorted by highest, in the style of the tournament leaderboard
+        """
+        status = 'converged' if result.converged[run] else 'stopped'
+        lines = ['*' * 44, " Population shares, sorted by highest:", '*' * 44,
+                 f"{status.capitalize()} at {result.times[run]:.1f} after {result.steps[run]} steps, "
+                 f"time: {result.elapsed:.2f}s", '']
+        for i in np.argsort(-result.shares[run], kind='stable').tolist():
+            lines.append(f"{result.names[i]:>20}: {result.shares[run, i]:.4f}")
+        lines.append('*' * 44)
+        return '\n'.join(lines)
@@ -1,30 +1,234 @@
+import importlib
+import json
+import math
 import random
 import statistics
+import sys
+import time
+from array import array
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from enum import IntEnum
+from itertools import accumulate
 import numpy as np
-from scipy.stats import chi2_contingency
 
 C = "Cooperate"
 D = "Defect"
 
 
+class Action(IntEnum):
+    """
+    Compact action type used by the engines, the payoff tables and the strategies' internal state.
+    The C and D labels remain the public face of a choice, so Action.label converts back to them.
+    """
+    COOPERATE = 0
+    DEFECT = 1
+
+    @property
+    def label(self):
+        return LABELS[self]
+
+    @property
+    def flipped(self):
+        return Action(1 - self)
+
+
+COOPERATE = Action.COOPERATE
+DEFECT = Action.DEFECT
+# Accepts either the C and D labels or the integer codes and returns the Action.
+ACTIONS = {C: COOPERATE, D: DEFECT, COOPERATE: COOPERATE, DEFECT: DEFECT}
+LABELS = (C, D)
+FLIPPED = {C: D, D: C, COOPERATE: DEFECT, DEFECT: COOPERATE}
+
+# Payoff types indexed by 2 * player action + opponent action.
+PAYOFF_TYPES = ('R', 'S', 'T', 'P')
+
+
+# noinspection PyPep8Naming
+class PayoffMatrix:
+    """
+    The payoffs for the four outcomes of a game, built once and held as a flat tuple indexed by
+    2 * player action + opponent action, i.e. (R, S, T, P).
+        R (Reward): both players cooperate.
+        S (Sucker's Payoff): the player cooperates, but the opponent defects.
+        T (Temptation): the player defects, and the opponent cooperates.
+        P (Punishment): both players defect.
+    A Prisoner's Dilemma requires T > R > P > S. Pass validate=False, or use one of the alternative game
+    constructors, to play a different 2x2 game on the same engines.
+    """
+
+    def __init__(self, R=3, S=0, T=5, P=1, validate=True):
+        if validate and not T > R > P > S:
+            raise ValueError(f"A Prisoner's Dilemma needs T > R > P > S, got R={R}, S={S}, T={T}, P={P}")
+        self.R = R
+        self.S = S
+        self.T = T
+        self.P = P
+        self.payoffs = (R, S, T, P)
+
+    @classmethod
+    def snowdrift(cls, R=3, S=1, T=5, P=0):
+        """Snowdrift (chicken): T > R > S > P, so cooperating against a defector beats mutual defection."""
+        if not T > R > S > P:
+            raise ValueError(f"Snowdrift needs T > R > S > P, got R={R}, S={S}, T={T}, P={P}")
+        return cls(R, S, T, P, validate=False)
+
+    @classmethod
+    def stag_hunt(cls, R=5, S=0, T=3, P=1):
+        """Stag hunt: R > T > P > S, so mutual cooperation is the best outcome but carries the most risk."""
+        if not R > T > P > S:
+            raise ValueError(f"Stag hunt needs R > T > P > S, got R={R}, S={S}, T={T}, P={P}")
+        return cls(R, S, T, P, validate=False)
+
+    def payoff(self, player_action, opponent_action):
+        return self.payoffs[2 * player_action + opponent_action]
+
+    def as_array(self):
+        """The payoffs as a 2x2 NumPy array indexed by [player action, opponent action]."""
+        return np.array(self.payoffs, dtype=np.int64 if all(isinstance(value, int) for value in self.payoffs)
+                        else np.float64).reshape(2, 2)
+
+    def __eq__(self, other):
+        return isinstance(other, PayoffMatrix) and self.payoffs == other.payoffs
+
+    def __hash__(self):
+        return hash(self.payoffs)
+
+    def __repr__(self):
+        return f"PayoffMatrix(R={self.R}, S={self.S}, T={self.T}, P={self.P})"
+
+
+PRISONERS_DILEMMA = PayoffMatrix()
+
+# 'auto' plays each pair on the fastest engine that gives the same results as 'python', see Tournament.batch_runner.
+ENGINES = ('python', 'array', 'auto')
+
+# The chance of a move being flipped when noise is set to True.
+DEFAULT_NOISE_RATE = 0.01
+
+
+class NoiseModel:
+    """
+    Decides which moves of a match are flipped. The flips of a whole match are sampled up front, in one vectorized
+    draw per player, so the engines draw no random numbers inside the turn loop.
+    :param rate: the chance of a move being flipped, or a (player 1, player 2) pair of rates.
+    :param perception: with action noise (the default) a flipped move is the one that is played and scored. With
+        perception noise each player misreads the opponent's move: the flip only appears in the history of the player
+        who misread it, and the scores are unaffected. A player's rate applies to the moves that player plays, or to
+        the opponent moves it sees.
+    """
+
+    def __init__(self, rate=DEFAULT_NOISE_RATE, perception=False):
+        rates = tuple(rate) if isinstance(rate, (tuple, list)) else (rate, rate)
+        if len(rates) != 2 or not all(0 <= value <= 1 for value in rates):
+            raise ValueError(f"Expected a rate or a pair of rates between 0 and 1, got {rate!r}")
+        self.rate = rates if rates[0] != rates[1] else rates[0]
+        self.rates = rates
+        self.perception = perception
+
+    def flips(self, num_games, rate, rng):
+        """
+        :return: bool array of num_games flips for one player, drawn from the numpy Generator rng
+        """
+        raise NotImplementedError("Subclasses must implement the flips method")
+
+    def sample(self, num_games, rng):
+        """
+        :return: int8 array of shape (num_games, 2) holding the flips of player 1 and player 2 for each turn
+        """
+        return np.stack([self.flips(num_games, rate, rng) for rate in self.rates], axis=1).astype(np.int8)
+
+    def __eq__(self, other):
+        return type(self) is type(other) and vars(self) == vars(other)
+
+    def __hash__(self):
+        return hash((type(self), *vars(self).values()))
+
+    def __repr__(self):
+        params = ', '.join(f"{name}={value!r}" for name, value in vars(self).items() if name != 'rates')
+        return f"{type(self).__name__}({params})"
+
+
+class BernoulliNoise(NoiseModel):
+    """Every move is flipped independently with the given chance."""
+
+    def flips(self, num_games, rate, rng):
+        return rng.random(num_games) < rate
+
+
+class GeometricNoise(NoiseModel):
+    """
+    The same distribution as BernoulliNoise, sampled by drawing the gaps between flips from a geometric distribution.
+    Only about rate * num_games numbers are drawn, which is much cheaper for very low rates and long matches.
+    """
+
+    def flips(self, num_games, rate, rng):
+        mask = np.zeros(num_games, dtype=bool)
+        if rate <= 0:
+            return mask
+        expected = num_games * rate
+        last = -1
+        while last < num_games:
+            # Enough gaps to usually cover the match in one draw, topped up if they fall short.
+            positions = last + np.cumsum(rng.geometric(rate, size=int(expected + 4 * expected ** 0.5) + 8))
+            mask[positions[positions < num_games]] = True
+            last = positions[-1]
+        return mask
+
+
+class BurstyNoise(NoiseModel):
+    """
+    Flips come in bursts of consecutive moves, e.g. a bad connection. Burst lengths are geometric with a mean of
+    burst_length, and bursts start often enough that about the given rate of moves is flipped in the long run.
+    """
+
+    def __init__(self, rate=DEFAULT_NOISE_RATE, burst_length=4, perception=False):
+        if burst_length < 1:
+            raise ValueError(f"burst_length must be at least 1, got {burst_length!r}")
+        super().__init__(rate, perception)
+        self.burst_length = burst_length
+
+    def flips(self, num_games, rate, rng):
+        mask = np.zeros(num_games, dtype=bool)
+        if rate <= 0:
+            return mask
+        # Bursts average burst_length flips and the quiet spells between them average burst_length * (1 - rate) / rate
+        # turns, so that the given rate of moves is flipped in the long run.
+        start_rate = rate / (rate + self.burst_length * (1 - rate))
+        count = int(num_games * start_rate) + 8
+        edges = np.zeros(num_games + 1, dtype=np.int64)
+        last = -1
+        while last < num_games:
+            gaps = rng.geometric(start_rate, size=count)
+            lengths = rng.geometric(1 / self.burst_length, size=count)
+            # Each burst starts a gap after the last flip of the previous one.
+            starts = last + np.cumsum(gaps) + np.cumsum(lengths - 1) - (lengths - 1)
+            ends = np.minimum(starts + lengths, num_games)
+            inside = starts < num_games
+            np.add.at(edges, starts[inside], 1)
+            np.add.at(edges, ends[inside], -1)
+            last = starts[-1] + lengths[-1] - 1
+        mask[np.cumsum(edges[:-1]) > 0] = True
+        return mask
+
+
+# scipy.stats.chi2_contingency once Tools.chi_squared_test has imported it, or False if scipy is not installed.
+_chi2_contingency = None
+
+
 class Tools:
 
     @staticmethod
-    def calculate_payoff(player_action, opponent_action):
+    def calculate_payoff(player_action, opponent_action, payoff_matrix=PRISONERS_DILEMMA):
         """
         Scoring matrix.
-        :param player_action:
-        :param opponent_action:
+        :param player_action: C, D or an Action code
+        :param opponent_action: C, D or an Action code
+        :param payoff_matrix: PayoffMatrix, the standard Prisoner's Dilemma by default
         :return int():
         """
-        score_matrix = {
-            ("Cooperate", "Cooperate"): 3,
-            ("Cooperate", "Defect"): 0,
-            ("Defect", "Cooperate"): 5,
-            ("Defect", "Defect"): 1
-        }
         # Retrieve the payoff for the given actions
-        return score_matrix.get((player_action, opponent_action))
+        return payoff_matrix.payoffs[2 * ACTIONS[player_action] + ACTIONS[opponent_action]]
 
     @staticmethod
     def get_payoff_type(player_action, opponent_action):
@@ -33,31 +237,25 @@ class Tools:
         S (Sucker's Payoff): The payoff received when the player cooperates, but the opponent defects.
         T (Temptation): The payoff received when the player defects, and the opponent cooperates.
         P (Punishment): The payoff received when both players defect.
-        :param player_action:
-        :param opponent_action:
+        :param player_action: C, D or an Action code
+        :param opponent_action: C, D or an Action code
         :return str():
         """
-        payoff_matrix = {
-            ("Cooperate", "Cooperate"): 'R',
-            ("Cooperate", "Defect"): 'S',
-            ("Defect", "Cooperate"): 'T',
-            ("Defect", "Defect"): 'P'
-        }
-        # Retrieve the payoff for the given actions
-        return payoff_matrix.get((player_action, opponent_action))
+        # Retrieve the payoff type for the given actions
+        return PAYOFF_TYPES[2 * ACTIONS[player_action] + ACTIONS[opponent_action]]
 
     @staticmethod
-    def random_5050_sample(sample_size, cooperation_probability):
+    def random_5050_sample(sample_size, cooperation_probability, rng=random):
         choices = ["Cooperate", "Defect"]
         probabilities = [cooperation_probability, 1 - cooperation_probability]
-        random_sample = random.choices(choices, probabilities, k=sample_size)
+        random_sample = rng.choices(choices, probabilities, k=sample_size)
         return random_sample
 
     @staticmethod
     def compare_samples(sample1, sample2):
-        # Convert "Cooperate" to 1 and "Defect" to 0 for easier calculations
-        sample1_numeric = np.array([1 if choice == "Cooperate" else 0 for choice in sample1])
-        sample2_numeric = np.array([1 if choice == "Cooperate" else 0 for choice in sample2])
+        # Convert Cooperate to 1 and Defect to 0 for easier calculations
+        sample1_numeric = np.array([1 - ACTIONS[choice] for choice in sample1])
+        sample2_numeric = np.array([1 - ACTIONS[choice] for choice in sample2])
 
         # Calculate proportions
         proportion1 = np.mean(sample1_numeric)
@@ -76,11 +274,54 @@ class Tools:
         obj2.history_data(own_choice=obj2_choice, opponent_choice=obj1_choice)
 
     @staticmethod
-    def generate_choice_noise(choice, chance=100):
-        # 1% chance the choice will be flipped. This will only be invoked if noise is set to True.
-        if random.randint(1, chance) == 1:
-            return C if choice == D else D
-        return choice
+    def generate_choice_noise(choice, rate=DEFAULT_NOISE_RATE, rng=random):
+        # Flips the choice with the given chance, the default noise rate unless told otherwise.
+        return GameRunner.generate_choice_noise(choice, rate, rng)
+
+    @staticmethod
+    def noise_model(noise):
+        """
+        The NoiseModel for a noise setting: False or None for no noise, True for the default 1% chance of each move
+        being flipped, a rate, or a NoiseModel.
+        :return: NoiseModel or None
+        """
+        if noise is None or noise is False:
+            return None
+        if noise is True:
+            return BernoulliNoise(DEFAULT_NOISE_RATE)
+        if isinstance(noise, NoiseModel):
+            return noise
+        return BernoulliNoise(noise)
+
+    @staticmethod
+    def numpy_rng(seed_sequence=None):
+        """
+        A numpy Generator for the seed sequence. Without one, the Generator is seeded from the global random module,
+        so random.seed() still makes unseeded runs repeatable.
+        """
+        if seed_sequence is None:
+            return np.random.default_rng(random.getrandbits(128))
+        return np.random.default_rng(seed_sequence)
+
+    @staticmethod
+    def child_seed(seed, *spawn_key):
+        """
+        The descendant of a seed with the given spawn key. For an int seed this is the same as spawning children of
+        SeedSequence(seed) one level at a time, without having to spawn the ones before them. A SeedSequence seed is
+        itself a child, such as a repetition's, so its descendants extend its own spawn key.
+        :return: SeedSequence
+        """
+        if isinstance(seed, np.random.SeedSequence):
+            return np.random.SeedSequence(seed.entropy, spawn_key=seed.spawn_key + spawn_key, pool_size=seed.pool_size)
+        return np.random.SeedSequence(seed, spawn_key=spawn_key)
+
+    @staticmethod
+    def seeded_random(seed_sequence):
+        """
+        A random.Random seeded from a numpy SeedSequence. It has the same interface as the random module, so it can
+        stand in for the global generator wherever a strategy or engine takes an rng.
+        """
+        return random.Random(int.from_bytes(seed_sequence.generate_state(4).tobytes(), 'little'))
 
     @staticmethod
     def object_spawner(strategy_classes):
@@ -111,11 +352,52 @@ class Tools:
         expected = np.array([expected_frequency, expected_frequency])
 
         # Perform the Chi-squared test
-        chi2_stat, p_value, _, _ = chi2_contingency([observed, expected])
+        chi2_stat, p_value = Tools.chi_squared_test([observed, expected])
 
         # Output the result of the test
         return False if p_value < 0.05 else True
 
+    @staticmethod
+    def chi_squared_test(table):
+        """
+        The chi-squared test of independence on a 2 x 2 contingency table, with Yates' correction. Uses
+        scipy.stats.chi2_contingency, imported the first time a test is run as it is slow to import, and
+        Tools.chi_squared_2x2 when scipy is not installed.
+        :return: (statistic, p-value)
+        """
+        global _chi2_contingency
+        if _chi2_contingency is None:
+            try:
+                from scipy.stats import chi2_contingency
+            except ImportError:
+                chi2_contingency = False
+            _chi2_contingency = chi2_contingency
+        if _chi2_contingency is False:
+            return Tools.chi_squared_2x2(table)
+        statistic, p_value, _, _ = _chi2_contingency(table)
+        return statistic, p_value
+
+    @staticmethod
+    def chi_squared_2x2(table):
+        """
+        scipy.stats.chi2_contingency on a 2 x 2 table in pure Python. Each cell is moved half a count towards its
+        expected value before it is squared, and the p-value is the upper tail of the chi-squared distribution with one
+        degree of freedom, erfc(sqrt(x / 2)).
+        :param table: 2 x 2 nested sequence of counts
+        :return: (statistic, p-value)
+        """
+        (a, b), (c, d) = [[float(count) for count in row] for row in table]
+        total = a + b + c + d
+        rows, columns = (a + b, c + d), (a + c, b + d)
+        if 0 in rows or 0 in columns:
+            raise ValueError("The table has a zero row or column, so its expected counts are undefined")
+        statistic = 0.0
+        for i, row in enumerate(((a, b), (c, d))):
+            for j, observed in enumerate(row):
+                expected = rows[i] * columns[j] / total
+                statistic += max(0.0, abs(observed - expected) - 0.5) ** 2 / expected
+        return statistic, math.erfc(math.sqrt(statistic / 2))
+
     @staticmethod
     def is_alternating_pattern(data):
         # Check if the list is empty or has only one element
@@ -133,6 +415,368 @@ class Tools:
         return True
 
 
+class StreamingTest:
+    """
+    A statistical test on a sequence of moves that keeps running counts, so each new move costs O(1). sync() brings
+    the counts up to date with a history side, and starts again if the side has been replaced or cleared.
+    """
+
+    def __init__(self):
+        self.side = None
+        self.reset()
+
+    def reset(self):
+        self.count = 0
+        self.cooperations = 0
+
+    def update(self, action):
+        self.count += 1
+        self.cooperations += ACTIONS[action] == COOPERATE
+
+    def sync(self, side):
+        """
+        Counts the moves of a HistorySide that have not been seen yet.
+        :return: self
+        """
+        if side is not self.side or len(side) < self.count:
+            self.side = side
+            self.reset()
+        for action in side.actions()[self.count:]:
+            self.update(action)
+        return self
+
+    @property
+    def defections(self):
+        return self.count - self.cooperations
+
+
+class ProportionTest(StreamingTest):
+    """
+    The z-test of Tools.compare_samples, in which the moves are compared with a random sample of the same length
+    drawn with the expected chance of cooperating. Here the sample's proportion is replaced by its expectation, with
+    the same two-sample standard error, so the test draws no random numbers and gives the answer the random sample
+    gives on average.
+    :param expected: the expected chance of cooperating
+    :param threshold: the number of standard errors the proportions must differ by
+    """
+
+    def __init__(self, expected, threshold=3.0):
+        self.expected = expected
+        self.threshold = threshold
+        super().__init__()
+
+    def z_score(self):
+        if not self.count:
+            return 0.0
+        proportion = self.cooperations / self.count
+        error = math.sqrt((self.expected * (1 - self.expected) + proportion * (1 - proportion)) / self.count)
+        return (self.expected - proportion) / error if error else 0.0
+
+    def differs(self):
+        return abs(self.z_score()) > self.threshold
+
+
+class RandomnessTest(StreamingTest):
+    """
+    Tools.is_alternating_pattern and Tools.check_randomness from running counts of cooperations and of moves that
+    repeat the one before. check_randomness runs chi2_contingency on the 2 x 2 table of the observed counts against
+    an even split, and p_value passes the same table to Tools.chi_squared_2x2. The answers are the same, without
+    rescanning the history.
+    :param significance: p-values below this reject randomness
+    """
+
+    def __init__(self, significance=0.05):
+        self.significance = significance
+        super().__init__()
+
+    def reset(self):
+        super().reset()
+        self.repeats = 0
+        self.last = None
+
+    def update(self, action):
+        action = ACTIONS[action]
+        self.repeats += action == self.last
+        self.last = action
+        super().update(action)
+
+    @property
+    def alternating(self):
+        """Whether every move differs from the one before, as Tools.is_alternating_pattern."""
+        return self.count >= 2 and not self.repeats
+
+    def p_value(self):
+        """The p-value of the chi-squared test in Tools.check_randomness."""
+        if not self.count:
+            return 1.0
+        half = self.count / 2
+        return Tools.chi_squared_2x2([[self.cooperations, self.defections], [half, half]])[1]
+
+    def looks_random(self):
+        """The answer of Tools.check_randomness."""
+        return not self.alternating and self.p_value() >= self.significance
+
+
+class HistorySide:
+    """
+    One player's moves in a match, held as Action codes in a preallocated bytearray. A running prefix sum of
+    defections is kept alongside so that counts, the mode and last-k window counts are O(1) however long the match.
+    Reads return the C and D labels, so a side behaves like the list of choices it replaces.
+    """
+
+    def __init__(self, capacity=0):
+        self._moves = bytearray(capacity)
+        # _defections[i] is the number of defections in the first i moves.
+        self._defections = array('q', [0]) * (capacity + 1)
+        self._length = 0
+        self.first_defection = None
+
+    def _reserve(self, length):
+        capacity = len(self._moves)
+        if length > capacity:
+            extra = max(length, 2 * capacity, 16) - capacity
+            self._moves.extend(bytes(extra))
+            self._defections.extend(array('q', [0]) * extra)
+
+    def append(self, action):
+        length = self._length
+        if length == len(self._moves):
+            self._reserve(length + 1)
+        self._moves[length] = action
+        self._defections[length + 1] = self._defections[length] + action
+        if action and self.first_defection is None:
+            self.first_defection = length
+        self._length = length + 1
+
+    def extend(self, actions):
+        """Appends a run of Action codes, e.g. bytes, a list of ints or an int8 NumPy array."""
+        actions = bytes(actions)
+        start = self._length
+        stop = start + len(actions)
+        self._reserve(stop)
+        self._moves[start:stop] = actions
+        if len(actions) > 4096:
+            # Long runs, such as skipped cycles, are summed in NumPy.
+            running = np.cumsum(np.frombuffer(actions, dtype=np.int8), dtype=np.int64) + self._defections[start]
+            self._defections[start + 1:stop + 1] = array('q', running.tobytes())
+        else:
+            self._defections[start:stop + 1] = array('q', accumulate(actions, initial=self._defections[start]))
+        if self.first_defection is None and DEFECT in actions:
+            self.first_defection = start + actions.index(DEFECT)
+        self._length = stop
+
+    def clear(self):
+        self._length = 0
+        self.first_defection = None
+
+    def actions(self):
+        """The moves played so far as a zero-copy memoryview of Action codes."""
+        return memoryview(self._moves)[:self._length]
+
+    @property
+    def defections(self):
+        return self._defections[self._length]
+
+    @property
+    def cooperations(self):
+        return self._length - self._defections[self._length]
+
+    def count(self, choice):
+        action = ACTIONS.get(choice)
+        if action is None:
+            return 0
+        return self.defections if action else self.cooperations
+
+    def window_count(self, k, choice=D):
+        """How many of the last k moves (or all of them, if fewer than k have been played) were the given choice."""
+        k = min(k, self._length)
+        defections = self._defections[self._length] - self._defections[self._length - k]
+        return defections if ACTIONS[choice] else k - defections
+
+    def mode(self):
+        """The most common choice. A tie goes to the first move, as statistics.mode would have it."""
+        if not self._length:
+            raise statistics.StatisticsError("no mode for empty data")
+        defections = self.defections
+        cooperations = self._length - defections
+        if defections == cooperations:
+            return LABELS[self._moves[0]]
+        return D if defections > cooperations else C
+
+    def __len__(self):
+        return self._length
+
+    def __contains__(self, choice):
+        return self.count(choice) > 0
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            moves = self._moves
+            return [LABELS[moves[i]] for i in range(self._length)[index]]
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError("history index out of range")
+        return LABELS[self._moves[index]]
+
+    def __iter__(self):
+        return (LABELS[move] for move in self.actions())
+
+    def __eq__(self, other):
+        if isinstance(other, (HistorySide, list, tuple)):
+            return list(self) == list(other)
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"HistorySide({list(self)!r})"
+
+
+class HistoryView:
+    """
+    A strategy's perspective on a MatchHistory. history['own'] and history['opp'] return the strategy's own side
+    and its opponent's side, and assigning a list of choices to either key replaces that side.
+    A shared view is one of the two views of a match the players shared. Once the match is over, it is copied with
+    private() before anything is added to it, so the other player's history is left alone.
+    """
+
+    def __init__(self, own, opp, shared=False):
+        self.own = own
+        self.opp = opp
+        self.shared = shared
+
+    @property
+    def empty(self):
+        return not len(self.own) and not len(self.opp)
+
+    def __getitem__(self, key):
+        if key == 'own':
+            return self.own
+        if key == 'opp':
+            return self.opp
+        raise KeyError(key)
+
+    def __setitem__(self, key, choices):
+        side = self[key]
+        side.clear()
+        side.extend(ACTIONS[choice] for choice in choices)
+
+    def private(self):
+        """A copy of the view, backed by a MatchHistory of its own."""
+        history = MatchHistory(max(len(self.own), len(self.opp)))
+        history.sides[0].extend(self.own.actions())
+        history.sides[1].extend(self.opp.actions())
+        return history.view(0)
+
+    def __eq__(self, other):
+        if isinstance(other, (HistoryView, dict)):
+            return self.own == other['own'] and self.opp == other['opp']
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"{{'own': {list(self.own)!r}, 'opp': {list(self.opp)!r}}}"
+
+
+class MatchHistory:
+    """
+    The moves of both players in a match, stored once and shared by both strategies through their views,
+    rather than each strategy keeping a copy of both sides.
+    """
+
+    def __init__(self, capacity=0):
+        self.sides = (HistorySide(capacity), HistorySide(capacity))
+
+    def view(self, player, shared=False):
+        """The history as seen by player 0 or player 1. Pass shared=True for views handed to both players."""
+        return HistoryView(self.sides[player], self.sides[1 - player], shared)
+
+    def record(self, player1_action, player2_action):
+        self.sides[0].append(player1_action)
+        self.sides[1].append(player2_action)
+
+
+# The outcome of a single match, as passed to reporters and yielded by the tournament generators. The cooperation
+# counts are the number of turns each player cooperated, or None when they are not known.
+MatchResult = namedtuple('MatchResult', ['player1', 'player1_score', 'player2', 'player2_score', 'num_games',
+                                         'player1_cooperations', 'player2_cooperations'], defaults=(None, None))
+
+
+class Reporter:
+    """
+    Receives each MatchResult as it is produced. report() is called once per match, flush() at the end of every
+    tournament run, and leaderboard() when the caller wants the overall scores presented. The lines a subclass makes
+    in format_result and format_leaderboard are buffered and written buffer_size at a time. This base class makes no
+    lines, so it doubles as the silent reporter.
+    :param stream: file to write to. Defaults to whatever sys.stdout is at the time of writing.
+    """
+
+    def __init__(self, stream=None, buffer_size=1000):
+        self.stream = stream
+        self.buffer_size = buffer_size
+        self.lines = list()
+
+    def format_result(self, result):
+        """The lines to write for one MatchResult."""
+        return ()
+
+    def format_leaderboard(self, scores, num_games):
+        """The lines to write for the overall scores."""
+        return ()
+
+    def report(self, result):
+        self.lines.extend(self.format_result(result))
+        if len(self.lines) >= self.buffer_size:
+            self.flush()
+
+    def flush(self):
+        if self.lines:
+            stream = sys.stdout if self.stream is None else self.stream
+            stream.write(''.join(self.lines))
+            self.lines.clear()
+
+    def leaderboard(self, scores, num_games):
+        self.lines.extend(self.format_leaderboard(scores, num_games))
+        self.flush()
+
+
+class SilentReporter(Reporter):
+    """Discards every result."""
+
+
+class TextReporter(Reporter):
+    """
+    Writes one line per match, in the same format GameRunner has always printed, and the overall scores sorted by
+    highest ranking.
+    """
+
+    def format_result(self, result):
+        return [f"{result.player1:>20} vs {result.player2:<20} {result.player1_score:>20} : {result.player2_score} \n"]
+
+    def format_leaderboard(self, scores, num_games):
+        lines = ['\n', '*' * 44 + '\n', " Overall Scores, sorted by highest ranking:\n", '*' * 44 + '\n',
+                 f"Number of games: {num_games}\n\n"]
+        for strategy, score in sorted(scores.items(), key=lambda x: x[1], reverse=True):
+            lines.append(f"{strategy:>20}: {score}\n")
+        lines.append('*' * 44 + '\n')
+        return lines
+
+
+class JsonLinesReporter(Reporter):
+    """
+    Writes one JSON object per line: {"type": "match", ...MatchResult fields} for each match and
+    {"type": "leaderboard", "num_games": ..., "scores": {...}} for the overall scores.
+    """
+
+    def format_result(self, result):
+        return [json.dumps({'type': 'match', **result._asdict()}) + '\n']
+
+    def format_leaderboard(self, scores, num_games):
+        return [json.dumps({'type': 'leaderboard', 'num_games': num_games, 'scores': scores}) + '\n']
+
+
 class GameRunner:
     """Runs two strategies against each other for a set number of games. Presents the scores at the end in text.
     Returns the two strategy names and their respective scores.
@@ -140,60 +784,394 @@ class GameRunner:
         A score of 3-3 is awarded to Cooperate - Cooperate outcome.
         A score of 5-0 is awarded to a Defect - Cooperate outcome in favour of the Defective party.
         A score of 1-1 is awarded to a Defect - Defect outcome.
+    Each result is passed to the reporter as a MatchResult. Without one, results are printed as they come, or
+    discarded if verbose is False.
+    noise is False, True (a 1% chance of each move being flipped), a rate or a NoiseModel.
+    Without a seed, noise and the stochastic strategies draw from the global random module. With a seed (an int or a
+    numpy SeedSequence), each game spawns independent streams for the noise and for each player, so a seeded game can
+    be replayed exactly.
     :returns: str (name of strategy 1), int (strategy 1 score), str (name of strategy 2), int (strategy 2 score)
     """
 
-    def __init__(self, num_games, noise):
+    # Give up looking for a repeated state after this many turns.
+    cycle_search = 1000
+
+    def __init__(self, num_games, noise, engine='python', payoff_matrix=PRISONERS_DILEMMA, fast_forward=True,
+                 verbose=True, seed=None, reporter=None):
+        if engine not in ENGINES:
+            raise ValueError(f"Unknown engine {engine!r}, expected one of {ENGINES}")
         self.num_games = num_games
-        self.noise = noise
+        self.noise = Tools.noise_model(noise)
+        self.engine = engine
+        self.payoff_matrix = payoff_matrix
+        self.fast_forward = fast_forward
+        self.verbose = verbose
+        if reporter is None:
+            reporter = TextReporter(buffer_size=1) if verbose else SilentReporter()
+        self.reporter = reporter
+        if seed is not None and not isinstance(seed, np.random.SeedSequence):
+            seed = np.random.SeedSequence(seed)
+        self.seed = seed
+        # The numpy Generator noise is drawn from. Replaced with a seeded one for each game when there is a seed.
+        self.rng = None
 
     def run_game(self, player1, player2):
+        # Strategies that score themselves look their payoffs up from the same matrix.
+        player1.payoff_matrix = player2.payoff_matrix = self.payoff_matrix
+        # Objects that have played before keep their history, so count this game's cooperations from here.
+        cooperations_before = player1.history['own'].cooperations, player2.history['own'].cooperations
+        noise_seed = None
+        if self.seed is not None:
+            noise_seed, player1_seed, player2_seed = self.seed.spawn(3)
+            self.rng = Tools.numpy_rng(noise_seed)
+            player2.rng = Tools.seeded_random(player2_seed)
+            player1.rng = Tools.seeded_random(player1_seed)
+        if self.engine != 'python' and ArrayRunner.supports(player1, player2):
+            # Both strategies have an array kernel, so the match can be played on NumPy arrays.
+            array_runner = ArrayRunner(self.num_games, self.noise, self.payoff_matrix, noise_seed)
+            player1_score, player2_score = array_runner.run_players(player1, player2)
+        else:
+            player1_score, player2_score = self.play_turns(player1, player2)
+
+        cooperations = None, None
+        if player1 is not player2:
+            # An object playing itself records both sides in one history, so its counts cannot be told apart.
+            cooperations = (player1.history['own'].cooperations - cooperations_before[0],
+                            player2.history['own'].cooperations - cooperations_before[1])
+        self.reporter.report(MatchResult(player1.name, player1_score, player2.name, player2_score, self.num_games,
+                                         *cooperations))
+        return player1, player1_score, player2, player2_score
+
+    def play_turns(self, player1, player2):
+        """
+        The reference engine. Steps through the match one turn at a time using the strategy objects.
+        Without noise, two fresh strategies that both declare a finite state are deterministic, so once their joint
+        state repeats the match has entered a cycle. Whole cycles are then skipped by copying the cycle's moves and
+        adding its payoff for each repetition, and the remaining turns are played as normal.
+        """
         player1_score = 0
         player2_score = 0
+        payoffs = self.payoff_matrix.payoffs
+
+        flips = None
+        perception = False
+        if self.noise is not None:
+            # The flips of the whole match are drawn up front. With perception noise, player 1's flips apply to the
+            # moves of player 2 that it sees, and vice versa.
+            rng = self.rng if self.rng is not None else Tools.numpy_rng()
+            flips = self.noise.sample(self.num_games, rng).tolist()
+            perception = self.noise.perception
+
+        record = player1_record = player2_record = None
+        if player1 is not player2 and player1.history.empty and player2.history.empty:
+            if perception:
+                # Each player sees its own version of the opponent's moves, so they cannot share a history.
+                player1_history, player2_history = MatchHistory(self.num_games), MatchHistory(self.num_games)
+                player1.history = player1_history.view(0)
+                player2.history = player2_history.view(1)
+                player1_record, player2_record = player1_history.record, player2_history.record
+            else:
+                # Fresh players share a single history for the match, preallocated for its length.
+                match_history = MatchHistory(self.num_games)
+                player1.history = match_history.view(0, shared=True)
+                player2.history = match_history.view(1, shared=True)
+                record = match_history.record
+        else:
+            # A player that shared the history of an earlier match gets a copy of its own before adding to it.
+            for player in {id(player1): player1, id(player2): player2}.values():
+                if player.history.shared:
+                    player.history = player.history.private()
 
-        for _ in range(self.num_games):
+        states = None
+        if (self.fast_forward and not self.noise and record is not None
+                and hasattr(player1, 'state') and hasattr(player2, 'state')):
+            # Maps each joint state to the number of turns played when it was first seen.
+            states = dict()
+
+        turn = 0
+        while turn < self.num_games:
             # Strategies are instantiated with a choice already made.
-            p1_choice = player1.choice
-            p2_choice = player2.choice
+            p1_action = player1.action
+            p2_action = player2.action
 
-            if self.noise:
-                # If noise is set to True, this will introduce a 1% chance of the choice being flipped.
-                p1_choice = GameRunner.generate_choice_noise(p1_choice)
-                p2_choice = GameRunner.generate_choice_noise(p2_choice)
+            if flips is not None:
+                player1_flip, player2_flip = flips[turn]
+                if not perception:
+                    # A flipped move is the one that is played and scored.
+                    p1_action ^= player1_flip
+                    p2_action ^= player2_flip
 
             # Update the rolling score using the scoring matrix.
-            player1_score += Tools.calculate_payoff(p1_choice, p2_choice)
-            player2_score += Tools.calculate_payoff(p2_choice, p1_choice)
+            player1_score += payoffs[2 * p1_action + p2_action]
+            player2_score += payoffs[2 * p2_action + p1_action]
 
             # Update the historical data after the choices have been scored
-            player1.history_data(opponent_choice=p2_choice, own_choice=p1_choice)
-            player2.history_data(opponent_choice=p1_choice, own_choice=p2_choice)
+            if record is not None:
+                record(p1_action, p2_action)
+            elif perception:
+                # Each player records the opponent's move as it saw it.
+                seen_by_player1 = p2_action ^ player1_flip
+                seen_by_player2 = p1_action ^ player2_flip
+                if player1_record is not None:
+                    player1_record(p1_action, seen_by_player1)
+                    player2_record(seen_by_player2, p2_action)
+                else:
+                    player1.history_data(opponent_choice=seen_by_player1, own_choice=p1_action)
+                    player2.history_data(opponent_choice=seen_by_player2, own_choice=p2_action)
+            else:
+                player1.history_data(opponent_choice=p2_action, own_choice=p1_action)
+                player2.history_data(opponent_choice=p1_action, own_choice=p2_action)
 
             # Run the strategies to set the next decision
             player1.strategy()
             player2.strategy()
+            turn += 1
 
-        print(f"{player1.name:>20} vs {player2.name:<20} {player1_score:>20} : {player2_score} ")
-        return player1, player1_score, player2, player2_score
+            if states is not None:
+                start = states.setdefault((player1.state(), player2.state()), turn)
+                if start != turn or turn >= self.cycle_search:
+                    states = None
+                    period = turn - start
+                    repeats = (self.num_games - turn) // period if period else 0
+                    if repeats:
+                        player1_gain, player2_gain = self.skip_cycle(match_history, start, period, repeats)
+                        player1.skip(repeats * period)
+                        player2.skip(repeats * period)
+                        player1_score += player1_gain
+                        player2_score += player2_gain
+                        turn += repeats * period
+
+        return player1_score, player2_score
+
+    def skip_cycle(self, match_history, start, period, repeats):
+        """
+        Extends both sides of the history with the cycle of moves that began after `start` turns.
+        :return: int (player 1 score over the skipped turns), int (player 2 score over the skipped turns)
+        """
+        payoffs = self.payoff_matrix.payoffs
+        player1_moves, player2_moves = (bytes(side.actions()[start:start + period]) for side in match_history.sides)
+        player1_gain = player2_gain = 0
+        for p1_action, p2_action in zip(player1_moves, player2_moves):
+            player1_gain += payoffs[2 * p1_action + p2_action]
+            player2_gain += payoffs[2 * p2_action + p1_action]
+        match_history.sides[0].extend(player1_moves * repeats)
+        match_history.sides[1].extend(player2_moves * repeats)
+        return repeats * player1_gain, repeats * player2_gain
 
     @staticmethod
-    def generate_choice_noise(choice):
-        # 1% chance the choice will be flipped. This will only be invoked if noise is set to True.
-        if random.randint(1, 100) == 1:
-            return C if choice == D else D
+    def generate_choice_noise(choice, rate=DEFAULT_NOISE_RATE, rng=random):
+        # Flips a single choice with the given chance. The engines sample whole matches with a NoiseModel instead.
+        # Works on Action codes as well as the C and D labels.
+        if rng.random() < rate:
+            return FLIPPED[choice]
         return choice
 
 
+class ArrayRunner:
+    """Plays matches in lockstep on NumPy int8 action arrays instead of stepping through the strategy objects.
+    Only strategies that provide an array_kernel can be played this way. A kernel is a static method with the
+    signature array_kernel(own, opp, t, memory):
+        own, opp: int8 arrays of shape (num_games + 1, matches) holding the moves played so far (rows below t).
+        t: the number of turns already played, always >= 1.
+        memory: a dict private to the kernel group, for running counters that would otherwise need a rescan.
+    The kernel returns the next move (0 = Cooperate, 1 = Defect) for every match, as an array or a scalar.
+    Moves are stored after noise has been applied, which is what the strategies see in their history.
+    Scores are accumulated with array ops once every turn has been played.
+    The noise of each match is sampled up front by the NoiseModel. Given a seed, every match gets its own numpy
+    Generator, and its noise does not depend on which other matches share the batch.
+    """
+
+    def __init__(self, num_games, noise, payoff_matrix=PRISONERS_DILEMMA, seed=None):
+        self.num_games = num_games
+        self.noise = Tools.noise_model(noise)
+        self.payoff_matrix = payoff_matrix
+        if seed is not None and not isinstance(seed, np.random.SeedSequence):
+            seed = np.random.SeedSequence(seed)
+        self.seed = seed
+
+    @staticmethod
+    def supports(*strategies):
+        """True if every strategy (class or instance) provides an array kernel."""
+        return all(getattr(strategy, 'array_kernel', None) is not None for strategy in strategies)
+
+    def run_players(self, player1, player2):
+        """
+        Play a single match between two strategy objects and write the resulting history back onto them.
+        Objects that have already played carry state from their previous games, and an object playing itself shares
+        one history between both sides, so those are played with the reference engine instead.
+        :return: int (player 1 score), int (player 2 score)
+        """
+        if player1 is player2 or not player1.history.empty or not player2.history.empty:
+            game_runner = GameRunner(self.num_games, self.noise, payoff_matrix=self.payoff_matrix)
+            if self.seed is not None:
+                game_runner.rng = Tools.numpy_rng(self.seed)
+            return game_runner.play_turns(player1, player2)
+
+        first_moves = [player1.action, player2.action]
+        seeds = None if self.seed is None else [self.seed]
+        moves, scores = self.run_matches([(type(player1), type(player2))], first_moves, seeds)
+        match_history = MatchHistory(self.num_games)
+        for side, player in enumerate((player1, player2)):
+            match_history.sides[side].extend(moves[:-1, side])
+            player.history = match_history.view(side, shared=True)
+            player.choice = int(moves[-1, side])
+        return int(scores[0]), int(scores[1])
+
+    def run_matches(self, pairs, first_moves=None, seeds=None):
+        """
+        Play every (strategy_class, strategy_class) pair at once.
+        :param pairs: list of strategy class pairs, each of which must support the array engine.
+        :param first_moves: optional opening move codes, player 1 sides first and then player 2 sides.
+        :param seeds: optional SeedSequence for each pair, from which the noise of that match is drawn.
+        :return: int8 array of shape (num_games + 1, 2 * len(pairs)) holding the moves played and, in the last
+            row, the next move each strategy would make. Columns are player 1 sides followed by player 2 sides.
+            int64 array of the 2 * len(pairs) scores in the same column order.
+        """
+        num_pairs = len(pairs)
+        sides = [pair[0] for pair in pairs] + [pair[1] for pair in pairs]
+        if first_moves is None:
+            openings = {strategy_class: strategy_class().action for strategy_class in set(sides)}
+            first_moves = [openings[strategy_class] for strategy_class in sides]
+
+        # Sort the sides so that each kernel works on a contiguous block of columns.
+        groups = dict()
+        for column, strategy_class in enumerate(sides):
+            groups.setdefault(strategy_class, []).append(column)
+        order = np.array([column for columns in groups.values() for column in columns], dtype=np.intp)
+        position = np.empty_like(order)
+        position[order] = np.arange(len(order))
+        # Each player 1 column faces the player 2 column num_pairs along, and vice versa.
+        opponents = np.concatenate([np.arange(num_pairs, 2 * num_pairs), np.arange(num_pairs)])
+        partner = position[opponents[order]]
+
+        own = np.zeros((self.num_games + 1, 2 * num_pairs), dtype=np.int8)
+        opp = np.zeros_like(own)
+        kernels = list()
+        start = 0
+        for strategy_class, columns in groups.items():
+            stop = start + len(columns)
+            kernels.append((strategy_class.array_kernel, own[:, start:stop], opp[:, start:stop], start, stop, {}))
+            start = stop
+
+        flips = None
+        perception = False
+        if self.noise is not None:
+            # Sample the flips of each match up front, from its own generator if it has a seed.
+            flips = np.empty((self.num_games, 2 * num_pairs), dtype=np.int8)
+            rng = Tools.numpy_rng() if seeds is None else None
+            for k in range(num_pairs):
+                match_rng = rng if seeds is None else Tools.numpy_rng(seeds[k])
+                flips[:, [k, k + num_pairs]] = self.noise.sample(self.num_games, match_rng)
+            flips = flips[:, order]
+            perception = self.noise.perception
+
+        choice = np.asarray(first_moves, dtype=np.int8)[order]
+        for t in range(self.num_games):
+            played = choice
+            if flips is not None and not perception:
+                # A flipped move is the one that is played and scored.
+                played = choice ^ flips[t]
+            own[t] = played
+            opp[t] = played[partner]
+            if perception:
+                # Each side misreads the opponent's move on its own flips.
+                opp[t] ^= flips[t]
+            choice = np.empty_like(played)
+            for kernel, own_view, opp_view, start, stop, memory in kernels:
+                choice[start:stop] = kernel(own_view, opp_view, t + 1, memory)
+        own[self.num_games] = choice
+
+        # Scored against the moves the opponent actually played, which perception noise may hide from opp.
+        scores = self.payoff_matrix.as_array()[own[:-1], own[:-1, partner]].sum(axis=0)
+        return own[:, position], scores[position]
+
+    @staticmethod
+    def running_mode(opp, t, memory):
+        """
+        The mode of each opponent history, kept up to date from running defection counts. Ties go to the opponent's
+        first move, matching statistics.mode. Must be called once per turn.
+        """
+        defections = memory.setdefault('defections', np.zeros(opp.shape[1], dtype=np.int64))
+        defections += opp[t - 1]
+        return np.where(2 * defections == t, opp[0], 2 * defections > t).astype(np.int8)
+
+
+class StrategyPool:
+    """
+    Hands out strategy objects, reusing the ones given back instead of constructing new ones for every match. An
+    object is reset() as it is handed out again, so it starts each match as if it were fresh. Each process has its own
+    pool, which the tournaments played in it share.
+    """
+
+    def __init__(self):
+        self.free = dict()
+
+    def acquire(self, strategy_class):
+        """A strategy object of the class, ready to play a match."""
+        free = self.free.get(strategy_class)
+        if free:
+            player = free.pop()
+            player.reset()
+            return player
+        return strategy_class()
+
+    def release(self, *players):
+        """Gives objects back once their match is over. Their moves stay readable until they are handed out again."""
+        for player in players:
+            self.free.setdefault(type(player), []).append(player)
+
+    def clear(self):
+        self.free.clear()
+
+
+# The strategy objects of the tournaments played in this process.
+_strategy_pool = StrategyPool()
+
+
 class Tournament:
     """Utilising the GameRunner class, runs a tournament of X amount of games, where the strategies are played
-    against each other in a round-robin type of tournament. Scores are then printed to the screen.
-    Noise can be introduced by setting the noise parameter to True."""
+    against each other in a round-robin type of tournament. Each result is passed to the reporter, which prints them
+    to the screen by default. iter_tournament and iter_round_robin yield the results as they are produced.
+    Noise can be introduced by setting the noise parameter to True, a rate or a NoiseModel.
+    Given a seed, match i is played with the i-th child of SeedSequence(seed), so a seeded tournament gives the same
+    results whether it is run serially, in a process pool or in shards on several machines."""
 
-    def __init__(self, strategy_classes, num_games_per_match=200, noise=False):
+    def __init__(self, strategy_classes, num_games_per_match=200, noise=False, engine='python', payoff_matrix=None,
+                 cache=None, workers=None, verbose=True, seed=None, reporter=None, interaction_log=None):
+        if engine not in ENGINES:
+            raise ValueError(f"Unknown engine {engine!r}, expected one of {ENGINES}")
         self.strategy_classes = strategy_classes
         self.num_games_per_match = num_games_per_match
         self.scores = {strategy_class.__name__: 0 for strategy_class in self.strategy_classes}
-        self.noise = noise
+        self.noise = Tools.noise_model(noise)
+        self.engine = engine
+        # Built once and shared by every match in the tournament.
+        self.payoff_matrix = PRISONERS_DILEMMA if payoff_matrix is None else payoff_matrix
+        # An optional ResultCache. Deterministic pairs found in it are not replayed.
+        self.cache = cache
+        # The number of worker processes to spread the matches over. None or 1 plays them in this process.
+        self.workers = workers
+        self.verbose = verbose
+        if reporter is None:
+            reporter = TextReporter() if verbose else SilentReporter()
+        self.reporter = reporter
+        self.seed = seed
+        # An optional InteractionLogWriter that every match is written to, move by move.
+        self.interaction_log = interaction_log
+        # The results of the fixed pairs played so far, in the form of play_serial, keyed by both strategy names. They
+        # stand in for later matches between the same strategies, either way round.
+        self.fixed_results = dict()
+
+        # Pairwise results, with row i and column j holding strategy i's side of its matches against strategy j.
+        # Both sides of a strategy playing itself are added to the diagonal.
+        self.positions = {strategy_class.__name__: i for i, strategy_class in enumerate(self.strategy_classes)}
+        size = len(self.strategy_classes)
+        self.match_counts = np.zeros((size, size), dtype=np.int64)
+        self.turn_totals = np.zeros((size, size), dtype=np.int64)
+        self.score_totals = np.zeros((size, size), dtype=np.float64)
+        self.cooperation_totals = np.zeros((size, size), dtype=np.int64)
+        self.wins = np.zeros((size, size), dtype=np.int64)
+        self.draws = np.zeros((size, size), dtype=np.int64)
 
     def run_tournament(self):
         """
@@ -206,26 +1184,291 @@ class Tournament:
             This means that a strategy playing itself will play itself 4 times.
         :return: dict
         """
-        for i, strategy1 in enumerate(self.strategy_classes):
-            for j, strategy2 in enumerate(self.strategy_classes):
-                # if i != j:  # Avoid playing a strategy against itself
-                player1 = strategy1()
-                player2 = strategy2()
-                # Change the noise assignment to True to introduce noise
-                game_runner = GameRunner(self.num_games_per_match, self.noise)
-                player1, player1_score, player2, player2_score = game_runner.run_game(player1, player2)
-
-                # Halve the score for a strategy playing itself otherwise it will update the same score key twice.
-                if player1.name == player2.name:
-                    score = statistics.mean([player1_score, player1_score])
-                    self.scores[player1.name] += score
-                else:
-                    # Update the scores for differing opponents
-                    self.scores[player1.name] += player1_score
-                    self.scores[player2.name] += player2_score
+        for _ in self.iter_tournament():
+            pass
 
         return self.scores
 
+    def iter_tournament(self):
+        """
+        The generator behind run_tournament. Scores are updated and each result reported before it is yielded.
+        :return: generator of MatchResult
+        """
+        pairs = [(strategy1, strategy2) for strategy1 in self.strategy_classes for strategy2 in self.strategy_classes]
+        yield from self.record(self.play_pairs(pairs))
+
+    def record(self, played):
+        """
+        Updates the scores, reports each result and writes its moves to the interaction log, if there is one.
+        :param played: iterable of MatchResult and the moves of both players
+        :return: generator of MatchResult
+        """
+        for result, interactions in played:
+            self.update_scores(result.player1, result.player1_score, result.player2, result.player2_score)
+            self.update_matrices(result)
+            self.reporter.report(result)
+            if self.interaction_log is not None:
+                self.interaction_log.write(result, *interactions)
+            yield result
+        self.reporter.flush()
+
+    def play_pairs(self, pairs):
+        """
+        Plays a match between fresh objects for each (strategy_class, strategy_class) pair. Deterministic pairs are
+        looked up in the cache first, if there is one, and are played only once without noise: a pair this tournament
+        has already played, either way round, takes the earlier result. With workers, the rest are sharded across a
+        process pool. Otherwise the array and auto engines play their pairs in batches and the remaining pairs are
+        played one at a time as the results are consumed. Either way, results come out in the order of the pairs.
+        :return: generator of MatchResult and the moves of both players, which are None for cached results unless
+            the cache stored them
+        """
+        keys = dict()
+        cached = dict()
+        if self.cache is not None:
+            for index, (strategy1, strategy2) in enumerate(pairs):
+                key = self.cache_key(strategy1, strategy2)
+                if key is not None:
+                    keys[index] = key
+                    scores = self.cache.get(key)
+                    cooperations = interactions = None
+                    if scores is not None:
+                        cooperations = self.cache.get_cooperations(key)
+                    if scores is not None and self.interaction_log is not None:
+                        # The log needs the moves, so results cached without them are played again.
+                        interactions = self.cache.get_interactions(key)
+                    if scores is not None and cooperations is not None and (
+                            interactions is not None or self.interaction_log is None):
+                        cached[index] = scores + (cooperations, interactions)
+
+        # Fixed pairs that were played before, or will be by the time they come up, are taken from fixed_results.
+        remembered = set()
+        upcoming = set()
+        for index, (strategy1, strategy2) in enumerate(pairs):
+            if index in cached or not self.fixed(strategy1, strategy2):
+                continue
+            names = strategy1.__name__, strategy2.__name__
+            if names in upcoming or names[::-1] in upcoming or self.remembered(*names) is not None:
+                remembered.add(index)
+            else:
+                upcoming.add(names)
+
+        pending = [index for index in range(len(pairs)) if index not in cached and index not in remembered]
+        if self.workers is not None and self.workers > 1 and len(pending) > 1:
+            played = self.play_parallel(pairs, pending)
+        elif self.engine != 'python':
+            played = self.play_serial(pairs, [index for index in pending if self.batch_runner(*pairs[index])])
+        else:
+            played = dict()
+
+        for index, (strategy1, strategy2) in enumerate(pairs):
+            if index in cached:
+                player1_score, player2_score, cooperations, interactions = cached[index]
+            elif index in remembered:
+                player1_score, player2_score, cooperations, interactions = self.remembered(strategy1.__name__,
+                                                                                           strategy2.__name__)
+            elif index in played:
+                player1_score, player2_score, cooperations, interactions = played.pop(index)
+            else:
+                player1_score, player2_score, cooperations, interactions = self.play_serial(pairs, [index])[index]
+            result = MatchResult(strategy1.__name__, player1_score, strategy2.__name__, player2_score,
+                                 self.num_games_per_match, *cooperations)
+            if self.fixed(strategy1, strategy2):
+                self.fixed_results[result.player1, result.player2] = (player1_score, player2_score, cooperations,
+                                                                      interactions)
+            if index in keys and index not in cached:
+                self.cache.put(keys[index], result.player1, result.player2, self.num_games_per_match,
+                               player1_score, player2_score, interactions, cooperations)
+            yield result, interactions
+
+        if self.cache is not None:
+            self.cache.commit()
+
+    def match_seed(self, index):
+        """
+        The SeedSequence of the match at the given index, or None for an unseeded tournament. This is the same as
+        SeedSequence(seed).spawn(index + 1)[index], without having to spawn the children before it.
+        """
+        if self.seed is None:
+            return None
+        return Tools.child_seed(self.seed, index)
+
+    def play_serial(self, pairs, indices):
+        """
+        Plays the pairs at the given indices in this process. With the array and auto engines, the pairs given the
+        same runner by batch_runner are played in a single batch and the rest fall back to the GameRunner loop.
+        :param pairs: list (or dict) of strategy class pairs, indexed by match index
+        :return: dict mapping each index to int (strategy 1 score), int (strategy 2 score), the number of turns each
+            player cooperated and the moves of both players as Action codes
+        """
+        played = dict()
+        batches = dict()
+        if self.engine != 'python':
+            for index in indices:
+                runner_class = self.batch_runner(*pairs[index])
+                if runner_class is not None:
+                    batches.setdefault(runner_class, []).append(index)
+        for runner_class, batch in batches.items():
+            runner = runner_class(self.num_games_per_match, self.noise, self.payoff_matrix)
+            # The first child of a match seed is its noise stream, as in GameRunner.run_game.
+            seeds = None if self.seed is None else [self.match_seed(index).spawn(1)[0] for index in batch]
+            moves, scores = runner.run_matches([pairs[index] for index in batch], seeds=seeds)
+            scores = scores.tolist()
+            cooperations = (self.num_games_per_match - moves[:-1].sum(axis=0, dtype=np.int64)).tolist()
+            for k, index in enumerate(batch):
+                played[index] = (scores[k], scores[k + len(batch)],
+                                 (cooperations[k], cooperations[k + len(batch)]),
+                                 (moves[:-1, k], moves[:-1, k + len(batch)]))
+
+        for index in indices:
+            if index not in played:
+                strategy1, strategy2 = pairs[index]
+                game_runner = GameRunner(self.num_games_per_match, self.noise, payoff_matrix=self.payoff_matrix,
+                                         verbose=False, seed=self.match_seed(index))
+                # A strategy playing itself gets a second object, so each side keeps a history of its own.
+                player1, player2 = _strategy_pool.acquire(strategy1), _strategy_pool.acquire(strategy2)
+                _, player1_score, _, player2_score = game_runner.run_game(player1, player2)
+                # Taken from each player's own side, which perception noise leaves as played. Resetting an object
+                # gives it a new history, so the moves stay valid after it is back in the pool.
+                own1, own2 = player1.history['own'], player2.history['own']
+                played[index] = (player1_score, player2_score, (own1.cooperations, own2.cooperations),
+                                 (own1.actions(), own2.actions()))
+                _strategy_pool.release(player1, player2)
+        return played
+
+    def play_parallel(self, pairs, indices):
+        """
+        Shards the pairs at the given indices across a pool of worker processes. Workers are sent class names and
+        the tournament settings, and send back score tuples (plus the moves, if the cache wants them).
+        :return: dict in the same form as play_serial
+        """
+        with_moves = self.cache is not None and self.cache.store_interactions or self.interaction_log is not None
+        settings = dict(num_games_per_match=self.num_games_per_match, noise=self.noise, engine=self.engine,
+                        payoff_matrix=self.payoff_matrix, seed=self.seed)
+        names = {strategy_class: (strategy_class.__module__, strategy_class.__qualname__)
+                 for pair in pairs for strategy_class in pair}
+        # Several shards per worker keeps the pool busy when some shards are slower than others.
+        shard_count = min(len(indices), 4 * self.workers)
+        shards = [[(index, names[pairs[index][0]], names[pairs[index][1]]) for index in indices[k::shard_count]]
+                  for k in range(shard_count)]
+
+        played = dict()
+        with ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker) as executor:
+            for shard_results in executor.map(_play_shard, [settings] * shard_count, shards,
+                                              [with_moves] * shard_count):
+                for index, player1_score, player2_score, cooperations, interactions in shard_results:
+                    played[index] = (player1_score, player2_score, cooperations, interactions)
+        return played
+
+    def batch_runner(self, strategy1, strategy2):
+        """
+        The runner that plays a pair in a batch with others, or None if it is played by stepping through the strategy
+        objects. The array engine batches the pairs that both have an array kernel. The auto engine picks the fastest
+        runner that plays exactly like the strategy classes: the TableRunner for two finite-state machines, then the
+        LookupRunner for two lookup tables, then the ArrayRunner.
+        :return: a runner class, taking the same arguments as ArrayRunner, or None
+        """
+        if self.engine == 'python':
+            return None
+        if self.engine == 'auto':
+            if self.machine_fits(strategy1) and self.machine_fits(strategy2):
+                from StateMachine import TableRunner
+                return TableRunner
+            if strategy1.lookup_table is not None and strategy2.lookup_table is not None:
+                from LookupTable import LookupRunner
+                return LookupRunner
+        return ArrayRunner if ArrayRunner.supports(strategy1, strategy2) else None
+
+    def machine_fits(self, strategy_class):
+        """True if the strategy has a finite_state_machine that plays exactly like it in this tournament's matches."""
+        if self.noise and not strategy_class.machine_follows_noise:
+            return False
+        machine = strategy_class.finite_state_machine
+        return machine is not None and (machine.horizon is None or self.num_games_per_match <= machine.horizon)
+
+    def fixed(self, strategy1, strategy2):
+        """True if every match between the two strategies has the same result: both are deterministic and there is
+        no noise."""
+        return not self.noise and strategy1.deterministic and strategy2.deterministic
+
+    def remembered(self, player1_name, player2_name):
+        """
+        The result of a fixed pair this tournament has played, either way round, or None. Results without the moves
+        are left out when the interaction log needs them.
+        :return: a result in the form of play_serial, or None
+        """
+        result = self.fixed_results.get((player1_name, player2_name))
+        if result is None:
+            result = self.fixed_results.get((player2_name, player1_name))
+            if result is not None:
+                # The same match seen from the other side.
+                player2_score, player1_score, cooperations, interactions = result
+                result = (player1_score, player2_score, cooperations[::-1],
+                          None if interactions is None else interactions[::-1])
+        if result is not None and result[3] is None and self.interaction_log is not None:
+            return None
+        return result
+
+    def cache_key(self, strategy1, strategy2):
+        """The cache key of a pair, or None if its result could differ from one run to the next."""
+        if not self.fixed(strategy1, strategy2):
+            return None
+        return self.cache.key(strategy1, strategy2, self.num_games_per_match, self.payoff_matrix)
+
+    def update_scores(self, player1_name, player1_score, player2_name, player2_score):
+        # A strategy playing itself is credited with player 1's score only, otherwise it would count the match twice.
+        if player1_name == player2_name:
+            self.scores[player1_name] += player1_score
+        else:
+            # Update the scores for differing opponents
+            self.scores[player1_name] += player1_score
+            self.scores[player2_name] += player2_score
+
+    def update_matrices(self, result):
+        """Adds both sides of a match to the pairwise matrices."""
+        i, j = self.positions[result.player1], self.positions[result.player2]
+        sides = ((i, j, result.player1_score, result.player2_score, result.player1_cooperations),
+                 (j, i, result.player2_score, result.player1_score, result.player2_cooperations))
+        for row, column, score, opponent_score, cooperations in sides:
+            self.match_counts[row, column] += 1
+            self.turn_totals[row, column] += result.num_games
+            self.score_totals[row, column] += score
+            self.cooperation_totals[row, column] += cooperations
+            if score > opponent_score:
+                self.wins[row, column] += 1
+            elif score == opponent_score:
+                self.draws[row, column] += 1
+
+    @property
+    def strategy_names(self):
+        return [strategy_class.__name__ for strategy_class in self.strategy_classes]
+
+    @property
+    def payoffs(self):
+        """
+        The mean payoff per turn of each row strategy against each column strategy, NaN where they have not met.
+        :return: float64 array of shape (N, N)
+        """
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return self.score_totals / self.turn_totals
+
+    @property
+    def cooperation_rates(self):
+        """
+        The fraction of turns each row strategy cooperated against each column strategy, NaN where they have not met.
+        :return: float64 array of shape (N, N)
+        """
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return self.cooperation_totals / self.turn_totals
+
+    def save_matrices(self, path):
+        """
+        Saves the strategy names, the derived payoffs and cooperation_rates, and the raw totals to a .npz file.
+        """
+        np.savez(path, strategies=np.array(self.strategy_names), payoffs=self.payoffs,
+                 cooperation_rates=self.cooperation_rates, wins=self.wins, draws=self.draws,
+                 match_counts=self.match_counts, turn_totals=self.turn_totals, score_totals=self.score_totals,
+                 cooperation_totals=self.cooperation_totals)
+
     def round_robin(self):
         """
         A Round-Robin tournament between each of the strategies. Each strategy will play itself and another strategy
@@ -233,24 +1476,252 @@ class Tournament:
             p1 vs p1
             p1 vs p2
             p2 vs p2
+        Every match starts from reset objects, so nothing carries over from one match to the next.
         :return: dict
         """
-        strategy_objs = Tools.object_spawner(self.strategy_classes)
+        for _ in self.iter_round_robin():
+            pass
 
-        for player1 in strategy_objs:
-            for player2 in strategy_objs:
-                # Change the noise assignment to True to introduce noise
-                game_runner = GameRunner(self.num_games_per_match, self.noise)
-                player1, player1_score, player2, player2_score = game_runner.run_game(player1, player2)
+        return self.scores
 
-                # Halve the score for a strategy playing itself otherwise it will update the same score key twice.
-                if player1.name == player2.name:
-                    score = statistics.mean([player1_score, player1_score])
-                    self.scores[player1.name] += score
-                else:
-                    # Update the scores for differing opponents
-                    self.scores[player1.name] += player1_score
-                    self.scores[player2.name] += player2_score
-            strategy_objs = strategy_objs[1:]
+    def iter_round_robin(self):
+        """
+        The generator behind round_robin. Scores are updated and each result reported before it is yielded.
+        Matches are played like those of run_tournament, so they are cached, batched on the array engine and sharded
+        across workers in the same way.
+        :return: generator of MatchResult
+        """
+        pairs = [(strategy1, strategy2) for i, strategy1 in enumerate(self.strategy_classes)
+                 for strategy2 in self.strategy_classes[i:]]
+        yield from self.record(self.play_pairs(pairs))
 
-        return self.scores
+    def repeat(self, repetitions, workers=None, method='round_robin'):
+        """
+        Plays the tournament repetitions times over, each time with its own seed, to show how much the overall scores
+        and the ranking owe to the noise and to the strategies' own random choices. Repetition r is seeded with the
+        r-th child of SeedSequence(seed), so a seeded run gives the same scores with any number of workers. Without a
+        seed, the seed is drawn from the global random module. The repetitions are played silently and leave the
+        scores, the matrices and the cache of this tournament alone. Fixed pairs are played once, into this
+        tournament's fixed_results, and shared by every repetition.
+        :param workers: the number of worker processes to spread the repetitions over, a whole repetition each.
+            Defaults to the tournament's workers.
+        :param method: 'round_robin' or 'tournament', the way each repetition is played
+        :return: RepeatedScores
+        """
+        for repeated in self.iter_repeat(repetitions, workers, method):
+            pass
+        return repeated
+
+    def iter_repeat(self, repetitions, workers=None, method='round_robin'):
+        """
+        The generator behind repeat. The RepeatedScores is yielded each time a repetition finishes, with the
+        repetitions played so far filled in, so a partial answer is available while the rest are being played.
+        Closing the generator cancels the repetitions that have not started.
+        :return: generator of RepeatedScores, the same object each time
+        """
+        if method not in REPEAT_METHODS:
+            raise ValueError(f"Unknown method {method!r}, expected one of {REPEAT_METHODS}")
+        if repetitions < 1:
+            raise ValueError(f"At least one repetition is needed, got {repetitions}")
+        workers = self.workers if workers is None else workers
+        seed = random.getrandbits(128) if self.seed is None else self.seed
+        seeds = [Tools.child_seed(seed, repetition) for repetition in range(repetitions)]
+        settings = dict(num_games_per_match=self.num_games_per_match, noise=self.noise, engine=self.engine,
+                        payoff_matrix=self.payoff_matrix)
+        repeated = RepeatedScores(self.strategy_names, repetitions, self.num_games_per_match)
+        start_time = time.perf_counter()
+
+        fixed_pairs = [(strategy1, strategy2) for strategy1 in self.strategy_classes
+                       for strategy2 in self.strategy_classes if self.fixed(strategy1, strategy2)]
+        if fixed_pairs and repetitions > 1:
+            # Played without the cache, the reporter or the log, into the fixed results of this tournament.
+            silent = Tournament(self.strategy_classes, verbose=False, **settings)
+            silent.fixed_results = self.fixed_results
+            for _ in silent.play_pairs(fixed_pairs):
+                pass
+        # Without the moves, which the repetitions do not need and which cannot always be sent to a worker.
+        fixed_results = {names: result[:3] + (None,) for names, result in self.fixed_results.items()}
+
+        if workers is None or workers <= 1 or repetitions <= 1:
+            for repetition in range(repetitions):
+                repeated.add(repetition, _play_repetition(settings, self.strategy_classes, method,
+                                                          seeds[repetition], fixed_results))
+                repeated.elapsed = time.perf_counter() - start_time
+                yield repeated
+            return
+
+        names = [(strategy_class.__module__, strategy_class.__qualname__) for strategy_class in self.strategy_classes]
+        executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker)
+        try:
+            futures = {executor.submit(_play_repetition, settings, names, method, seeds[repetition],
+                                       fixed_results): repetition
+                       for repetition in range(repetitions)}
+            for future in as_completed(futures):
+                repeated.add(futures[future], future.result())
+                repeated.elapsed = time.perf_counter() - start_time
+                yield repeated
+        finally:
+            executor.shutdown(cancel_futures=True)
+
+
+REPEAT_METHODS = ('round_robin', 'tournament')
+
+
+class RepeatedScores:
+    """
+    The overall scores of a tournament played repeatedly with independent seeds, as produced by Tournament.repeat.
+    Row r of scores holds each strategy's score in repetition r. Rows stay NaN until their repetition has been
+    played, and the statistics cover the repetitions completed so far.
+    :param names: the strategy names, in the order of the columns
+    """
+
+    def __init__(self, names, repetitions, num_games):
+        self.names = list(names)
+        self.num_games = num_games
+        self.scores = np.full((repetitions, len(self.names)), np.nan)
+        self.completed = np.zeros(repetitions, dtype=bool)
+        self.elapsed = 0.0
+
+    def add(self, repetition, scores):
+        """Fills in the row of a repetition from its dict of overall scores."""
+        self.scores[repetition] = [scores[name] for name in self.names]
+        self.completed[repetition] = True
+
+    @property
+    def count(self):
+        """The number of repetitions played so far."""
+        return int(self.completed.sum())
+
+    @property
+    def played(self):
+        """The rows of the repetitions played so far, float64 array of shape (count, N)."""
+        return self.scores[self.completed]
+
+    @property
+    def mean(self):
+        return self.played.mean(axis=0)
+
+    @property
+    def std(self):
+        """The sample standard deviation of each strategy's score, zero until there are two repetitions."""
+        played = self.played
+        if len(played) < 2:
+            return np.zeros(len(self.names))
+        return played.std(axis=0, ddof=1)
+
+    def confidence_intervals(self, level=0.95, resamples=10000, seed=None):
+        """
+        Percentile bootstrap confidence intervals for each strategy's mean score. A resample is a multinomial count
+        of how often each repetition is drawn, so every strategy is resampled over the same repetitions.
+        :param seed: seed of the resamples, drawn from the global random module if None
+        :return: float64 array of shape (N, 2), the lower and upper bound for each strategy
+        """
+        played = self.played
+        count = len(played)
+        rng = Tools.numpy_rng(None if seed is None else np.random.SeedSequence(seed))
+        weights = rng.multinomial(count, np.full(count, 1 / count), size=resamples)
+        means = weights @ played / count
+        tail = (1 - level) / 2
+        return np.quantile(means, [tail, 1 - tail], axis=0).T
+
+    @property
+    def ranks(self):
+        """
+        The place of each strategy in each repetition played so far, 1 for the highest score, with ties going to the
+        strategy listed first. int64 array of shape (count, N)
+        """
+        order = np.argsort(-self.played, axis=1, kind='stable')
+        return np.argsort(order, axis=1) + 1
+
+    @property
+    def mean_ranks(self):
+        """The place of each strategy on the leaderboard of mean scores."""
+        return np.argsort(np.argsort(-self.mean, kind='stable')) + 1
+
+    @property
+    def rank_frequencies(self):
+        """
+        The fraction of repetitions in which each strategy (row) finished in each place (column), float64 array of
+        shape (N, N).
+        """
+        places = np.arange(1, len(self.names) + 1)
+        return (self.ranks[:, :, np.newaxis] == places).mean(axis=0)
+
+    @property
+    def rank_stability(self):
+        """The fraction of repetitions in which each strategy finished in its place on the leaderboard of means."""
+        return (self.ranks == self.mean_ranks).mean(axis=0)
+
+    def summary(self, level=0.95):
+        """
+        :return: str of the mean scores sorted by highest, in the style of the tournament leaderboard, with the
+            standard deviation, the bootstrap confidence interval, the range of places and the rank stability
+        """
+        mean, std, intervals, ranks = self.mean, self.std, self.confidence_intervals(level), self.ranks
+        stability = self.rank_stability
+        lines = ['*' * 44, " Mean scores, sorted by highest ranking:", '*' * 44,
+                 f"Number of games: {self.num_games}, repetitions: {self.count}, time: {self.elapsed:.2f}s", '',
+                 f"{'':>20}  {'mean':>10} {'std':>9}  {f'{level:.0%} interval':>21}  places  stability"]
+        for i in np.argsort(-mean, kind='stable').tolist():
+            places = f"{ranks[:, i].min()}-{ranks[:, i].max()}"
+            lines.append(f"{self.names[i]:>20}: {mean[i]:>10.1f} {std[i]:>9.1f}  [{intervals[i, 0]:>9.1f}, "
+                         f"{intervals[i, 1]:>9.1f}]  {places:^6}  {stability[i]:>9.0%}")
+        lines.append('*' * 44)
+        return '\n'.join(lines)
+
+
+# Strategy classes resolved by a worker process, keyed by (module, name).
+_worker_classes = dict()
+
+
+def _init_worker():
+    """Imports the strategies once per worker process."""
+    importlib.import_module('Strategies')
+
+
+def _strategy_class(module, name):
+    if (module, name) not in _worker_classes:
+        _worker_classes[module, name] = getattr(importlib.import_module(module), name)
+    return _worker_classes[module, name]
+
+
+def _play_shard(settings, shard, with_moves):
+    """
+    Plays a shard of a tournament in a worker process.
+    :param settings: keyword arguments for the Tournament
+    :param shard: list of tuples of int (pair index), (module, name) of strategy 1, (module, name) of strategy 2
+    :param with_moves: whether to send back the moves of both players
+    :return: list of tuples of int (pair index), int (strategy 1 score), int (strategy 2 score), cooperation counts,
+        moves or None
+    """
+    tournament = Tournament([], verbose=False, **settings)
+    # Keyed by the index of the pair in the whole tournament, which also picks its seed.
+    pairs = {index: (_strategy_class(*name1), _strategy_class(*name2)) for index, name1, name2 in shard}
+    played = tournament.play_serial(pairs, list(pairs))
+    results = list()
+    for index in pairs:
+        player1_score, player2_score, cooperations, interactions = played[index]
+        if with_moves:
+            interactions = tuple(bytes(moves) for moves in interactions)
+        else:
+            interactions = None
+        results.append((index, player1_score, player2_score, cooperations, interactions))
+    return results
+
+
+def _play_repetition(settings, strategy_classes, method, seed, fixed_results=None):
+    """
+    Plays one repetition of a tournament, in this process or a worker.
+    :param strategy_classes: the strategy classes, or their (module, name) in a worker
+    :param seed: the SeedSequence of the repetition
+    :param fixed_results: the results of fixed pairs already played, in the form of Tournament.fixed_results
+    :return: dict of the overall scores
+    """
+    strategy_classes = [strategy_class if isinstance(strategy_class, type) else _strategy_class(*strategy_class)
+                        for strategy_class in strategy_classes]
+    tournament = Tournament(strategy_classes, verbose=False, seed=seed, **settings)
+    if fixed_results is not None:
+        tournament.fixed_results.update(fixed_results)
+    if method == 'round_robin':
+        return tournament.round_robin()
+    return tournament.run_tournament()
@@ -0,0 +1,211 @@
+import json
+import mmap
+import struct
+
+import numpy as np
+
+from GameTools import PAYOFF_TYPES
+
+MAGIC = b'GTIL'
+VERSION = 1
+# Magic, version, number of matches, offset of the index, offset of the names.
+HEADER = struct.Struct('<4sIQQQ')
+# Records are padded so that every run-length array starts on an aligned offset.
+ALIGNMENT = 8
+
+PACKED = 0
+RUN_LENGTH = 1
+
+INDEX_DTYPE = np.dtype([
+    ('offset', '<u8'),
+    ('turns', '<u4'),
+    ('runs', '<u4'),
+    ('player1', '<u4'),
+    ('player2', '<u4'),
+    ('player1_score', '<f8'),
+    ('player2_score', '<f8'),
+    ('encoding', 'u1'),
+])
+
+
+def outcome_codes(player1_moves, player2_moves):
+    """
+    The joint outcome of each turn from player 1's point of view, as an index into PAYOFF_TYPES: 0 (R), 1 (S),
+    2 (T) or 3 (P). The same labels Tools.get_payoff_type gives.
+    :return: uint8 array
+    """
+    return 2 * _as_codes(player1_moves) + _as_codes(player2_moves)
+
+
+def _as_codes(moves):
+    if isinstance(moves, bytes):
+        return np.frombuffer(moves, dtype=np.uint8)
+    return np.asarray(moves, dtype=np.uint8)
+
+
+class InteractionLogWriter:
+    """
+    Writes the turn by turn interactions of a tournament to a binary log. Each match is stored as its joint outcomes
+    (R, S, T or P) at 2 bits per turn, or as runs of the same outcome when that is smaller, which it is for the long
+    all-C and all-D stretches of most deterministic matches. Records are streamed to disk as they arrive, and the
+    per-match index and the strategy names are written when the log is closed.
+    Pass a writer as interaction_log to Tournament to log every match it plays.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, 'wb')
+        self.file.write(HEADER.pack(MAGIC, VERSION, 0, 0, 0))
+        self.entries = list()
+        self.names = dict()
+
+    def write(self, result, player1_moves, player2_moves):
+        """
+        Appends one match.
+        :param result: MatchResult of the match
+        :param player1_moves: moves of player 1 as Action codes, in any form numpy can read (bytes, array, ...)
+        :param player2_moves: moves of player 2
+        """
+        codes = outcome_codes(player1_moves, player2_moves)
+        turns = len(codes)
+        starts = np.flatnonzero(np.diff(codes)) + 1 if turns else np.empty(0, dtype=np.intp)
+        runs = len(starts) + 1 if turns else 0
+        if 5 * runs < (turns + 3) // 4:
+            # Run lengths first, then the outcome of each run.
+            bounds = np.concatenate([[0], starts, [turns]])
+            data = np.diff(bounds).astype('<u4').tobytes() + codes[bounds[:-1]].tobytes()
+            encoding = RUN_LENGTH
+        else:
+            padded = np.zeros(4 * ((turns + 3) // 4), dtype=np.uint8)
+            padded[:turns] = codes
+            data = (padded[0::4] | padded[1::4] << 2 | padded[2::4] << 4 | padded[3::4] << 6).tobytes()
+            encoding = PACKED
+            runs = 0
+
+        offset = self.file.tell()
+        self.file.write(data)
+        self.file.write(bytes(-len(data) % ALIGNMENT))
+        self.entries.append((offset, turns, runs, self._name_id(result.player1), self._name_id(result.player2),
+                             result.player1_score, result.player2_score, encoding))
+
+    def _name_id(self, name):
+        return self.names.setdefault(name, len(self.names))
+
+    def close(self):
+        if self.file.closed:
+            return
+        index_offset = self.file.tell()
+        self.file.write(np.array(self.entries, dtype=INDEX_DTYPE).tobytes())
+        names_offset = self.file.tell()
+        self.file.write(json.dumps(list(self.names)).encode())
+        self.file.seek(0)
+        self.file.write(HEADER.pack(MAGIC, VERSION, len(self.entries), index_offset, names_offset))
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class InteractionLog:
+    """
+    Reads a log written by InteractionLogWriter. The file is memory-mapped and only the header, the index and the
+    names are read up front, so opening a log is instant whatever its size. index is a structured NumPy view of the
+    per-match index, and packed() and runs() return views of a match's record without copying. Views keep the map
+    open, so drop them before calling close().
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as file:
+            self.map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, count, index_offset, names_offset = HEADER.unpack_from(self.map)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a version {VERSION} interaction log")
+        self.index = np.frombuffer(self.map, dtype=INDEX_DTYPE, count=count, offset=index_offset)
+        self.names = json.loads(self.map[names_offset:])
+
+    def __len__(self):
+        return len(self.index)
+
+    def players(self, match):
+        """
+        :return: str (name of strategy 1), str (name of strategy 2)
+        """
+        entry = self.index[match]
+        return self.names[entry['player1']], self.names[entry['player2']]
+
+    def scores(self, match):
+        entry = self.index[match]
+        return entry['player1_score'].item(), entry['player2_score'].item()
+
+    def find(self, player1, player2):
+        """
+        :return: list of the indices of the matches between the two strategies, in that order
+        """
+        if player1 not in self.names or player2 not in self.names:
+            return []
+        ids = self.names.index(player1), self.names.index(player2)
+        return np.flatnonzero((self.index['player1'] == ids[0]) & (self.index['player2'] == ids[1])).tolist()
+
+    def packed(self, match):
+        """
+        :return: uint8 view of a packed record, four turns per byte with the first turn in the lowest two bits, or
+            None if the match is run-length encoded
+        """
+        entry = self.index[match]
+        if entry['encoding'] != PACKED:
+            return None
+        return np.frombuffer(self.map, dtype=np.uint8, count=(int(entry['turns']) + 3) // 4,
+                             offset=int(entry['offset']))
+
+    def runs(self, match):
+        """
+        :return: uint32 view of the run lengths and uint8 view of the outcome of each run, or None if the match is
+            bit-packed
+        """
+        entry = self.index[match]
+        if entry['encoding'] != RUN_LENGTH:
+            return None
+        runs, offset = int(entry['runs']), int(entry['offset'])
+        lengths = np.frombuffer(self.map, dtype='<u4', count=runs, offset=offset)
+        outcomes = np.frombuffer(self.map, dtype=np.uint8, count=runs, offset=offset + 4 * runs)
+        return lengths, outcomes
+
+    def outcomes(self, match):
+        """
+        The joint outcome of each turn as an index into PAYOFF_TYPES. Unlike packed() and runs(), this decodes the
+        record into a new array.
+        :return: uint8 array with one entry per turn
+        """
+        packed = self.packed(match)
+        if packed is None:
+            lengths, outcomes = self.runs(match)
+            return np.repeat(outcomes, lengths)
+        codes = np.stack([packed >> shift & 3 for shift in (0, 2, 4, 6)], axis=1).ravel()
+        return codes[:int(self.index[match]['turns'])]
+
+    def payoff_types(self, match):
+        """
+        :return: str of R, S, T and P labels, one per turn
+        """
+        return ''.join(PAYOFF_TYPES[code] for code in self.outcomes(match).tolist())
+
+    def moves(self, match):
+        """
+        :return: uint8 arrays of the Action codes played by player 1 and player 2
+        """
+        codes = self.outcomes(match)
+        return codes >> 1, codes & 1
+
+    def close(self):
+        self.index = None
+        self.map.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
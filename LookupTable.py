@@ -0,0 +1,166 @@
+import numpy as np
+
+from GameTools import ACTIONS, PRISONERS_DILEMMA, Action, Tools
+
+
+class LookupTable:
+    """
+    A strategy that looks its response to the last k moves of both players up in a table of 4^k moves.
+    The window is kept as two k bit integers, one per player, shifted along by one bit each turn with the most recent
+    move in the lowest bit and a defection as 1. The response to own window o and opponent window p is entry
+    (o << k) | p.
+    :param responses: the 4^k moves of the table, as C or D labels, Action codes or an array of 0 and 1
+    :param opening: the moves played on the first k turns, before the window is full. Defaults to cooperating.
+    """
+
+    def __init__(self, responses, opening=None):
+        if isinstance(responses, np.ndarray):
+            self.responses = responses.astype(np.int8).ravel()
+            if not np.isin(self.responses, (0, 1)).all():
+                raise ValueError("Responses must be 0 (cooperate) or 1 (defect)")
+        else:
+            self.responses = np.array([ACTIONS[response] for response in responses], dtype=np.int8)
+        self.depth = (len(self.responses).bit_length() - 1) // 2
+        if self.depth < 1 or len(self.responses) != 4 ** self.depth:
+            raise ValueError(f"Expected 4^k responses for a window of k moves, got {len(self.responses)}")
+        opening = [Action.COOPERATE] * self.depth if opening is None else [ACTIONS[move] for move in opening]
+        if len(opening) != self.depth:
+            raise ValueError(f"Expected {self.depth} opening moves, got {len(opening)}")
+        self.opening = np.array(opening, dtype=np.int8)
+        self.mask = (1 << self.depth) - 1
+        # The same tables as Python values, for playing one match at a time.
+        self.actions = tuple(Action(response) for response in self.responses.tolist())
+        self.opening_actions = tuple(opening)
+
+    def __len__(self):
+        return len(self.responses)
+
+    @classmethod
+    def from_function(cls, depth, respond, opening=None):
+        """
+        Tabulates a strategy of the last depth moves.
+        :param respond: function (own moves, opponent moves) -> Action, given the windows as tuples of Actions, oldest
+            first
+        """
+        responses = []
+        for own in range(1 << depth):
+            own_moves = cls.window(own, depth)
+            for opponent in range(1 << depth):
+                responses.append(respond(own_moves, cls.window(opponent, depth)))
+        return cls(responses, opening)
+
+    @classmethod
+    def random(cls, depth, rng=None):
+        """A table of uniformly random responses, drawn from the numpy Generator rng."""
+        rng = Tools.numpy_rng() if rng is None else rng
+        return cls(rng.integers(0, 2, 4 ** depth, dtype=np.int8), rng.integers(0, 2, depth, dtype=np.int8))
+
+    @staticmethod
+    def window(key, depth):
+        """The moves of a k bit window, oldest first."""
+        return tuple(Action(key >> shift & 1) for shift in range(depth - 1, -1, -1))
+
+    @staticmethod
+    def key(moves):
+        """The k bit window of a sequence of moves, oldest first."""
+        key = 0
+        for move in moves:
+            key = key << 1 | ACTIONS[move]
+        return key
+
+
+class LookupRunner:
+    """
+    Plays many matches between lookup tables at once. Every table in a batch is stacked into one array and each
+    player's window is an integer column, so a turn is a handful of shifts and one lookup for all of the matches.
+    Tables of different depths can be mixed. run_matches takes the same arguments and gives the same results as
+    ArrayRunner's.
+    """
+
+    def __init__(self, num_games, noise=False, payoff_matrix=PRISONERS_DILEMMA):
+        self.num_games = num_games
+        self.noise = Tools.noise_model(noise)
+        self.payoff_matrix = payoff_matrix
+
+    @staticmethod
+    def table(player):
+        if isinstance(player, LookupTable):
+            return player
+        if getattr(player, 'lookup_table', None) is None:
+            raise ValueError(f"{player.__name__} has no lookup_table")
+        return player.lookup_table
+
+    def run_matches(self, pairs, seeds=None):
+        """
+        Play every pair at once.
+        :param pairs: list of pairs of LookupTables or of strategy classes with lookup_table set
+        :param seeds: optional SeedSequence for each pair, from which the noise of that match is drawn
+        :return: int8 array of shape (num_games + 1, 2 * len(pairs)) holding the moves played and, in the last row,
+            the next move each table would make. Columns are player 1 sides followed by player 2 sides.
+            int64 array of the 2 * len(pairs) scores in the same column order.
+        """
+        num_pairs = len(pairs)
+        sides = [self.table(pair[0]) for pair in pairs] + [self.table(pair[1]) for pair in pairs]
+        offsets = dict()
+        total = 0
+        for table in sides:
+            if id(table) not in offsets:
+                offsets[id(table)] = (total, table)
+                total += len(table)
+        responses = np.concatenate([table.responses for _, table in offsets.values()])
+        base = np.array([offsets[id(table)][0] for table in sides], dtype=np.int64)
+        depth = np.array([table.depth for table in sides], dtype=np.int64)
+        mask = (1 << depth) - 1
+        longest = int(depth.max())
+        # The opening move of each column on each of the first turns, for as long as its window is filling.
+        openings = np.zeros((longest, 2 * num_pairs), dtype=np.int8)
+        for column, table in enumerate(sides):
+            openings[:table.depth, column] = table.opening
+        opponents = np.concatenate([np.arange(num_pairs, 2 * num_pairs), np.arange(num_pairs)])
+
+        flips = None
+        perception = False
+        if self.noise is not None:
+            flips = np.empty((self.num_games, 2 * num_pairs), dtype=np.int8)
+            rng = Tools.numpy_rng() if seeds is None else None
+            for k in range(num_pairs):
+                match_rng = rng if seeds is None else Tools.numpy_rng(seeds[k])
+                flips[:, [k, k + num_pairs]] = self.noise.sample(self.num_games, match_rng)
+            perception = self.noise.perception
+
+        moves = np.empty((self.num_games + 1, 2 * num_pairs), dtype=np.int8)
+        own_key = np.zeros(2 * num_pairs, dtype=np.int64)
+        opponent_key = np.zeros(2 * num_pairs, dtype=np.int64)
+        for t in range(self.num_games + 1):
+            played = moves[t]
+            np.take(responses, base + (own_key << depth | opponent_key), out=played)
+            if t < longest:
+                np.copyto(played, openings[t], where=t < depth)
+            if t == self.num_games:
+                break
+            if flips is not None and not perception:
+                played ^= flips[t]
+            seen = played[opponents]
+            if perception:
+                seen ^= flips[t]
+            own_key = (own_key << 1 | played) & mask
+            opponent_key = (opponent_key << 1 | seen) & mask
+
+        own = moves[:-1].astype(np.intp)
+        payoffs = np.asarray(self.payoff_matrix.payoffs)
+        scores = payoffs[2 * own + own[:, opponents]].sum(axis=0)
+        return moves, scores
+
+    def payoffs(self, tables, chunk_size=10000):
+        """
+        Plays every table against every other, chunk_size matches at a time, for the population models in Evolution.
+        :return: float64 array of shape (N, N), the mean payoff per turn of row i against column j
+        """
+        size = len(tables)
+        pairs = [(tables[i], tables[j]) for i in range(size) for j in range(size)]
+        payoffs = np.empty(size * size)
+        for start in range(0, len(pairs), chunk_size):
+            chunk = pairs[start:start + chunk_size]
+            _, scores = self.run_matches(chunk)
+            payoffs[start:start + len(chunk)] = scores[:len(chunk)] / self.num_games
+        return payoffs.reshape(size, size)
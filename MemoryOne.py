@@ -0,0 +1,320 @@
+import time
+
+import numpy as np
+
+from GameTools import BernoulliNoise, GeometricNoise, PRISONERS_DILEMMA, SilentReporter, TextReporter, Tools
+
+# The four outcomes of a turn, indexed 2 * own + opponent like the payoffs: CC, CD, DC and DD.
+OUTCOMES = ('CC', 'CD', 'DC', 'DD')
+# The same outcome seen from the other player's side.
+SWAPPED = np.array([0, 2, 1, 3])
+# Horizon used for the long-run average of a chain without a unique stationary distribution.
+LONG_RUN_TURNS = 2 ** 48
+
+
+def noisy_chances(probabilities, initial, rate, perception):
+    """
+    A player's chances of cooperating after each outcome and on the first turn once its noise is taken into account.
+    :param probabilities: float64 array of shape (..., 4), the chances of cooperating after CC, CD, DC and DD
+    :param initial: float64 array of shape (...), the chances of cooperating on the first turn
+    :param rate: the player's flip rate, broadcastable against initial
+    :param perception: whether the flips are misreadings of the opponent's move, broadcastable against initial
+    :return: float64 array of shape (..., 4), float64 array of shape (...)
+    """
+    rate = np.asarray(rate, dtype=np.float64)
+    perception = np.asarray(perception, dtype=bool)
+    acted = probabilities * (1 - rate[..., None]) + (1 - probabilities) * rate[..., None]
+    # Misreading the opponent's move flips the low bit of the outcome.
+    misread = probabilities * (1 - rate[..., None]) + probabilities[..., [1, 0, 3, 2]] * rate[..., None]
+    chances = np.where(perception[..., None], misread, acted)
+    openings = np.where(perception, initial, initial * (1 - rate) + (1 - initial) * rate)
+    return chances, openings
+
+
+class MemoryOne:
+    """
+    A strategy whose next move depends only on the outcome of the last turn.
+    :param probabilities: chances of cooperating after CC, CD, DC and DD, own move first
+    :param initial: chance of cooperating on the first turn
+    """
+
+    def __init__(self, probabilities, initial=1.0, name=None):
+        self.probabilities = np.asarray(probabilities, dtype=np.float64)
+        self.initial = float(initial)
+        if self.probabilities.shape != (4,) or not ((0 <= self.probabilities) & (self.probabilities <= 1)).all():
+            raise ValueError(f"Expected four probabilities between 0 and 1, got {probabilities!r}")
+        if not 0 <= self.initial <= 1:
+            raise ValueError(f"Expected an initial probability between 0 and 1, got {initial!r}")
+        self.name = name
+
+    @classmethod
+    def from_strategy(cls, strategy_class):
+        """The memory-one rule of a strategy class that declares one with its memory_one attribute."""
+        if isinstance(strategy_class, MemoryOne):
+            return strategy_class
+        if getattr(strategy_class, 'memory_one', None) is None:
+            raise ValueError(f"{strategy_class.__name__} is not a memory-one strategy")
+        *probabilities, initial = strategy_class.memory_one
+        return cls(probabilities, initial, strategy_class.__name__)
+
+    def __repr__(self):
+        return f"MemoryOne({self.probabilities.tolist()}, initial={self.initial!r}, name={self.name!r})"
+
+
+class MemoryOneSolver:
+    """
+    Exact expected scores of matches between memory-one strategies. The outcome of each turn is a Markov chain on
+    CC, CD, DC and DD, and independent noise keeps it one: with action noise at rate e a player cooperates with
+    chance p(1 - e) + (1 - p)e, and with perception noise it acts on the outcome with the opponent's move misread
+    with chance e. The expected total score of an n turn match comes from the sum of the first n powers of the
+    transition matrix, computed by repeated squaring, and the long-run payoff per turn from the stationary
+    distribution. Every pair and noise level is solved at once as a stack of 4 x 4 matrices.
+    """
+
+    def __init__(self, payoff_matrix=PRISONERS_DILEMMA):
+        self.payoff_matrix = payoff_matrix
+        payoffs = np.asarray(payoff_matrix.payoffs, dtype=np.float64)
+        # Payoff of each outcome for player 1 and for player 2.
+        self.outcome_payoffs = np.stack([payoffs, payoffs[SWAPPED]], axis=1)
+
+    def expected_scores(self, pairs, noise=True, num_games=None):
+        """
+        :param pairs: list of (player 1, player 2) pairs of MemoryOne rules or strategy classes with memory_one set
+        :param noise: a noise setting as for GameRunner (False, True, a rate, a BernoulliNoise or a GeometricNoise),
+            or a list of them to solve at every level
+        :param num_games: number of turns, for the expected score of a match as GameRunner would total it, or None
+            for the expected payoff per turn in the long run
+        :return: float64 array of player 1's and player 2's scores of shape (len(pairs), 2), or
+            (len(noise), len(pairs), 2) for a list of noise settings
+        """
+        levels = noise if isinstance(noise, list) else [noise]
+        player1 = [MemoryOne.from_strategy(pair[0]) for pair in pairs]
+        player2 = [MemoryOne.from_strategy(pair[1]) for pair in pairs]
+        rates, perception = self.noise_levels(levels)
+        matrices, initial = self.transition_matrices(player1, player2, rates, perception)
+        if num_games is None:
+            distributions = self.long_run(matrices, initial)
+        else:
+            distributions = (initial[:, None] @ self.power_sums(matrices, num_games))[:, 0]
+        scores = (distributions @ self.outcome_payoffs).reshape(len(levels), len(pairs), 2)
+        return scores if isinstance(noise, list) else scores[0]
+
+    def payoffs(self, strategies, noise=True, num_games=None):
+        """
+        The pairwise payoff per turn of every strategy against every other, in the layout of Tournament.payoffs.
+        :return: float64 array of shape (N, N), or (len(noise), N, N) for a list of noise settings
+        """
+        size = len(strategies)
+        pairs = [(strategies[i], strategies[j]) for i in range(size) for j in range(size)]
+        scores = self.expected_scores(pairs, noise, num_games)[..., 0]
+        if num_games is not None:
+            scores = scores / num_games
+        return scores.reshape(scores.shape[:-1] + (size, size))
+
+    @staticmethod
+    def noise_levels(levels):
+        """
+        :return: float64 array of shape (len(levels), 2) of each player's flip rate, bool array of perception flags
+        """
+        rates = np.zeros((len(levels), 2))
+        perception = np.zeros(len(levels), dtype=bool)
+        for level, noise in enumerate(levels):
+            model = Tools.noise_model(noise)
+            if model is None:
+                continue
+            if not isinstance(model, (BernoulliNoise, GeometricNoise)):
+                raise ValueError(f"{model!r} does not flip moves independently, so the match is not a Markov chain")
+            rates[level] = model.rates
+            perception[level] = model.perception
+        return rates, perception
+
+    @staticmethod
+    def transition_matrices(player1, player2, rates, perception):
+        """
+        :return: float64 array of shape (levels * pairs, 4, 4) of the chance of going from each outcome to the next,
+            float64 array of shape (levels * pairs, 4) of the distribution of the first outcome
+        """
+        levels = len(rates)
+        chances = np.empty((2, levels, len(player1), 4))
+        openings = np.empty((2, levels, len(player1)))
+        for side, rules in enumerate((player1, player2)):
+            probabilities = np.array([rule.probabilities for rule in rules])
+            initial = np.array([rule.initial for rule in rules])
+            chances[side], openings[side] = noisy_chances(probabilities, initial, rates[:, side, None],
+                                                          perception[:, None])
+        # Player 2 reads each outcome from its own side.
+        chances[1] = chances[1][..., SWAPPED]
+
+        # Outcome 2 * own + opponent follows from the two independent moves.
+        moves1 = np.stack([chances[0], 1 - chances[0]], axis=-1).reshape(-1, 4, 2)
+        moves2 = np.stack([chances[1], 1 - chances[1]], axis=-1).reshape(-1, 4, 2)
+        matrices = (moves1[:, :, :, None] * moves2[:, :, None, :]).reshape(-1, 4, 4)
+        first1 = np.stack([openings[0], 1 - openings[0]], axis=-1).reshape(-1, 2)
+        first2 = np.stack([openings[1], 1 - openings[1]], axis=-1).reshape(-1, 2)
+        initial = (first1[:, :, None] * first2[:, None, :]).reshape(-1, 4)
+        return matrices, initial
+
+    @staticmethod
+    def power_sums(matrices, turns):
+        """
+        :return: the sum of the first `turns` powers of each matrix, I + M + ... + M^(turns - 1), by binary powering
+        """
+        power = np.broadcast_to(np.eye(4), matrices.shape).copy()
+        total = np.zeros_like(matrices)
+        for bit in bin(turns)[2:]:
+            total = total + total @ power
+            power = power @ power
+            if bit == '1':
+                total = total + power
+                power = power @ matrices
+        return total
+
+    def long_run(self, matrices, initial):
+        """
+        The long-run distribution of outcomes: the stationary distribution where it is unique, which any noise
+        guarantees under action noise. Otherwise, as in a noiseless match, it depends on the first outcome and is
+        taken as the average over LONG_RUN_TURNS turns.
+        :return: float64 array of shape (len(matrices), 4)
+        """
+        # Solve pi (M - I) = 0 with the last equation replaced by sum(pi) = 1.
+        system = np.swapaxes(matrices, 1, 2) - np.eye(4)
+        system[:, -1] = 1
+        unique = np.abs(np.linalg.det(system)) > 1e-12
+        distributions = np.empty_like(initial)
+        if unique.any():
+            target = np.broadcast_to([0.0, 0.0, 0.0, 1.0], (int(unique.sum()), 4))
+            distributions[unique] = np.linalg.solve(system[unique], target[..., None])[..., 0]
+        if not unique.all():
+            sums = self.power_sums(matrices[~unique], LONG_RUN_TURNS)
+            distributions[~unique] = (initial[~unique, None] @ sums)[:, 0] / LONG_RUN_TURNS
+        return distributions
+
+
+class MemoryOneTournament:
+    """
+    Plays every memory-one strategy in a population against every other, like Tournament.run_tournament, with the
+    players held as an (N, 4) array of chances of cooperating instead of strategy objects. All N * N matches advance
+    in lockstep, one vectorized draw per player per turn, chunk_size matches at a time so that memory stays bounded
+    however large N is. Noise is folded into each side's chances, which gives the same distribution of matches as
+    flipping the moves.
+    :param players: MemoryOne rules and strategy classes with memory_one set, such as TitForTat, or an array of shape
+        (N, 4) of chances of cooperating after CC, CD, DC and DD, or (N, 5) with the chance on the first turn last
+    :param names: names for the players, which default to the names of the rules and classes, or MemoryOne<i>
+    :param pairwise: also keep payoffs, the N x N matrix of the mean payoff per turn of row i against column j, in
+        float32
+    """
+
+    def __init__(self, players, num_games_per_match=200, noise=False, payoff_matrix=None, seed=None,
+                 chunk_size=2 ** 20, pairwise=False, names=None, verbose=True, reporter=None):
+        if isinstance(players, np.ndarray):
+            if players.ndim != 2 or players.shape[1] not in (4, 5):
+                raise ValueError(f"Expected an array of shape (N, 4) or (N, 5), got {players.shape}")
+            rules = [MemoryOne(row[:4], row[4] if len(row) == 5 else 1.0) for row in players]
+        else:
+            rules = [MemoryOne.from_strategy(player) for player in players]
+        if names is None:
+            names = [f"MemoryOne{i}" if rule.name is None else rule.name for i, rule in enumerate(rules)]
+        if len(set(names)) != len(names):
+            raise ValueError("Every player needs a different name")
+        self.names = list(names)
+        self.probabilities = np.array([rule.probabilities for rule in rules]).reshape(-1, 4)
+        self.initial = np.array([rule.initial for rule in rules], dtype=np.float64)
+        self.num_games_per_match = num_games_per_match
+        self.noise = Tools.noise_model(noise)
+        self.payoff_matrix = PRISONERS_DILEMMA if payoff_matrix is None else payoff_matrix
+        self.chunk_size = chunk_size
+        self.pairwise = pairwise
+        self.rng = Tools.numpy_rng(None if seed is None else np.random.SeedSequence(seed))
+        if reporter is None:
+            reporter = TextReporter() if verbose else SilentReporter()
+        # Matches are not reported one by one. The reporter is there for the leaderboard.
+        self.reporter = reporter
+
+        rates, perception = MemoryOneSolver.noise_levels([self.noise])
+        sides = [noisy_chances(self.probabilities, self.initial, rates[0, side], perception[0]) for side in (0, 1)]
+        # Both sides' chances of cooperating in one table, player 1's indexed 4 * player + outcome and player 2's
+        # 4 * (N + player) + outcome. Player 2's are permuted so that the outcome is read from player 1's side.
+        self.chances = np.concatenate([sides[0][0].ravel(), sides[1][0][:, SWAPPED].ravel()]).astype(np.float32)
+        self.openings = np.concatenate([sides[0][1], sides[1][1]]).astype(np.float32)
+
+        payoffs = np.asarray(self.payoff_matrix.payoffs)
+        dtype = np.int64 if np.array_equal(payoffs, np.round(payoffs)) else np.float64
+        self.outcome_payoffs = np.stack([payoffs, payoffs[SWAPPED]], axis=1).astype(dtype)
+        self.totals = np.zeros(len(self.names), dtype=dtype)
+        self.payoffs = None
+        self.elapsed = 0.0
+
+    @property
+    def scores(self):
+        """dict of total score by name, as Tournament.run_tournament returns."""
+        return dict(zip(self.names, self.totals.tolist()))
+
+    def run_tournament(self):
+        """
+        Plays all N * N ordered pairs, including each player against itself, which is credited with player 1's score
+        only, as in Tournament.update_scores.
+        :return: dict
+        """
+        start_time = time.perf_counter()
+        size = len(self.names)
+        self.totals[:] = 0
+        if self.pairwise:
+            self.payoffs = np.zeros((size, size), dtype=np.float32)
+        buffers = None
+        for start in range(0, size * size, self.chunk_size):
+            matches = np.arange(start, min(start + self.chunk_size, size * size))
+            player1, player2 = np.divmod(matches, size)
+            if buffers is None or len(buffers['outcome']) != len(matches):
+                buffers = self.buffers(len(matches))
+            scores = self.play_chunk(player1, player2, buffers) @ self.outcome_payoffs
+            credited = np.where(player1 == player2, 0, scores[:, 1])
+            self.totals += (np.bincount(player1, scores[:, 0], size) + np.bincount(player2, credited, size)).astype(
+                self.totals.dtype)
+            if self.pairwise:
+                self.payoffs[player1, player2] += scores[:, 0] / (2 * self.num_games_per_match)
+                self.payoffs[player2, player1] += scores[:, 1] / (2 * self.num_games_per_match)
+        self.elapsed = time.perf_counter() - start_time
+        return self.scores
+
+    @staticmethod
+    def buffers(length):
+        """Arrays reused by every turn of a chunk of length matches."""
+        return {'index': np.empty((2, length), dtype=np.intp), 'chance': np.empty((2, length), dtype=np.float32),
+                'draws': np.empty((2, length), dtype=np.float32), 'defects': np.empty((2, length), dtype=bool),
+                'outcome': np.empty(length, dtype=np.intp), 'increment': np.empty(length, dtype=np.uint64),
+                'packed': np.empty(length, dtype=np.uint64)}
+
+    def play_chunk(self, player1, player2, buffers):
+        """
+        Plays the matches between player1[k] and player2[k] for every k at once, turn by turn.
+        :return: int64 array of shape (len(player1), 4), the number of turns each match ended CC, CD, DC and DD
+        """
+        index, chance, draws, defects, outcome, increment, packed = (buffers[name] for name in (
+            'index', 'chance', 'draws', 'defects', 'outcome', 'increment', 'packed'))
+        counts = np.zeros((len(player1), 4), dtype=np.int64)
+        # The outcomes are counted in four 16 bit fields of one integer per match, which is emptied into counts
+        # before it can overflow.
+        increments = np.array([1, 1 << 16, 1 << 32, 1 << 48], dtype=np.uint64)
+        packed[:] = 0
+        players = np.stack([player1, len(self.names) + player2])
+        bases = 4 * players
+
+        self.rng.random(out=draws, dtype=np.float32)
+        np.take(self.openings, players, out=chance)
+        np.greater_equal(draws, chance, out=defects)
+        for turn in range(1, self.num_games_per_match + 1):
+            # Outcome 2 * player 1's move + player 2's move, with defect as 1.
+            np.multiply(defects[0], 2, out=outcome)
+            np.add(outcome, defects[1], out=outcome)
+            np.take(increments, outcome, out=increment)
+            np.add(packed, increment, out=packed)
+            if turn % 0xFFFF == 0 or turn == self.num_games_per_match:
+                counts += (packed[:, None] >> np.array([0, 16, 32, 48], dtype=np.uint64) & 0xFFFF).astype(np.int64)
+                packed[:] = 0
+                if turn == self.num_games_per_match:
+                    break
+            self.rng.random(out=draws, dtype=np.float32)
+            np.add(bases, outcome, out=index)
+            np.take(self.chances, index, out=chance)
+            np.greater_equal(draws, chance, out=defects)
+        return counts
@@ -0,0 +1,219 @@
+import argparse
+import hashlib
+import importlib
+import inspect
+import json
+import os
+import sqlite3
+import sys
+import time
+
+DEFAULT_PATH = os.path.join(os.path.expanduser('~'), '.cache', 'game_theory', 'results.sqlite')
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+# The modules whose code can play a cached match. Besides GameTools' engines, the auto engine hands pairs of
+# finite-state machines to StateMachine.TableRunner and pairs of lookup tables to LookupTable.LookupRunner.
+ENGINE_MODULES = ('GameTools', 'StateMachine', 'LookupTable')
+
+
+class ResultCache:
+    """
+    A persistent, content-addressed store of match results. Only fixed pairs are stored, two deterministic strategies
+    playing without noise, so neither noise nor a seed can change an entry. Each entry is keyed by a hash of
+    everything else that decides the outcome: the source of both strategy classes (and the classes they inherit from),
+    the source of the ENGINE_MODULES, the number of games and the payoff matrix. Editing one strategy therefore only
+    invalidates the pairs it plays in.
+    Entries hold the two scores, the number of turns each player cooperated and, if store_interactions is set, the
+    moves of both players. The least recently used entries are evicted once the cache grows beyond max_bytes.
+    """
+
+    def __init__(self, path=DEFAULT_PATH, max_bytes=DEFAULT_MAX_BYTES, store_interactions=False):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.store_interactions = store_interactions
+        self.hits = 0
+        self.misses = 0
+        self._source_hashes = dict()
+        self._engine_hash = None
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.connection = sqlite3.connect(path)
+        self.connection.execute(
+            """CREATE TABLE IF NOT EXISTS results (
+                key TEXT PRIMARY KEY,
+                player1 TEXT NOT NULL,
+                player2 TEXT NOT NULL,
+                num_games INTEGER NOT NULL,
+                player1_score NUMERIC NOT NULL,
+                player2_score NUMERIC NOT NULL,
+                player1_moves BLOB,
+                player2_moves BLOB,
+                size INTEGER NOT NULL,
+                last_used INTEGER NOT NULL,
+                player1_cooperations INTEGER,
+                player2_cooperations INTEGER
+            )""")
+        self.connection.execute("CREATE INDEX IF NOT EXISTS results_last_used ON results (last_used)")
+        # Caches created before the cooperation counts were stored get the new columns, empty for the old entries.
+        columns = {row[1] for row in self.connection.execute("PRAGMA table_info(results)")}
+        for column in ('player1_cooperations', 'player2_cooperations'):
+            if column not in columns:
+                self.connection.execute(f"ALTER TABLE results ADD COLUMN {column} INTEGER")
+
+    def source_hash(self, strategy_class):
+        """
+        A hash of the source of the class and every class it inherits from. Returns None when the source cannot be
+        found, e.g. for classes defined in an interactive session, and such classes are never cached.
+        """
+        if strategy_class not in self._source_hashes:
+            digest = hashlib.sha256()
+            try:
+                for cls in strategy_class.__mro__[:-1]:
+                    digest.update(inspect.getsource(cls).encode())
+                self._source_hashes[strategy_class] = digest.hexdigest()
+            except (OSError, TypeError):
+                self._source_hashes[strategy_class] = None
+        return self._source_hashes[strategy_class]
+
+    def engine_hash(self):
+        """A hash of the source of the ENGINE_MODULES."""
+        if self._engine_hash is None:
+            digest = hashlib.sha256()
+            for name in ENGINE_MODULES:
+                digest.update(inspect.getsource(importlib.import_module(name)).encode())
+            self._engine_hash = digest.hexdigest()
+        return self._engine_hash
+
+    def key(self, strategy1, strategy2, num_games, payoff_matrix):
+        """The content address of a match, or None if either strategy cannot be hashed."""
+        sources = self.source_hash(strategy1), self.source_hash(strategy2)
+        if None in sources:
+            return None
+        fields = [*sources, self.engine_hash(), num_games, list(payoff_matrix.payoffs)]
+        return hashlib.sha256(json.dumps(fields).encode()).hexdigest()
+
+    def get(self, key):
+        """
+        :return: (player 1 score, player 2 score), or None on a miss
+        """
+        row = self.connection.execute(
+            "SELECT player1_score, player2_score FROM results WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.connection.execute("UPDATE results SET last_used = ? WHERE key = ?", (time.time_ns(), key))
+        return row[0], row[1]
+
+    def get_cooperations(self, key):
+        """
+        :return: (player 1 cooperations, player 2 cooperations), or None if they were not stored
+        """
+        row = self.connection.execute(
+            "SELECT player1_cooperations, player2_cooperations FROM results WHERE key = ?", (key,)).fetchone()
+        if row is None or row[0] is None:
+            return None
+        return row[0], row[1]
+
+    def get_interactions(self, key):
+        """
+        :return: (player 1 moves, player 2 moves) as bytes of Action codes, or None if they were not stored
+        """
+        row = self.connection.execute(
+            "SELECT player1_moves, player2_moves FROM results WHERE key = ?", (key,)).fetchone()
+        if row is None or row[0] is None:
+            return None
+        return bytes(row[0]), bytes(row[1])
+
+    def put(self, key, player1_name, player2_name, num_games, player1_score, player2_score, interactions=None,
+            cooperations=(None, None)):
+        player1_moves = player2_moves = None
+        if self.store_interactions and interactions is not None:
+            player1_moves, player2_moves = (bytes(moves) for moves in interactions)
+        size = len(key) + len(player1_name) + len(player2_name) + 64
+        if player1_moves is not None:
+            size += len(player1_moves) + len(player2_moves)
+        self.connection.execute(
+            """INSERT OR REPLACE INTO results (key, player1, player2, num_games, player1_score, player2_score,
+                                               player1_moves, player2_moves, size, last_used, player1_cooperations,
+                                               player2_cooperations)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+            (key, player1_name, player2_name, num_games, player1_score, player2_score, player1_moves, player2_moves,
+             size, time.time_ns(), *cooperations))
+
+    def total_bytes(self):
+        return self.connection.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+
+    def prune(self, max_bytes=None):
+        """
+        Evicts the least recently used entries until the cache fits in max_bytes.
+        :return: int (number of entries evicted)
+        """
+        max_bytes = self.max_bytes if max_bytes is None else max_bytes
+        kept = 0
+        evicted = list()
+        for key, size in self.connection.execute("SELECT key, size FROM results ORDER BY last_used DESC"):
+            kept += size
+            if kept > max_bytes:
+                evicted.append((key,))
+        self.connection.executemany("DELETE FROM results WHERE key = ?", evicted)
+        self.connection.commit()
+        return len(evicted)
+
+    def entries(self):
+        """
+        :return: list of tuples of str (player 1), str (player 2), int (number of games), player 1 score,
+            player 2 score, int (size in bytes), int (last used, in nanoseconds since the epoch), most recent first
+        """
+        return self.connection.execute(
+            """SELECT player1, player2, num_games, player1_score, player2_score, size, last_used
+               FROM results ORDER BY last_used DESC""").fetchall()
+
+    def clear(self):
+        self.connection.execute("DELETE FROM results")
+        self.connection.commit()
+
+    def commit(self):
+        """Writes pending entries to disk and evicts whatever no longer fits."""
+        self.prune()
+
+    def close(self):
+        self.commit()
+        self.connection.close()
+
+    def __len__(self):
+        return self.connection.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Inspect and prune the persistent match result cache.")
+    parser.add_argument('--path', default=DEFAULT_PATH, help=f"cache file (default: {DEFAULT_PATH})")
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('stats', help="number of entries and size on disk")
+    list_parser = commands.add_parser('list', help="entries, most recently used first")
+    list_parser.add_argument('--limit', type=int, default=50)
+    prune_parser = commands.add_parser('prune', help="evict least recently used entries")
+    prune_parser.add_argument('--max-bytes', type=int, default=DEFAULT_MAX_BYTES)
+    commands.add_parser('clear', help="remove every entry")
+    args = parser.parse_args(argv)
+
+    cache = ResultCache(args.path)
+    if args.command == 'stats':
+        file_size = os.path.getsize(args.path) if os.path.exists(args.path) else 0
+        print(f"{'Path':>12}: {args.path}")
+        print(f"{'Entries':>12}: {len(cache)}")
+        print(f"{'Entry bytes':>12}: {cache.total_bytes()}")
+        print(f"{'File bytes':>12}: {file_size}")
+    elif args.command == 'list':
+        for player1, player2, num_games, player1_score, player2_score, size, last_used in cache.entries()[:args.limit]:
+            used = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(last_used / 1e9))
+            print(f"{player1:>20} vs {player2:<20} {num_games:>8} games {player1_score:>10} : {player2_score:<10} "
+                  f"{size:>8} bytes  {used}")
+    elif args.command == 'prune':
+        print(f"Evicted {cache.prune(args.max_bytes)} entries")
+    elif args.command == 'clear':
+        cache.clear()
+    cache.close()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
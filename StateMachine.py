@@ -0,0 +1,165 @@
+import numpy as np
+
+from GameTools import ACTIONS, PRISONERS_DILEMMA, Action, Tools
+
+
+class FiniteStateMachine:
+    """
+    A strategy as a table: each state has a move to play, and the opponent's move decides the next state. The match
+    starts in state 0.
+    :param outputs: the move played in each state, as C or D labels or Action codes
+    :param transitions: for each state, the next state after the opponent cooperates and after it defects
+    :param horizon: None if the machine plays like its strategy in matches of any length, otherwise the longest match
+        it is exact for
+    """
+
+    def __init__(self, outputs, transitions, horizon=None):
+        self.outputs = np.array([ACTIONS[output] for output in outputs], dtype=np.int8)
+        self.transitions = np.asarray(transitions, dtype=np.int32)
+        if self.transitions.shape != (len(self.outputs), 2):
+            raise ValueError(f"Expected a pair of next states for each of the {len(self.outputs)} states, got shape "
+                             f"{self.transitions.shape}")
+        if not ((0 <= self.transitions) & (self.transitions < len(self.outputs))).all():
+            raise ValueError("Transitions lead to states that do not exist")
+        # The same tables as Python values, for stepping one match at a time.
+        self.actions = tuple(Action(output) for output in self.outputs.tolist())
+        self.next_states = tuple(map(tuple, self.transitions.tolist()))
+        self.horizon = horizon
+
+    def __len__(self):
+        return len(self.outputs)
+
+    @classmethod
+    def from_step(cls, step, start, turns=None):
+        """
+        Compiles a strategy written as a function on hashable states, by enumerating the states it can reach.
+        :param step: function (state, opponent Action) -> (next state, Action played in it)
+        :param start: the state of the first turn and the Action played in it
+        :param turns: the length of the longest match to compile for, for strategies with unbounded counters. States
+            reached only after that many turns are left out. Without it, every reachable state is compiled.
+        """
+        ids = {start[0]: 0}
+        outputs = [start[1]]
+        transitions = [[0, 0]]
+        frontier = [start[0]]
+        depth = 1
+        while frontier and (turns is None or depth < turns):
+            next_frontier = []
+            for state in frontier:
+                for opponent_action in (Action.COOPERATE, Action.DEFECT):
+                    next_state, action = step(state, opponent_action)
+                    if next_state not in ids:
+                        ids[next_state] = len(outputs)
+                        outputs.append(action)
+                        # Left pointing at itself if it is never expanded.
+                        transitions.append([len(outputs) - 1] * 2)
+                        next_frontier.append(next_state)
+                    transitions[ids[state]][opponent_action] = ids[next_state]
+            frontier = next_frontier
+            depth += 1
+        return cls(outputs, transitions, horizon=turns if frontier else None)
+
+    def check_horizon(self, num_games):
+        if self.horizon is not None and num_games > self.horizon:
+            raise ValueError(f"The machine is only exact for matches of up to {self.horizon} turns, not {num_games}")
+
+    def play(self, opponent_actions):
+        """
+        :param opponent_actions: the opponent's moves as Action codes
+        :return: list of the Actions played against them, one per opponent move
+        """
+        state = 0
+        played = []
+        for opponent_action in opponent_actions:
+            played.append(self.actions[state])
+            state = self.next_states[state][opponent_action]
+        return played
+
+
+class CompiledMachine:
+    """
+    A finite_state_machine class attribute that is compiled with FiniteStateMachine.from_step the first time it is
+    read, so that importing Strategies does not pay for compiling machines that are never used.
+    """
+
+    def __init__(self, step, start, turns=None):
+        self.arguments = (step, start, turns)
+        self.machine = None
+
+    def __get__(self, instance, owner=None):
+        if self.machine is None:
+            self.machine = FiniteStateMachine.from_step(*self.arguments)
+        return self.machine
+
+
+class TableRunner:
+    """
+    Plays many matches between finite-state machines at once. Every machine in a batch is stacked into one table, and
+    each turn is a lookup of every player's move and next state, so the matches advance in lockstep without any
+    Python code per match. run_matches takes the same arguments and gives the same results as ArrayRunner's.
+    """
+
+    def __init__(self, num_games, noise=False, payoff_matrix=PRISONERS_DILEMMA):
+        self.num_games = num_games
+        self.noise = Tools.noise_model(noise)
+        self.payoff_matrix = payoff_matrix
+
+    @staticmethod
+    def machine(player):
+        if isinstance(player, FiniteStateMachine):
+            return player
+        if getattr(player, 'finite_state_machine', None) is None:
+            raise ValueError(f"{player.__name__} has no finite_state_machine")
+        return player.finite_state_machine
+
+    def run_matches(self, pairs, seeds=None):
+        """
+        Play every pair at once.
+        :param pairs: list of pairs of FiniteStateMachines or of strategy classes with finite_state_machine set
+        :param seeds: optional SeedSequence for each pair, from which the noise of that match is drawn
+        :return: int8 array of shape (num_games + 1, 2 * len(pairs)) holding the moves played and, in the last row,
+            the next move each machine would make. Columns are player 1 sides followed by player 2 sides.
+            int64 array of the 2 * len(pairs) scores in the same column order.
+        """
+        num_pairs = len(pairs)
+        sides = [self.machine(pair[0]) for pair in pairs] + [self.machine(pair[1]) for pair in pairs]
+        # Stack the tables of the distinct machines, each column starting in the first state of its own.
+        offsets = dict()
+        total = 0
+        for machine in sides:
+            if id(machine) not in offsets:
+                machine.check_horizon(self.num_games)
+                offsets[id(machine)] = (total, machine)
+                total += len(machine)
+        outputs = np.concatenate([machine.outputs for _, machine in offsets.values()])
+        transitions = np.concatenate([machine.transitions + offset for offset, machine in offsets.values()]).ravel()
+        state = np.array([offsets[id(machine)][0] for machine in sides], dtype=np.intp)
+        opponents = np.concatenate([np.arange(num_pairs, 2 * num_pairs), np.arange(num_pairs)])
+
+        flips = None
+        perception = False
+        if self.noise is not None:
+            flips = np.empty((self.num_games, 2 * num_pairs), dtype=np.int8)
+            rng = Tools.numpy_rng() if seeds is None else None
+            for k in range(num_pairs):
+                match_rng = rng if seeds is None else Tools.numpy_rng(seeds[k])
+                flips[:, [k, k + num_pairs]] = self.noise.sample(self.num_games, match_rng)
+            perception = self.noise.perception
+
+        moves = np.empty((self.num_games + 1, 2 * num_pairs), dtype=np.int8)
+        for t in range(self.num_games):
+            played = moves[t]
+            np.take(outputs, state, out=played)
+            if flips is not None and not perception:
+                played ^= flips[t]
+            seen = played[opponents]
+            if perception:
+                seen ^= flips[t]
+            # Each state has two rows of the flattened table, one per opponent move.
+            state = transitions[2 * state + seen]
+        np.take(outputs, state, out=moves[-1])
+
+        own = moves[:-1].astype(np.intp)
+        payoffs = np.asarray(self.payoff_matrix.payoffs)
+        scores = payoffs[2 * own + own[:, opponents]].sum(axis=0)
+        return moves, scores
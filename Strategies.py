@@ -1,58 +1,133 @@
+import inspect
+
 from GameTools import *
-import statistics
-C = "Cooperate"
-D = "Defect"
+from LookupTable import LookupTable
+from StateMachine import CompiledMachine, FiniteStateMachine
+
+# Every strategy class defined with a class statement, by name, in the order they were defined. Classes register
+# themselves as they are defined, unless they pass register=False, see Strategy.__init_subclass__.
+REGISTRY = dict()
 
 
 class Strategy:
+    # Instances only hold the attributes named in __slots__: these, and the counters each subclass adds to its own
+    # __slots__. Every subclass declares __slots__, if only as (), so that no instance carries a __dict__.
+    __slots__ = ('name', 'init_choice', '_choice', 'history', 'payoff_matrix', 'rng')
+    # Strategies that draw random numbers set this to False. Pairs of deterministic strategies are played once without
+    # noise, then cached and shared by the tournament's later matches between them.
+    deterministic = True
+    # The number of previous turns the next move depends on, math.inf if it can depend on the whole match.
+    memory_depth = math.inf
+    # Strategies that play differently towards the end of a match, assuming that it lasts 200 turns, set this to True.
+    uses_match_length = False
+    # The place of the strategies entered in Axelrod's first tournament (Axelrod 1980), None for the rest.
+    first_tournament_rank = None
+    # Strategies written for the tests, or not implemented yet, set this to False and are left out of STRATEGY_SETS.
+    tournament_ready = True
+    # Strategies whose next move depends only on the last turn give their chances of cooperating after CC, CD, DC and
+    # DD (own move first) and on the first turn, so MemoryOne.MemoryOneSolver can score them exactly.
+    memory_one = None
+    # Strategies that are finite-state machines, or can be compiled into one, give it as a FiniteStateMachine so the
+    # TableRunner can play them. Machines that only play like the class without noise set machine_follows_noise to
+    # False.
+    finite_state_machine = None
+    machine_follows_noise = True
+    # Strategies that answer the last k moves of both players from a table give it as a LookupTable.
+    lookup_table = None
+
+    def __init_subclass__(cls, register=True, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if register:
+            REGISTRY[cls.__name__] = cls
+
     def __init__(self, name, init_choice):
         self.name = name
-        self._choice = init_choice
-        self.history = {'own': [], 'opp': []}
+        self.init_choice = ACTIONS[init_choice]
+        self.reset()
+
+    @classmethod
+    def fast_paths(cls):
+        """
+        The engines that can play the strategy without stepping through its objects, read without compiling a
+        CompiledMachine.
+        :return: tuple of 'array' (array_kernel), 'table' (finite_state_machine), 'lookup' (lookup_table) and
+            'memory_one', for the exact scores of MemoryOne.MemoryOneSolver
+        """
+        attributes = (('array', 'array_kernel'), ('table', 'finite_state_machine'), ('lookup', 'lookup_table'),
+                      ('memory_one', 'memory_one'))
+        return tuple(path for path, attribute in attributes
+                     if inspect.getattr_static(cls, attribute, None) is not None)
+
+    def reset(self):
+        """
+        Returns the strategy to where it was before its first move, so that one object can play any number of matches
+        without anything carrying over from one to the next. Subclasses that keep counters of their own extend it,
+        calling super().reset() first, and set those counters here rather than in __init__.
+        """
+        self._choice = self.init_choice
+        # Replaced by a shared history when the GameRunner starts a match between two fresh players.
+        self.history = MatchHistory().view(0)
+        # Replaced by the GameRunner with the matrix of the game being played.
+        self.payoff_matrix = PRISONERS_DILEMMA
+        # The generator random choices are drawn from. Replaced by the GameRunner with a seeded one in a seeded game.
+        self.rng = random
 
     @property
     def choice(self):
-        raise NotImplementedError("Subclasses must implement the set_choice method")
+        """The next choice as a C or D label. Stored internally as an Action code."""
+        return LABELS[self._choice]
 
     @choice.setter
     def choice(self, value):
-        """The choice parameter is set by the run_game method within the GameRunner class. This is the previous choice
-        set by the opponent."""
-        self._choice = value
-        raise NotImplementedError("Subclasses must implement the set_choice method")
+        """The choice parameter is set by the strategy method after each game. Accepts either a C or D label or an
+        Action code."""
+        self._choice = ACTIONS[value]
+
+    @property
+    def action(self):
+        """The next choice as an Action code, for the engines and payoff tables."""
+        return self._choice
 
     def history_data(self, opponent_choice, own_choice):
-        self.history['own'].append(own_choice)
-        self.history['opp'].append(opponent_choice)
-        raise NotImplementedError("Subclasses must implement the set_choice method")
+        self.history['own'].append(ACTIONS[own_choice])
+        self.history['opp'].append(ACTIONS[opponent_choice])
 
     def strategy(self):
         raise NotImplementedError("Subclasses must implement the make_choice method")
 
+    # Deterministic strategies whose next choices depend on a bounded amount of information may also define
+    # state(), returning a hashable summary of everything that decides their future choices. The GameRunner uses it
+    # to spot a match that has settled into a cycle and skip ahead.
+
+    def skip(self, turns):
+        """Called when the GameRunner skips whole cycles of a match. The history has already been extended, so only
+        counters kept outside the history need to be advanced here."""
+        pass
+
 
 class TitForTat(Strategy):
     """The strategy of do unto thee what was done unto me. Not really an eye-for-an because it is not vengeance
      that is sought, but more that this strategy is not a push-over.
      A 'NICE' strategy in that we start peacefully until provoked."""
 
+    __slots__ = ()
+    memory_depth = 1
+    first_tournament_rank = 1
+    memory_one = (1, 0, 1, 0, 1)
+
     def __init__(self):
         super().__init__("TitForTat", C)
 
-    @property
-    def choice(self):
+    def state(self):
         return self._choice
 
-    @choice.setter
-    def choice(self, new_choice):
-        self._choice = new_choice
-
-    def history_data(self, opponent_choice, own_choice):
-        self.history['own'].append(own_choice)
-        self.history['opp'].append(opponent_choice)
-
     def strategy(self):
         self.choice = self.history['opp'][-1]
 
+    @staticmethod
+    def array_kernel(own, opp, t, memory):
+        return opp[t - 1]
+
 
 class AlwaysDefect(Strategy):
     """The strategy of the logical. This strategy is not a push-over and never will be. It is also unforgiving.
@@ -60,48 +135,46 @@ class AlwaysDefect(Strategy):
     involved with the selection of the cooperative choice. While not the most optimal, it will guarantee points.
     A 'NOT NICE' strategy in that we start and end with provocation."""
 
+    __slots__ = ()
+    memory_depth = 0
+    memory_one = (0, 0, 0, 0, 0)
+
     def __init__(self):
         super().__init__("AlwaysDefect", D)
 
-    @property
-    def choice(self):
+    def state(self):
         return self._choice
 
-    @choice.setter
-    def choice(self, new_choice):
-        self._choice = new_choice
-
-    def history_data(self, opponent_choice, own_choice):
-        self.history['own'].append(own_choice)
-        self.history['opp'].append(opponent_choice)
-
     def strategy(self):
         self.choice = D
 
+    @staticmethod
+    def array_kernel(own, opp, t, memory):
+        return DEFECT
+
 
 class AlwaysCooperate(Strategy):
     """The strategy of do only kindness unto all.This strategy is a push-over but has the potential to score the
     highest.
      A 'NICE' strategy in that we start and end peacefully."""
 
+    __slots__ = ()
+    memory_depth = 0
+    memory_one = (1, 1, 1, 1, 1)
+
     def __init__(self):
         super().__init__("AlwaysCooperate", C)
 
-    @property
-    def choice(self):
+    def state(self):
         return self._choice
 
-    @choice.setter
-    def choice(self, new_choice):
-        self._choice = new_choice
-
-    def history_data(self, opponent_choice, own_choice):
-        self.history['own'].append(own_choice)
-        self.history['opp'].append(opponent_choice)
-
     def strategy(self):
         self.choice = C
 
+    @staticmethod
+    def array_kernel(own, opp, t, memory):
+        return COOPERATE
+
 
 class GenerousTitForTat(Strategy):
     """The strategy of do unto thee what was done unto me but let's not get ourselves tied up in a circular argument
@@ -109,52 +182,49 @@ class GenerousTitForTat(Strategy):
     A 'NICE' strategy in that we start peacefully until provoked but if we continue in a cycle of punishment, it will
     sacrifice a move for the greater good."""
 
+    __slots__ = ()
+    memory_depth = 10
+
     def __init__(self):
         super().__init__("GenerousTitForTat", C)
         # self.historic_choices = list()
 
-    @property
-    def choice(self):
-        return self._choice
-
-    @choice.setter
-    def choice(self, new_choice):
-        self._choice = new_choice
-
-    def history_data(self, opponent_choice, own_choice):
-        self.history['own'].append(own_choice)
-        self.history['opp'].append(opponent_choice)
+    def state(self):
+        return self._choice, self.history['own'].actions()[-10:].tobytes()
 
     def strategy(self):
         # Check own historical selections and make a choice
         try:
-            if self.history['own'][-10:].count(D) >= 10:
+            if self.history['own'].window_count(10, D) >= 10:
                 self.choice = C
             else:
                 self.choice = self.history['opp'][-1]
         except IndexError:
             self.choice = self.history['opp'][-1]
 
+    @staticmethod
+    def array_kernel(own, opp, t, memory):
+        if t >= 10:
+            return np.where(own[t - 10:t].all(axis=0), COOPERATE, opp[t - 1])
+        return opp[t - 1]
+
 
 class Grudger(Strategy):
     """The strategy of do nice unto others until betrayed. This strategy is not a push-over.
      A 'NICE' strategy in that we start peacefully until provoked. Once provoked it is unforgiving"""
 
+    __slots__ = ()
+    first_tournament_rank = 7
+
+    # Cooperates until the opponent defects, then defects for good.
+    finite_state_machine = FiniteStateMachine([C, D], [[0, 1], [1, 1]])
+
     def __init__(self):
         super().__init__("Grudger", C)
 
-    @property
-    def choice(self):
+    def state(self):
         return self._choice
 
-    @choice.setter
-    def choice(self, new_choice):
-        self._choice = new_choice
-
-    def history_data(self, opponent_choice, own_choice):
-        self.history['own'].append(own_choice)
-        self.history['opp'].append(opponent_choice)
-
     def strategy(self):
         # print(D in self.history['opp'])
         if D in self.history['opp']:
@@ -162,28 +232,28 @@ class Grudger(Strategy):
         else:
             self.choice = C
 
+    @staticmethod
+    def array_kernel(own, opp, t, memory):
+        grudge = memory.setdefault('grudge', np.zeros(opp.shape[1], dtype=np.int8))
+        grudge |= opp[t - 1]
+        return grudge
+
 
 class Joss(Strategy):
     """Similar to Tit-For-tat in that it will start out as Cooperative and will mimic the opponent.
     However, as a sneaky little side hustle, Joss will Defect around 10% of the time."""
 
+    __slots__ = ()
+    memory_depth = 1
+    first_tournament_rank = 12
+    deterministic = False
+    memory_one = (0.9, 0, 0.9, 0, 1)
+
     def __init__(self):
         super().__init__("Joss", C)
 
-    @property
-    def choice(self):
-        return self._choice
-
-    @choice.setter
-    def choice(self, new_choice):
-        self._choice = new_choice
-
-    def history_data(self, opponent_choice, own_choice):
-        self.history['own'].append(own_choice)
-        self.history['opp'].append(opponent_choice)
-
     def strategy(self):
-        if random.randint(1, 10) == 1:
+        if self.rng.randint(1, 10) == 1:
             self.choice = D
         else:
             if self.history['opp']:
@@ -194,21 +264,21 @@ class Graaskamp(Strategy):
     """Similar to Joss in that it will start out as Cooperative and mimic the opponent.
     However, Graaskamp will defect every 50th round."""
 
+    __slots__ = ('round',)
+    first_tournament_rank = 9
+
     def __init__(self):
         super().__init__("Graaskamp", C)
-        self.round = int()
 
-    @property
-    def choice(self):
-        return self._choice
+    def reset(self):
+        super().reset()
+        self.round = 0
 
-    @choice.setter
-    def choice(self, new_choice):
-        self._choice = new_choice
+    def state(self):
+        return self._choice, self.round % 50
 
-    def history_data(self, opponent_choice, own_choice):
-        self.history['own'].append(own_choice)
-        self.history['opp'].append(opponent_choice)
+    def skip(self, turns):
+        self.round += turns
 
     def strategy(self):
         self.round += 1
@@ -217,6 +287,11 @@ class Graaskamp(Strategy):
         else:
             self.choice = self.history['opp'][-1]
 
+    @staticmethod
+    def array_kernel(own, opp, t, memory):
+        # The round counter is the number of turns played.
+        return DEFECT if t % 50 == 0 else opp[t - 1]
+
 
 class TidemanChieruzzi(Strategy):
     """
@@ -231,28 +306,27 @@ class TidemanChieruzzi(Strategy):
     See https://github.com/Axelrod-Python/Axelrod/issues/1105
     """
 
+    __slots__ = ('retaliation_counter', 'retaliations', 'fresh_start', 'fresh_start_counter', 'my_points',
+                 'their_points', 'games_counter', 'own_defect_history', 'own_proportion')
+    uses_match_length = True
+    first_tournament_rank = 2
+
     def __init__(self):
+        # Tests its own cooperations against a 70% chance of cooperating.
+        self.own_proportion = ProportionTest(0.7)
         super().__init__("TidemanChieruzzi", C)
+
+    def reset(self):
+        super().reset()
         self.retaliation_counter = 0
         self.retaliations = 0
-        self.fresh_start = bool()
+        self.fresh_start = False
         self.fresh_start_counter = 0
         self.my_points = 0
         self.their_points = 0
         self.games_counter = 0
-        self.own_defect_history = bool()
-
-    @property
-    def choice(self):
-        return self._choice
-
-    @choice.setter
-    def choice(self, new_choice):
-        self._choice = new_choice
-
-    def history_data(self, opponent_choice, own_choice):
-        self.history['own'].append(own_choice)
-        self.history['opp'].append(opponent_choice)
+        self.own_defect_history = False
+        self.own_proportion.reset()
 
     def set_fresh_start_condition(self, my_choice, opp_choice):
         """The opponent is given a ‘fresh start’ if:
@@ -269,10 +343,12 @@ class TidemanChieruzzi(Strategy):
             """
         self.fresh_start_counter += 1
         self.games_counter += 1
-        self.my_points += Tools.calculate_payoff(my_choice, opp_choice)
-        self.their_points += Tools.calculate_payoff(opp_choice, my_choice)
+        my_action, opp_action = ACTIONS[my_choice], ACTIONS[opp_choice]
+        payoffs = self.payoff_matrix.payoffs
+        self.my_points += payoffs[2 * my_action + opp_action]
+        self.their_points += payoffs[2 * opp_action + my_action]
         try:
-            self.own_defect_history = self.history['own'][-2:].count(D) == 2
+            self.own_defect_history = self.history['own'].window_count(2, D) == 2
         except IndexError:
             self.own_defect_history = False
 
@@ -281,10 +357,10 @@ class TidemanChieruzzi(Strategy):
                 and self.own_defect_history
                 and self.fresh_start_counter > 20
                 and self.games_counter < 190
-                and Tools.compare_samples(Tools.random_5050_sample(self.games_counter, 0.7), self.history['own']))
+                and self.own_proportion.sync(self.history['own']).differs())
 
     def strategy(self):
-        self.set_fresh_start_condition(self.choice, self.history['opp'][-1])
+        self.set_fresh_start_condition(self.action, self.history['opp'][-1])
 
         if self.history['opp'][-1] == D:
             self.retaliations += 1
@@ -308,27 +384,30 @@ class Nydegger(Strategy):
         If the opponent has defected in three or more of the last five moves, Nydegger will defect.
         Otherwise, it will cooperate."""
 
+    __slots__ = ()
+    memory_depth = 5
+    first_tournament_rank = 3
+
     def __init__(self):
         super().__init__("Nydegger", C)
 
-    @property
-    def choice(self):
-        return self._choice
-
-    @choice.setter
-    def choice(self, new_choice):
-        self._choice = new_choice
-
-    def history_data(self, opponent_choice, own_choice):
-        self.history['own'].append(own_choice)
-        self.history['opp'].append(opponent_choice)
+    def state(self):
+        return self._choice, self.history['opp'].actions()[-4:].tobytes()
 
     def strategy(self):
         if len(self.history['opp']) >= 5:
-            self.choice = statistics.mode(self.history['opp'][-5:])
+            # The mode of the last five moves is whichever made up at least three of them.
+            self.choice = D if self.history['opp'].window_count(5, D) >= 3 else C
         else:
             self.choice = C
 
+    @staticmethod
+    def array_kernel(own, opp, t, memory):
+        if t >= 5:
+            # The mode of five moves is whichever made up at least three of them.
+            return opp[t - 5:t].sum(axis=0) >= 3
+        return COOPERATE
+
 
 class TitForTwoTats(Strategy):
     """
@@ -339,87 +418,48 @@ class TitForTwoTats(Strategy):
         If the opponent has defected both times, Sample will defect.
         Otherwise, it will cooperate."""
 
-    def __init__(self):
-        super().__init__("TitForTwoTats", C)
+    __slots__ = ()
+    memory_depth = 2
 
-    @property
-    def choice(self):
-        return self._choice
+    # Cooperating, cooperating after one defection, defecting after two in a row.
+    finite_state_machine = FiniteStateMachine([C, C, D], [[0, 1], [0, 2], [0, 2]])
 
-    @choice.setter
-    def choice(self, new_choice):
-        self._choice = new_choice
+    def __init__(self):
+        super().__init__("TitForTwoTats", C)
 
-    def history_data(self, opponent_choice, own_choice):
-        self.history['own'].append(own_choice)
-        self.history['opp'].append(opponent_choice)
+    def state(self):
+        return self._choice, self.history['opp'].actions()[-1:].tobytes()
 
     def strategy(self):
         if len(self.history['opp']) >= 2:
-            if self.history['opp'][-2:].count(D) == 2:
+            if self.history['opp'].window_count(2, D) == 2:
                 self.choice = D
             else:
                 self.choice = C
         else:
             self.choice = C
 
+    @staticmethod
+    def array_kernel(own, opp, t, memory):
+        if t >= 2:
+            return opp[t - 2] & opp[t - 1]
+        return COOPERATE
+
 
 class Random(Strategy):
     """Straight up random"""
 
-    def __init__(self):
-        super().__init__("Random", C)
-
-    @property
-    def choice(self):
-        return self._choice
-
-    @choice.setter
-    def choice(self, new_choice):
-        self._choice = new_choice
-
-    def history_data(self, opponent_choice, own_choice):
-        self.history['own'].append(own_choice)
-        self.history['opp'].append(opponent_choice)
-
-    def strategy(self):
-        self.choice = random.choice([D, C])
-
-
-class Grofman(Strategy):
-    """
-    Submitted to Axelrod’s first tournament by Bernard Grofman.
-
-    The description written in [Axelrod1980] is:
-
-    “If the players did different things on the previous move, this rule cooperates with probability 2/7.
-    Otherwise, this rule always cooperates.”
-    This strategy came 4th in Axelrod’s original tournament.
-    """
+    __slots__ = ()
+    memory_depth = 0
+    first_tournament_rank = 15
+    deterministic = False
+    memory_one = (0.5, 0.5, 0.5, 0.5, 1)
 
     def __init__(self):
-        super().__init__("Grofman", C)
-
-    @property
-    def choice(self):
-        return self._choice
-
-    @choice.setter
-    def choice(self, new_choice):
-        self._choice = new_choice
-
-    def history_data(self, opponent_choice, own_choice):
-        self.history['own'].append(own_choice)
-        self.history['opp'].append(opponent_choice)
+        super().__init__("Random", C)
 
     def strategy(self):
-        if len(self.history['opp']) > 1:
-            if self.history['opp'][-1] != self.history['opp'][-2]:
-                self.choice = random.choices([C, D], weights=[0.71, 0.29])[0]
-            else:
-                self.choice = C
-        else:
-            self.choice = C
+        self.choice = self.rng.choice([D, C])
 
 
 class Shubik(Strategy):
@@ -433,22 +473,40 @@ class Shubik(Strategy):
 
     """
 
+    __slots__ = ('retaliation_counter', 'retaliations')
+    first_tournament_rank = 5
+
+    @staticmethod
+    def machine_step(state, opponent_action):
+        """A step of the strategy on (choice, retaliations, retaliation counter), the same as strategy()."""
+        choice, retaliations, retaliation_counter = state
+        if opponent_action == DEFECT:
+            retaliations += 1
+            retaliation_counter = retaliations
+            choice = DEFECT
+        else:
+            if retaliation_counter > 0:
+                retaliation_counter -= 1
+            choice = DEFECT if retaliation_counter else COOPERATE
+        if retaliation_counter > 0:
+            retaliation_counter -= 1
+        return (choice, retaliations, retaliation_counter), choice
+
+    # The retaliations grow without bound, so the machine is compiled for matches of up to 200 turns (about 7000
+    # states), when it is first used. FiniteStateMachine.from_step(Shubik.machine_step, ...) compiles it for longer
+    # ones.
+    finite_state_machine = CompiledMachine(machine_step, ((COOPERATE, 0, 0), COOPERATE), 200)
+
     def __init__(self):
         super().__init__("Shubik", C)
+
+    def reset(self):
+        super().reset()
         self.retaliation_counter = 0
         self.retaliations = 0
 
-    @property
-    def choice(self):
-        return self._choice
-
-    @choice.setter
-    def choice(self, new_choice):
-        self._choice = new_choice
-
-    def history_data(self, opponent_choice, own_choice):
-        self.history['own'].append(own_choice)
-        self.history['opp'].append(opponent_choice)
+    def state(self):
+        return self._choice, self.retaliations, self.retaliation_counter
 
     def strategy(self):
         if self.history['opp'][-1] == D:
@@ -463,6 +521,18 @@ class Shubik(Strategy):
         if self.retaliation_counter > 0:
             self.retaliation_counter -= 1
 
+    @staticmethod
+    def array_kernel(own, opp, t, memory):
+        retaliations = memory.setdefault('retaliations', np.zeros(opp.shape[1], dtype=np.int64))
+        retaliation_counter = memory.setdefault('retaliation_counter', np.zeros(opp.shape[1], dtype=np.int64))
+        defected = opp[t - 1] == DEFECT
+        retaliations += defected
+        retaliation_counter[defected] = retaliations[defected]
+        retaliation_counter -= ~defected & (retaliation_counter > 0)
+        choice = defected | (retaliation_counter > 0)
+        retaliation_counter -= retaliation_counter > 0
+        return choice
+
 
 class WinStayLooseShift(Strategy):
     """
@@ -478,27 +548,30 @@ class WinStayLooseShift(Strategy):
     its behavior and defects in the next round.
     """
 
+    __slots__ = ('payoff',)
+    memory_depth = 1
+    memory_one = (1, 0, 0, 1, 1)
+
     def __init__(self):
         super().__init__("WinStayLooseShift", C)
+
+    def reset(self):
+        super().reset()
         self.payoff = 'R'
 
-    @property
-    def choice(self):
+    def state(self):
         return self._choice
 
-    @choice.setter
-    def choice(self, new_choice):
-        self._choice = new_choice
-
-    def history_data(self, opponent_choice, own_choice):
-        self.history['own'].append(own_choice)
-        self.history['opp'].append(opponent_choice)
-
     def strategy(self):
         if self.history['opp']:
             self.payoff = Tools.get_payoff_type(self.history['own'][-1], self.history['opp'][-1])
         self.choice = (C if self.payoff in ['R', 'P'] else D)
 
+    @staticmethod
+    def array_kernel(own, opp, t, memory):
+        # R and P are the payoffs where both players made the same choice.
+        return own[t - 1] ^ opp[t - 1]
+
 
 class Benjo(Strategy):
     """
@@ -507,31 +580,31 @@ class Benjo(Strategy):
     I'm leaving it here to explore.
     """
 
+    __slots__ = ('payoff',)
+
     def __init__(self):
         super().__init__("Benjo", C)
-        self.payoff = 'R'
-
-    @property
-    def choice(self):
-        return self._choice
-
-    @choice.setter
-    def choice(self, new_choice):
-        self._choice = new_choice
 
-    def history_data(self, opponent_choice, own_choice):
-        self.history['own'].append(own_choice)
-        self.history['opp'].append(opponent_choice)
+    def reset(self):
+        super().reset()
+        self.payoff = 'R'
 
     def strategy(self):
         if len(self.history['opp']) >= 2:
-            if self.history['opp'][-2:].count(D) == 2:
+            if self.history['opp'].window_count(2, D) == 2:
                 self.choice = D
             else:
-                self.choice = statistics.mode(self.history['opp'])
+                self.choice = self.history['opp'].mode()
         else:
             self.choice = C
 
+    @staticmethod
+    def array_kernel(own, opp, t, memory):
+        mode = ArrayRunner.running_mode(opp, t, memory)
+        if t >= 2:
+            return np.where(opp[t - 2] & opp[t - 1], DEFECT, mode)
+        return COOPERATE
+
 
 class ModalTFT(Strategy):
     """
@@ -540,27 +613,22 @@ class ModalTFT(Strategy):
     of opponent's history.
     """
 
+    __slots__ = ()
+
     def __init__(self):
         super().__init__("ModalTFT", C)
 
-    @property
-    def choice(self):
-        return self._choice
-
-    @choice.setter
-    def choice(self, new_choice):
-        self._choice = new_choice
-
-    def history_data(self, opponent_choice, own_choice):
-        self.history['own'].append(own_choice)
-        self.history['opp'].append(opponent_choice)
-
     def strategy(self):
         if self.history['opp']:
             if self.history['opp'][-1] == C:
                 self.choice = C
             else:
-                self.choice = statistics.mode(self.history['opp'])
+                self.choice = self.history['opp'].mode()
+
+    @staticmethod
+    def array_kernel(own, opp, t, memory):
+        mode = ArrayRunner.running_mode(opp, t, memory)
+        return np.where(opp[t - 1] == COOPERATE, COOPERATE, mode)
 
 
 class ModalDefector(Strategy):
@@ -569,27 +637,22 @@ class ModalDefector(Strategy):
     Will defect on a cooperative response and return the mode on a Defect response.
     """
 
+    __slots__ = ()
+
     def __init__(self):
         super().__init__("ModalDefector", D)
 
-    @property
-    def choice(self):
-        return self._choice
-
-    @choice.setter
-    def choice(self, new_choice):
-        self._choice = new_choice
-
-    def history_data(self, opponent_choice, own_choice):
-        self.history['own'].append(own_choice)
-        self.history['opp'].append(opponent_choice)
-
     def strategy(self):
         if self.history['opp']:
             if self.history['opp'][-1] == C:
                 self.choice = D
             else:
-                self.choice = statistics.mode(self.history['opp'])
+                self.choice = self.history['opp'].mode()
+
+    @staticmethod
+    def array_kernel(own, opp, t, memory):
+        mode = ArrayRunner.running_mode(opp, t, memory)
+        return np.where(opp[t - 1] == COOPERATE, DEFECT, mode)
 
 
 class Downing(Strategy):
@@ -600,30 +663,61 @@ class Downing(Strategy):
     in the long run.
     """
 
+    __slots__ = ()
+    memory_depth = 10
+    first_tournament_rank = 10
+    cooperate_threshold = 0.7  # Adjust as needed
+
     def __init__(self):
         super().__init__("Downing", C)
-        self.cooperate_threshold = 0.7  # Adjust as needed
-
-    @property
-    def choice(self):
-        return self._choice
-
-    @choice.setter
-    def choice(self, new_choice):
-        self._choice = new_choice
 
-    def history_data(self, opponent_choice, own_choice):
-        self.history['own'].append(own_choice)
-        self.history['opp'].append(opponent_choice)
+    def state(self):
+        return self._choice, self.history['opp'].actions()[-9:].tobytes()
 
     def strategy(self):
         if len(self.history['opp']) >= 10:
-            cooperate_ratio = self.history['opp'][-10:].count(C) / 10
+            cooperate_ratio = self.history['opp'].window_count(10, C) / 10
             if cooperate_ratio >= self.cooperate_threshold:
                 self.choice = C
             else:
                 self.choice = D
 
+    @staticmethod
+    def array_kernel(own, opp, t, memory):
+        if t >= 10:
+            # Cooperating on at least 7 of the last 10 moves meets the 0.7 threshold.
+            return opp[t - 10:t].sum(axis=0) >= 4
+        return COOPERATE
+
+
+class Grofman(Strategy):
+    """
+    Submitted to Axelrod’s first tournament by Bernard Grofman.
+
+    The description written in [Axelrod1980] is:
+
+    “If the players did different things on the previous move, this rule cooperates with probability 2/7.
+    Otherwise, this rule always cooperates.”
+    This strategy came 4th in Axelrod’s original tournament.
+    """
+
+    __slots__ = ()
+    memory_depth = 2
+    first_tournament_rank = 4
+    deterministic = False
+
+    def __init__(self):
+        super().__init__("Grofman", C)
+
+    def strategy(self):
+        if len(self.history['opp']) > 1:
+            if self.history['opp'][-1] != self.history['opp'][-2]:
+                self.choice = self.rng.choices([C, D], weights=[0.71, 0.29])[0]
+            else:
+                self.choice = C
+        else:
+            self.choice = C
+
 
 # noinspection PyPep8Naming
 class Feld(Strategy):
@@ -642,21 +736,16 @@ class Feld(Strategy):
     This strategy came 11th in Axelrod’s original tournament.
     """
 
+    __slots__ = ('probability_of_Cooperation',)
+    first_tournament_rank = 11
+    deterministic = False
+
     def __init__(self):
         super().__init__("Feld", C)
-        self.probability_of_Cooperation = 1
 
-    @property
-    def choice(self):
-        return self._choice
-
-    @choice.setter
-    def choice(self, new_choice):
-        self._choice = new_choice
-
-    def history_data(self, opponent_choice, own_choice):
-        self.history['own'].append(own_choice)
-        self.history['opp'].append(opponent_choice)
+    def reset(self):
+        super().reset()
+        self.probability_of_Cooperation = 1
 
     def strategy(self):
         if self.history['opp']:
@@ -665,7 +754,7 @@ class Feld(Strategy):
             else:
                 weight_C = self.probability_of_Cooperation
                 weight_D = 1 - weight_C
-                self.choice = random.choices([C, D], weights=[weight_C, weight_D])[0]
+                self.choice = self.rng.choices([C, D], weights=[weight_C, weight_D])[0]
         if self.probability_of_Cooperation >= 0.5:
             self.probability_of_Cooperation -= 0.0025
 
@@ -690,25 +779,20 @@ class Tullock(Strategy):
     This strategy came 13th in Axelrod’s original tournament.
     """
 
+    __slots__ = ('probability_of_Cooperation',)
+    first_tournament_rank = 13
+    deterministic = False
+
     def __init__(self):
         super().__init__("Tullock", C)
-        self.probability_of_Cooperation = 0.5
-
-    @property
-    def choice(self):
-        return self._choice
-
-    @choice.setter
-    def choice(self, new_choice):
-        self._choice = new_choice
 
-    def history_data(self, opponent_choice, own_choice):
-        self.history['own'].append(own_choice)
-        self.history['opp'].append(opponent_choice)
+    def reset(self):
+        super().reset()
+        self.probability_of_Cooperation = 0.5
 
     def strategy(self):
         if len(self.history['opp']) % 10 == 0 and self.history['opp']:
-            count_opp_C = self.history['opp'][-10:].count(C)
+            count_opp_C = self.history['opp'].window_count(10, C)
             self.probability_of_Cooperation = count_opp_C - 1
             if self.probability_of_Cooperation > 0:
                 self.probability_of_Cooperation /= 10
@@ -716,7 +800,7 @@ class Tullock(Strategy):
                 self.probability_of_Cooperation = 0
             weight_C = self.probability_of_Cooperation
             weight_D = 1 - weight_C
-            self.choice = random.choices([C, D], weights=[weight_C, weight_D])[0]
+            self.choice = self.rng.choices([C, D], weights=[weight_C, weight_D])[0]
         else:
             self.choice = C
 
@@ -734,21 +818,17 @@ class NameWithheld(Strategy):
     to have a cooperation probability that is uniformly random in the 30 to 70% range.
     """
 
+    __slots__ = ()
+    memory_depth = 0
+    first_tournament_rank = 14
+    tournament_ready = False
+
     def __init__(self):
         super().__init__("NameWithheld", C)
 
-    @property
-    def choice(self):
+    def state(self):
         return self._choice
 
-    @choice.setter
-    def choice(self, new_choice):
-        self._choice = new_choice
-
-    def history_data(self, opponent_choice, own_choice):
-        self.history['own'].append(own_choice)
-        self.history['opp'].append(opponent_choice)
-
     def strategy(self):
         pass
 
@@ -756,46 +836,48 @@ class NameWithheld(Strategy):
 class DefectOnce(Strategy):
     """Testing purposes only. Defects once then concedes."""
 
+    __slots__ = ()
+    memory_depth = 1
+    tournament_ready = False
+
+    finite_state_machine = FiniteStateMachine([D, C], [[1, 1], [1, 1]])
+
     def __init__(self):
         super().__init__("DefectOnce", D)
 
-    @property
-    def choice(self):
+    def state(self):
         return self._choice
 
-    @choice.setter
-    def choice(self, new_choice):
-        self._choice = new_choice
-
-    def history_data(self, opponent_choice, own_choice):
-        self.history['own'].append(own_choice)
-        self.history['opp'].append(opponent_choice)
-
     def strategy(self):
         self.choice = C
 
+    @staticmethod
+    def array_kernel(own, opp, t, memory):
+        return COOPERATE
+
 
 class CooperateOnce(Strategy):
     """Testing purposes only. Cooperates once then hates."""
 
+    __slots__ = ()
+    memory_depth = 1
+    tournament_ready = False
+
+    finite_state_machine = FiniteStateMachine([C, D], [[1, 1], [1, 1]])
+
     def __init__(self):
         super().__init__("CooperateOnce", C)
 
-    @property
-    def choice(self):
+    def state(self):
         return self._choice
 
-    @choice.setter
-    def choice(self, new_choice):
-        self._choice = new_choice
-
-    def history_data(self, opponent_choice, own_choice):
-        self.history['own'].append(own_choice)
-        self.history['opp'].append(opponent_choice)
-
     def strategy(self):
         self.choice = D
 
+    @staticmethod
+    def array_kernel(own, opp, t, memory):
+        return DEFECT
+
 
 class Tester(Strategy):
     """
@@ -804,20 +886,18 @@ class Tester(Strategy):
 
     """
 
-    def __init__(self):
-        super().__init__("Tester", D)
+    __slots__ = ()
 
-    @property
-    def choice(self):
-        return self._choice
+    # The probe, then TitForTat after cooperating and after defecting, then alternating C and D. The machine follows
+    # the moves Tester means to play, so under noise it can differ from the Python class, which reads its own history.
+    finite_state_machine = FiniteStateMachine([D, C, D, C, D], [[3, 2], [1, 2], [1, 2], [4, 4], [3, 3]])
+    machine_follows_noise = False
 
-    @choice.setter
-    def choice(self, new_choice):
-        self._choice = new_choice
+    def __init__(self):
+        super().__init__("Tester", D)
 
-    def history_data(self, opponent_choice, own_choice):
-        self.history['own'].append(own_choice)
-        self.history['opp'].append(opponent_choice)
+    def state(self):
+        return self._choice, self.history['opp'].actions()[:1].tobytes()
 
     def strategy(self):
         if self.history['opp']:
@@ -826,6 +906,10 @@ class Tester(Strategy):
             else:
                 self.choice = D if self.history['own'][-1] == C else C
 
+    @staticmethod
+    def array_kernel(own, opp, t, memory):
+        return np.where(opp[0] == DEFECT, opp[t - 1], 1 - own[t - 1])
+
 
 class SteinAndRapoport(Strategy):
     """
@@ -846,29 +930,24 @@ class SteinAndRapoport(Strategy):
 
     """
 
+    __slots__ = ('opponent_randomness',)
+    uses_match_length = True
+    first_tournament_rank = 6
+
     def __init__(self):
+        self.opponent_randomness = RandomnessTest()
         super().__init__("SteinAndRapoport", C)
 
-    @property
-    def choice(self):
-        return self._choice
-
-    @choice.setter
-    def choice(self, new_choice):
-        self._choice = new_choice
-
-    def history_data(self, opponent_choice, own_choice):
-        self.history['own'].append(own_choice)
-        self.history['opp'].append(opponent_choice)
+    def reset(self):
+        super().reset()
+        self.opponent_randomness.reset()
 
     def strategy(self):
         if len(self.history['own']) > 4:
             if len(self.history['own']) < 198:
                 if len(self.history['own']) % 15 == 0:
-                    if Tools.is_alternating_pattern(self.history['opp']) \
-                            or Tools.check_randomness(self.history['opp']):
-                        self.choice = D
-                    elif Tools.check_randomness(self.history['opp']):
+                    opponent = self.opponent_randomness.sync(self.history['opp'])
+                    if opponent.alternating or opponent.looks_random():
                         self.choice = D
             else:
                 self.choice = D
@@ -888,23 +967,139 @@ class Davis(Strategy):
     This strategy came 8th in Axelrod’s original tournament.
     """
 
-    def __init__(self):
-        super().__init__("Davis", C)
+    __slots__ = ()
+    first_tournament_rank = 8
 
-    @property
-    def choice(self):
-        return self._choice
+    @staticmethod
+    def machine_step(state, opponent_action):
+        """A step of the strategy on (turns played, capped at 10; whether the opponent has defected)."""
+        turns, grudge = state
+        turns, grudge = min(turns + 1, 10), grudge or opponent_action == DEFECT
+        return (turns, grudge), DEFECT if turns >= 10 and grudge else COOPERATE
 
-    @choice.setter
-    def choice(self, new_choice):
-        self._choice = new_choice
+    finite_state_machine = CompiledMachine(machine_step, ((0, False), COOPERATE))
 
-    def history_data(self, opponent_choice, own_choice):
-        self.history['own'].append(own_choice)
-        self.history['opp'].append(opponent_choice)
+    def __init__(self):
+        super().__init__("Davis", C)
+
+    def state(self):
+        return self._choice, min(len(self.history['opp']), 10), D in self.history['opp']
 
     def strategy(self):
         if len(self.history['opp']) >= 10:
             self.choice = D if D in self.history['opp'] else C
         else:
             self.choice = C
+
+    @staticmethod
+    def array_kernel(own, opp, t, memory):
+        grudge = memory.setdefault('grudge', np.zeros(opp.shape[1], dtype=np.int8))
+        grudge |= opp[t - 1]
+        if t >= 10:
+            return grudge
+        return COOPERATE
+
+
+class StateMachineStrategy(Strategy, register=False):
+    """
+    Plays a FiniteStateMachine through the Strategy interface. Subclasses set finite_state_machine, or
+    StateMachineStrategy.of(machine, name) makes one.
+    """
+
+    __slots__ = ('machine_state',)
+
+    def __init__(self):
+        super().__init__(type(self).__name__, self.finite_state_machine.actions[0])
+
+    def reset(self):
+        super().reset()
+        self.machine_state = 0
+
+    @classmethod
+    def of(cls, machine, name):
+        """A strategy class called name that plays the machine."""
+        return type(name, (cls,), {'__slots__': (), 'finite_state_machine': machine}, register=False)
+
+    def state(self):
+        return self.machine_state
+
+    def strategy(self):
+        machine = self.finite_state_machine
+        self.machine_state = machine.next_states[self.machine_state][self.history['opp'].actions()[-1]]
+        self.choice = machine.actions[self.machine_state]
+
+
+class LookupTableStrategy(Strategy, register=False):
+    """
+    Plays a LookupTable through the Strategy interface, keeping the last k moves of each player as an integer that is
+    shifted along each turn. Subclasses set lookup_table, or LookupTableStrategy.of(table, name) makes one.
+    """
+
+    __slots__ = ('own_key', 'opponent_key', 'turns')
+
+    def __init__(self):
+        super().__init__(type(self).__name__, self.lookup_table.opening_actions[0])
+
+    def reset(self):
+        super().reset()
+        self.own_key = 0
+        self.opponent_key = 0
+        self.turns = 0
+
+    @classmethod
+    def of(cls, table, name):
+        """A strategy class called name that plays the table."""
+        return type(name, (cls,), {'__slots__': (), 'lookup_table': table, 'memory_depth': table.depth},
+                    register=False)
+
+    def state(self):
+        return self.own_key, self.opponent_key, min(self.turns, self.lookup_table.depth)
+
+    def strategy(self):
+        table = self.lookup_table
+        self.own_key = (self.own_key << 1 | self.history['own'].actions()[-1]) & table.mask
+        self.opponent_key = (self.opponent_key << 1 | self.history['opp'].actions()[-1]) & table.mask
+        self.turns += 1
+        if self.turns < table.depth:
+            self.choice = table.opening_actions[self.turns]
+        else:
+            self.choice = table.actions[self.own_key << table.depth | self.opponent_key]
+
+
+# Named sets of strategies, as the criteria of find_strategies.
+STRATEGY_SETS = {
+    'all': dict(),
+    'deterministic': dict(deterministic=True),
+    'stochastic': dict(deterministic=False),
+    'memory_one': dict(max_memory_depth=1),
+    'first_tournament': dict(first_tournament=True, key=lambda strategy_class: strategy_class.first_tournament_rank),
+    'array': dict(fast_path='array'),
+}
+
+
+def find_strategies(deterministic=None, max_memory_depth=None, uses_match_length=None, first_tournament=None,
+                    fast_path=None, include_unready=False, key=None):
+    """
+    Queries the registry. Criteria left as None are not checked.
+    :param max_memory_depth: the longest memory_depth to include
+    :param first_tournament: whether the strategies have a first_tournament_rank
+    :param fast_path: one of the names given by Strategy.fast_paths
+    :param include_unready: whether to include the strategies that set tournament_ready to False
+    :param key: sort key for the result, which is otherwise in the order the strategies were defined
+    :return: list of strategy classes
+    """
+    flags = dict(deterministic=deterministic, uses_match_length=uses_match_length)
+    found = [strategy_class for strategy_class in REGISTRY.values()
+             if (include_unready or strategy_class.tournament_ready)
+             and all(value is None or getattr(strategy_class, flag) == value for flag, value in flags.items())
+             and (first_tournament is None or (strategy_class.first_tournament_rank is not None) == first_tournament)
+             and (max_memory_depth is None or strategy_class.memory_depth <= max_memory_depth)
+             and (fast_path is None or fast_path in strategy_class.fast_paths())]
+    return found if key is None else sorted(found, key=key)
+
+
+def strategy_set(name):
+    """The strategy classes of one of the STRATEGY_SETS."""
+    if name not in STRATEGY_SETS:
+        raise ValueError(f"Unknown strategy set {name!r}, expected one of {tuple(STRATEGY_SETS)}")
+    return find_strategies(**STRATEGY_SETS[name])
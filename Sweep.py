@@ -0,0 +1,313 @@
+import argparse
+import csv
+import importlib
+import math
+import random
+import sys
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from itertools import product
+
+import numpy as np
+
+from GameTools import (DEFAULT_NOISE_RATE, ENGINES, PRISONERS_DILEMMA, REPEAT_METHODS, MatchResult, PayoffMatrix, Tools,
+                       Tournament, _init_worker, _play_shard)
+
+# The payoff matrices the command line knows by name.
+PAYOFF_PRESETS = {'prisoners_dilemma': PRISONERS_DILEMMA, 'snowdrift': PayoffMatrix.snowdrift(),
+                  'stag_hunt': PayoffMatrix.stag_hunt()}
+
+# The columns of a sweep table, one row per strategy per tournament.
+COLUMNS = ('noise', 'num_games', 'payoff', 'repetition', 'strategy', 'score', 'payoff_per_turn', 'cooperation_rate',
+           'rank')
+
+# One tournament of a sweep: its grid coordinates, as indices into the axes and as values, and its seed.
+GridPoint = namedtuple('GridPoint', ['coordinates', 'noise', 'num_games', 'payoff', 'repetition', 'seed'])
+
+
+class Sweep:
+    """
+    Plays a tournament at every point of a grid of noise settings, match lengths and payoff matrices, and collects the
+    results in one tidy table with a row per strategy per tournament.
+    Matches between deterministic strategies without noise are played once per sweep and shared by every grid point
+    and repetition that contains them, and looked up in the cache first if there is one. With workers, the remaining
+    matches of all the grid points are sharded across one process pool, so small tournaments do not leave it idle.
+    Each match is played between fresh objects, as by run_tournament.
+    :param noise: list of noise settings, as taken by Tournament. 0 is the same as False.
+    :param num_games: list of match lengths
+    :param payoff_matrices: dict of name to PayoffMatrix, or a list of PayoffMatrix named by their repr
+    :param repetitions: the number of independently seeded tournaments at each point
+    :param method: 'round_robin' or 'tournament', the matches making up the overall scores
+    :param seed: the tournament at coordinates (i, j, k) in repetition r is seeded with the child of SeedSequence(seed)
+        with spawn key (i, j, k, r). Without a seed, it is drawn from the global random module.
+    """
+
+    def __init__(self, strategy_classes, noise=(False,), num_games=(200,), payoff_matrices=(PRISONERS_DILEMMA,),
+                 repetitions=1, method='round_robin', engine='python', cache=None, workers=None, seed=None,
+                 verbose=True):
+        if method not in REPEAT_METHODS:
+            raise ValueError(f"Unknown method {method!r}, expected one of {REPEAT_METHODS}")
+        self.strategy_classes = list(strategy_classes)
+        self.noise = [False if isinstance(setting, (int, float)) and setting == 0 else setting for setting in noise]
+        self.num_games = list(num_games)
+        if not isinstance(payoff_matrices, dict):
+            payoff_matrices = {repr(payoff_matrix): payoff_matrix for payoff_matrix in payoff_matrices}
+        self.payoff_matrices = payoff_matrices
+        self.repetitions = repetitions
+        self.method = method
+        self.engine = engine
+        self.cache = cache
+        self.workers = workers
+        self.seed = random.getrandbits(128) if seed is None else seed
+        self.verbose = verbose
+        self.elapsed = 0.0
+        self.size = len(self.strategy_classes)
+        if method == 'round_robin':
+            self.pairs = [(strategy1, strategy2) for i, strategy1 in enumerate(self.strategy_classes)
+                          for strategy2 in self.strategy_classes[i:]]
+        else:
+            self.pairs = [(strategy1, strategy2) for strategy1 in self.strategy_classes
+                          for strategy2 in self.strategy_classes]
+
+    def points(self):
+        """Every tournament of the sweep, noise varying slowest and repetitions fastest."""
+        payoffs = list(self.payoff_matrices.items())
+        points = list()
+        for coordinates in product(range(len(self.noise)), range(len(self.num_games)), range(len(payoffs)),
+                                   range(self.repetitions)):
+            i, j, k, repetition = coordinates
+            points.append(GridPoint(coordinates, self.noise[i], self.num_games[j], payoffs[k], repetition,
+                                    Tools.child_seed(self.seed, *coordinates)))
+        return points
+
+    def tournament(self, point):
+        return Tournament(self.strategy_classes, point.num_games, point.noise, self.engine, point.payoff[1],
+                          verbose=False, seed=point.seed)
+
+    @staticmethod
+    def shared_key(tournament, strategy1, strategy2):
+        """The key under which a match is shared across grid points, or None if it can differ from one to another."""
+        if not tournament.fixed(strategy1, strategy2):
+            return None
+        return strategy1, strategy2, tournament.num_games_per_match, tournament.payoff_matrix
+
+    def run(self):
+        """
+        Plays every tournament of the grid.
+        :return: dict of column name to numpy array, the columns of COLUMNS
+        """
+        start_time = time.perf_counter()
+        points = self.points()
+        tournaments = [self.tournament(point) for point in points]
+        # Results of the matches shared between grid points, keyed by shared_key, and the cache key of each.
+        shared = dict()
+        cache_keys = dict()
+        # The matches each tournament still has to play, as (pair index) lists.
+        pending = list()
+        for tournament in tournaments:
+            needed = list()
+            for index, (strategy1, strategy2) in enumerate(self.pairs):
+                key = self.shared_key(tournament, strategy1, strategy2)
+                if key is None:
+                    needed.append(index)
+                elif key not in shared:
+                    shared[key] = None
+                    if self.cache is not None:
+                        cache_keys[key] = self.cache.key(strategy1, strategy2, *key[2:])
+                        shared[key] = self.cached(cache_keys[key])
+                    if shared[key] is None:
+                        needed.append(index)
+            pending.append(needed)
+
+        played = self.play(tournaments, pending)
+        # Shared matches are filled in from the tournament that played them, and stored in the cache.
+        for t, tournament in enumerate(tournaments):
+            for index in pending[t]:
+                key = self.shared_key(tournament, *self.pairs[index])
+                if key is not None:
+                    shared[key] = played[t, index]
+                    if cache_keys.get(key) is not None:
+                        player1_score, player2_score, cooperations, interactions = played[t, index]
+                        self.cache.put(cache_keys[key], self.pairs[index][0].__name__, self.pairs[index][1].__name__,
+                                       key[2], player1_score, player2_score, interactions, cooperations)
+        if self.cache is not None:
+            self.cache.commit()
+
+        rows = list()
+        for t, (point, tournament) in enumerate(zip(points, tournaments)):
+            results = list()
+            for index, (strategy1, strategy2) in enumerate(self.pairs):
+                key = self.shared_key(tournament, strategy1, strategy2)
+                player1_score, player2_score, cooperations, _ = played[t, index] if key is None else shared[key]
+                results.append((MatchResult(strategy1.__name__, player1_score, strategy2.__name__, player2_score,
+                                            point.num_games, *cooperations), None))
+            for _ in tournament.record(results):
+                pass
+            rows.extend(self.rows(point, tournament))
+            if self.verbose:
+                print(f"noise={self.label(point.noise)} num_games={point.num_games} payoff={point.payoff[0]} "
+                      f"repetition={point.repetition}: {max(tournament.scores, key=tournament.scores.get)} wins")
+        self.elapsed = time.perf_counter() - start_time
+        return {column: np.array([row[c] for row in rows]) for c, column in enumerate(COLUMNS)}
+
+    def cached(self, key):
+        """The result of a match in the cache, in the form of Tournament.play_serial, or None."""
+        if key is None:
+            return None
+        scores = self.cache.get(key)
+        cooperations = self.cache.get_cooperations(key) if scores is not None else None
+        if cooperations is None:
+            return None
+        return scores + (cooperations, None)
+
+    def play(self, tournaments, pending):
+        """
+        Plays the pending matches of every tournament, in this process or sharded across a pool of workers.
+        :return: dict mapping (tournament index, pair index) to a result in the form of Tournament.play_serial
+        """
+        played = dict()
+        total = sum(len(indices) for indices in pending)
+        if self.workers is None or self.workers <= 1 or total <= 1:
+            pairs = dict(enumerate(self.pairs))
+            for t, tournament in enumerate(tournaments):
+                for index, result in tournament.play_serial(pairs, pending[t]).items():
+                    played[t, index] = result
+            return played
+
+        with_moves = self.cache is not None and self.cache.store_interactions
+        names = {strategy_class: (strategy_class.__module__, strategy_class.__qualname__)
+                 for strategy_class in self.strategy_classes}
+        # Shards of about the same number of matches, several per worker, each from a single tournament.
+        shard_size = max(1, math.ceil(total / (4 * self.workers)))
+        jobs = list()
+        for t, tournament in enumerate(tournaments):
+            settings = dict(num_games_per_match=tournament.num_games_per_match, noise=tournament.noise,
+                            engine=self.engine, payoff_matrix=tournament.payoff_matrix, seed=tournament.seed)
+            for start in range(0, len(pending[t]), shard_size):
+                shard = [(index, names[self.pairs[index][0]], names[self.pairs[index][1]])
+                         for index in pending[t][start:start + shard_size]]
+                jobs.append((t, settings, shard))
+        with ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker) as executor:
+            results = executor.map(_play_shard, [settings for _, settings, _ in jobs], [shard for _, _, shard in jobs],
+                                   [with_moves] * len(jobs))
+            for (t, _, _), shard_results in zip(jobs, results):
+                for index, player1_score, player2_score, cooperations, interactions in shard_results:
+                    played[t, index] = (player1_score, player2_score, cooperations, interactions)
+        return played
+
+    def rows(self, point, tournament):
+        """The rows of the table for one tournament."""
+        names = tournament.strategy_names
+        scores = np.array([tournament.scores[name] for name in names])
+        # The turns each strategy is credited with: self-play counts player 1's side only.
+        credited = np.zeros(self.size, dtype=np.int64)
+        for strategy1, strategy2 in self.pairs:
+            credited[tournament.positions[strategy1.__name__]] += 1
+            if strategy1 is not strategy2:
+                credited[tournament.positions[strategy2.__name__]] += 1
+        cooperation_rates = tournament.cooperation_totals.sum(axis=1) / tournament.turn_totals.sum(axis=1)
+        ranks = np.argsort(np.argsort(-scores, kind='stable')) + 1
+        return [(self.label(point.noise), point.num_games, point.payoff[0], point.repetition, name, scores[i].item(),
+                 scores[i].item() / (credited[i] * point.num_games), cooperation_rates[i].item(), ranks[i].item())
+                for i, name in enumerate(names)]
+
+    @staticmethod
+    def label(noise):
+        """The noise column of a setting: the rate of a number, 0 for no noise, the repr of a NoiseModel."""
+        if noise is False or noise is None:
+            return 0.0
+        if noise is True:
+            return DEFAULT_NOISE_RATE
+        if isinstance(noise, (int, float)):
+            return float(noise)
+        return repr(noise)
+
+    @staticmethod
+    def save(table, path):
+        """
+        Writes a sweep table to a .npz file of one array per column, or otherwise a CSV file with a header row.
+        """
+        if str(path).endswith('.npz'):
+            np.savez(path, **table)
+            return
+        with open(path, 'w', newline='') as file:
+            writer = csv.writer(file)
+            writer.writerow(table)
+            writer.writerows(zip(*(column.tolist() for column in table.values())))
+
+    @staticmethod
+    def load(path):
+        """Reads a sweep table written by save, as a dict of column name to numpy array."""
+        if str(path).endswith('.npz'):
+            with np.load(path) as data:
+                return {column: data[column] for column in data.files}
+        with open(path, newline='') as file:
+            reader = csv.reader(file)
+            header = next(reader)
+            columns = list(zip(*reader)) or [()] * len(header)
+        table = dict()
+        for name, values in zip(header, columns):
+            for kind in (int, float, str):
+                try:
+                    table[name] = np.array([kind(value) for value in values])
+                    break
+                except ValueError:
+                    continue
+        return table
+
+
+def parse_payoff(text):
+    """A payoff matrix by preset name, or as R,S,T,P."""
+    if text in PAYOFF_PRESETS:
+        return PAYOFF_PRESETS[text]
+    values = [float(value) if '.' in value else int(value) for value in text.split(',')]
+    if len(values) != 4:
+        raise argparse.ArgumentTypeError(f"Expected a preset ({', '.join(PAYOFF_PRESETS)}) or R,S,T,P, got {text!r}")
+    return PayoffMatrix(*values, validate=False)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Play a tournament at every point of a grid of noise rates, match "
+                                                 "lengths and payoff matrices, and write the results as one table.")
+    parser.add_argument('strategies', nargs='+',
+                        help="names of the strategy classes in Strategies, or of its STRATEGY_SETS")
+    parser.add_argument('--noise', nargs='+', type=float, default=[0.0], help="noise rates (default: 0)")
+    parser.add_argument('--num-games', nargs='+', type=int, default=[200], help="match lengths (default: 200)")
+    parser.add_argument('--payoff', nargs='+', default=['prisoners_dilemma'],
+                        help=f"payoff matrices, as {', '.join(PAYOFF_PRESETS)} or R,S,T,P")
+    parser.add_argument('--repetitions', type=int, default=1)
+    parser.add_argument('--method', choices=REPEAT_METHODS, default='round_robin')
+    parser.add_argument('--engine', choices=ENGINES, default='python')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--cache', nargs='?', const='default', default=None,
+                        help="reuse deterministic results from a ResultCache, at the default path or the one given")
+    parser.add_argument('--output', default='sweep.csv', help="a .csv or .npz file (default: sweep.csv)")
+    args = parser.parse_args(argv)
+
+    strategies = importlib.import_module('Strategies')
+    strategy_classes = list()
+    for name in args.strategies:
+        if name in strategies.STRATEGY_SETS:
+            strategy_classes.extend(strategies.strategy_set(name))
+        else:
+            strategy_classes.append(getattr(strategies, name))
+    # Sets may overlap each other and the classes named, and a strategy entered twice would be scored twice.
+    strategy_classes = list(dict.fromkeys(strategy_classes))
+    payoff_matrices = {text: parse_payoff(text) for text in args.payoff}
+    cache = None
+    if args.cache is not None:
+        result_cache = importlib.import_module('ResultCache')
+        cache = result_cache.ResultCache() if args.cache == 'default' else result_cache.ResultCache(args.cache)
+    sweep = Sweep(strategy_classes, args.noise, args.num_games, payoff_matrices, args.repetitions, args.method,
+                  args.engine, cache, args.workers, args.seed)
+    table = sweep.run()
+    Sweep.save(table, args.output)
+    if cache is not None:
+        cache.close()
+    print(f"Wrote {len(table['strategy'])} rows to {args.output} in {sweep.elapsed:.2f}s")
+
+
+if __name__ == '__main__':
+    sys.exit(main())
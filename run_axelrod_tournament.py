@@ -1,25 +1,20 @@
 from Strategies import *
 
-# No random elements # Add more strategies as needed
-strategies_non_random = [TitForTat, AlwaysDefect, GenerousTitForTat, ModalTFT, AlwaysCooperate,
-                         Grudger, Graaskamp, Nydegger, DefectOnce, TitForTwoTats, WinStayLooseShift,
-                         Benjo, Shubik, Downing]
-
-# Introduced random elements
-strategies_random = [TitForTat, AlwaysDefect, GenerousTitForTat, Joss, TidemanChieruzzi, Random,
-                     AlwaysCooperate, Grudger, Graaskamp, Nydegger, DefectOnce, Downing,
-                     TitForTwoTats, WinStayLooseShift, Benjo, Shubik, ModalTFT]
-
-# All the strategies
-strategies_all = [TitForTat, AlwaysDefect, AlwaysCooperate, GenerousTitForTat, Grudger,
-                  Joss, Graaskamp, TidemanChieruzzi, Nydegger, TitForTwoTats, Random, Shubik,
-                  WinStayLooseShift, Benjo, ModalTFT, ModalDefector, Downing, Grofman, Feld, Tullock,
-                  Tester, SteinAndRapoport, Davis]  # NameWithheld tba
-
-# The original Axelrod tournament
-axelrod_orig = [TitForTat, TidemanChieruzzi, Nydegger, Grofman, Shubik, SteinAndRapoport, Grudger,
-                Davis, Graaskamp,  Downing, Feld, Joss, Tullock, Random]  # NameWithheld tba
-# NameWithheld not yet implemented
+# The named sets are built from the metadata each strategy declares, see STRATEGY_SETS and find_strategies.
+# No random elements. Unlike the old hand-kept list, this holds every deterministic strategy.
+strategies_non_random = strategy_set('deterministic')
+
+# Introduced random elements. Unlike the old hand-kept list, this holds only the strategies that draw random numbers.
+strategies_random = strategy_set('stochastic')
+
+# All the strategies. NameWithheld is not implemented yet, so it is left out.
+strategies_all = strategy_set('all')
+
+# The original Axelrod tournament, without NameWithheld, in the order of Axelrod's results
+axelrod_orig = strategy_set('first_tournament')
+
+# Or query the metadata directly, e.g. the deterministic strategies that look no further back than the last turn:
+# memory_one_deterministic = find_strategies(deterministic=True, max_memory_depth=1)
 
 # games = random.randint(200, 1000)
 games = 2000
@@ -29,13 +24,9 @@ games = 2000
 tournament = Tournament(strategies_all, num_games_per_match=games, noise=True)  # Mess with the parameters if you want.
 overall_scores = tournament.round_robin()
 
-sorted_scores = sorted(overall_scores.items(), key=lambda x: x[1], reverse=True)
-print("")
-print('*'*44)
-print(" Overall Scores, sorted by highest ranking:")
-print('*'*44)
-print(f"Number of games: {games}\n")
-for strategy, score in sorted_scores:
-    print(f"{strategy:>20}: {score}")
-print('*'*44)
+# Prints the overall scores, sorted by highest ranking.
+tournament.reporter.leaderboard(overall_scores, games)
 
+# The noisy leaderboard differs from run to run. Repeat the tournament to see by how much:
+# repeated = tournament.repeat(20, workers=4)
+# print(repeated.summary())
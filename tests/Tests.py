@@ -1,6 +1,25 @@
 from Strategies import *
+from ResultCache import ResultCache
+from InteractionLog import InteractionLog, InteractionLogWriter
+from Adaptive import AdaptiveRepetition
+from Evolution import MoranProcess, ReplicatorDynamics
+from MemoryOne import MemoryOne, MemoryOneSolver, MemoryOneTournament
+from StateMachine import FiniteStateMachine, TableRunner
+from Sweep import Sweep
+from LookupTable import LookupTable, LookupRunner
+import GameTools
+import ResultCache as result_cache
+import Sweep as sweep_module
+import contextlib
+import io
+import os
+import re
+import subprocess
+import sys
+import tempfile
 import unittest
 from itertools import cycle
+from unittest import mock
 
 C = "Cooperate"
 D = "Defect"
@@ -617,6 +636,39 @@ class ToolsTester(unittest.TestCase):
         self.assertEqual(Tools.get_payoff_type(D, C), 'T')
         self.assertEqual(Tools.get_payoff_type(D, D), 'P')
 
+    def test_action_codes(self):
+        self.assertEqual(Tools.calculate_payoff(DEFECT, COOPERATE), 5)
+        self.assertEqual(Tools.calculate_payoff(C, DEFECT), 0)
+        self.assertEqual(Tools.get_payoff_type(DEFECT, DEFECT), 'P')
+        self.assertIs(Action.DEFECT.label, D)
+        self.assertIs(Action.COOPERATE.flipped, DEFECT)
+        self.assertIs(ACTIONS[C], COOPERATE)
+
+        # The choice is stored as a code, but both forms can be used to set it.
+        tft = TitForTat()
+        self.assertIs(tft.action, COOPERATE)
+        tft.choice = DEFECT
+        self.assertIs(D, tft.choice)
+        tft.choice = C
+        self.assertIs(tft.action, COOPERATE)
+
+    def test_payoff_matrix(self):
+        self.assertEqual(PRISONERS_DILEMMA.payoffs, (3, 0, 5, 1))
+        self.assertEqual(PRISONERS_DILEMMA.payoff(DEFECT, COOPERATE), 5)
+        self.assertRaises(ValueError, PayoffMatrix, R=3, S=1, T=5, P=0)
+        self.assertRaises(ValueError, PayoffMatrix.stag_hunt, R=3, T=5)
+        snowdrift = PayoffMatrix.snowdrift()
+        self.assertEqual(Tools.calculate_payoff(C, D, snowdrift), 1)
+
+        # The same game on the other engine and an alternative payoff matrix.
+        stag_hunt = PayoffMatrix.stag_hunt()
+        strategies = [TitForTat, AlwaysDefect, Grudger, WinStayLooseShift]
+        scores = Tournament(strategies, 20, payoff_matrix=stag_hunt).run_tournament()
+        array_scores = Tournament(strategies, 20, engine='array', payoff_matrix=stag_hunt).run_tournament()
+        self.assertEqual(scores, array_scores)
+        _, score1, _, score2 = GameRunner(10, False, payoff_matrix=stag_hunt).run_game(AlwaysDefect(), TitForTat())
+        self.assertEqual((score1, score2), (3 + 9 * 1, 0 + 9 * 1))
+
     def test_random_5050_sample(self):
         test_list = Tools.random_5050_sample(100, 0.7)
         # Test that list only contains C and D
@@ -639,6 +691,95 @@ class ToolsTester(unittest.TestCase):
         self.assertEqual(overall_scores['AlwaysDefect'], 6)
         self.assertEqual(overall_scores['AlwaysCooperate'], 3)
 
+    def test_generate_choice_noise(self):
+        self.assertEqual(Tools.generate_choice_noise(C, rate=1), D)
+        self.assertEqual(Tools.generate_choice_noise(DEFECT, rate=0), DEFECT)
+        # Without a rate, a move is flipped at the default noise rate, one draw per move.
+        rng, draws = random.Random(3), random.Random(3)
+        flips = sum(Tools.generate_choice_noise(C, rng=rng) == D for _ in range(10000))
+        self.assertEqual(flips, sum(draws.random() < DEFAULT_NOISE_RATE for _ in range(10000)))
+
+    def test_history_store(self):
+        side = HistorySide()
+        self.assertIsNone(side.first_defection)
+        self.assertRaises(IndexError, side.__getitem__, -1)
+        for choice in [C, C, D, C, D, D, C]:
+            side.append(ACTIONS[choice])
+        self.assertEqual(side, [C, C, D, C, D, D, C])
+        self.assertIs(side[-1], C)
+        self.assertEqual(side[-3:], [D, D, C])
+        self.assertEqual((side.count(C), side.count(D)), (4, 3))
+        self.assertEqual(side.first_defection, 2)
+        self.assertEqual(side.window_count(3, D), 2)
+        self.assertEqual(side.window_count(100, C), 4)
+        self.assertIs(side.mode(), C)
+        side.extend(bytes([DEFECT]))
+        # A tie goes to the first move, as with statistics.mode.
+        self.assertIs(side.mode(), C)
+        self.assertEqual(side.mode(), statistics.mode(list(side)))
+        self.assertEqual(bytes(side.actions()), bytes([0, 0, 1, 0, 1, 1, 0, 1]))
+
+        # Both players share one store during a match, each seeing the other's side as 'opp'.
+        player1, player2 = TitForTat(), Grudger()
+        GameRunner(5, False).run_game(player1, player2)
+        self.assertIs(player1.history['own'], player2.history['opp'])
+        self.assertEqual(player1.history, {'own': [C] * 5, 'opp': [C] * 5})
+
+    def test_reused_object_keeps_opponent_history(self):
+        # An object playing a second opponent gets a history of its own, leaving its first opponent's as it was.
+        for engine in ENGINES:
+            game_runner = GameRunner(5, False, engine, verbose=False)
+            player1, player2 = TitForTat(), Grudger()
+            game_runner.run_game(player1, player2)
+            game_runner.run_game(player1, AlwaysDefect())
+            self.assertEqual(player2.history, {'own': [C] * 5, 'opp': [C] * 5})
+            self.assertEqual(player1.history, {'own': [C] * 6 + [D] * 4, 'opp': [C] * 5 + [D] * 5})
+            game_runner.run_game(player2, AlwaysDefect())
+            self.assertEqual(player2.history, {'own': [C] * 6 + [D] * 4, 'opp': [C] * 5 + [D] * 5})
+            self.assertEqual(len(player1.history['own']), 10)
+
+    def test_cycle_fast_forward(self):
+        strategies = [TitForTat, AlwaysDefect, Grudger, Graaskamp, TitForTwoTats, Shubik, WinStayLooseShift, Tester,
+                      Davis, GenerousTitForTat]
+        for strategy1 in strategies:
+            for strategy2 in strategies:
+                for num_games in (7, 50, 1001):
+                    full = strategy1(), strategy2()
+                    skipped = strategy1(), strategy2()
+                    scores = GameRunner(num_games, False, fast_forward=False).play_turns(*full)
+                    self.assertEqual(scores, GameRunner(num_games, False).play_turns(*skipped))
+                    for full_player, skipped_player in zip(full, skipped):
+                        self.assertEqual(full_player.history, skipped_player.history)
+                        self.assertEqual(full_player.state(), skipped_player.state())
+
+        # Counters kept outside the history are advanced over the skipped turns.
+        graaskamp = Graaskamp()
+        GameRunner(10 ** 6, False).play_turns(graaskamp, TitForTat())
+        self.assertEqual(graaskamp.round, 10 ** 6)
+        self.assertEqual(len(graaskamp.history['opp']), 10 ** 6)
+
+    def test_noise_models(self):
+        rng = np.random.default_rng(0)
+        for model in (BernoulliNoise(0.1), GeometricNoise(0.1), BurstyNoise(0.1, 5)):
+            flips = model.sample(20000, rng)
+            self.assertEqual(flips.shape, (20000, 2))
+            self.assertAlmostEqual(flips.mean(), 0.1, delta=0.02)
+        self.assertEqual(GeometricNoise((0.5, 0)).sample(100, rng)[:, 1].sum(), 0)
+        self.assertEqual(BurstyNoise(1).sample(100, rng).sum(), 200)
+        self.assertEqual(Tools.noise_model(True), BernoulliNoise(0.01))
+        self.assertEqual(Tools.noise_model(0.05), BernoulliNoise(0.05))
+        self.assertIsNone(Tools.noise_model(False))
+        self.assertRaises(ValueError, BernoulliNoise, 1.5)
+
+        # Perception noise changes what a player sees, but not what was played or the score.
+        noise = BernoulliNoise((0.5, 0), perception=True)
+        player1, score1, player2, score2 = GameRunner(40, noise, verbose=False, seed=1).run_game(AlwaysCooperate(),
+                                                                                                AlwaysCooperate())
+        self.assertEqual((score1, score2), (120, 120))
+        self.assertIn(D, player1.history['opp'])
+        self.assertNotIn(D, player2.history['own'])
+        self.assertNotIn(D, player2.history['opp'])
+
     def test_object_spawner(self):
         test_list = [AlwaysDefect, TitForTat]
         test_output = Tools.object_spawner(test_list)
@@ -660,6 +801,54 @@ class ToolsTester(unittest.TestCase):
         test_output = Tools.check_randomness(test_list)
         self.assertFalse(test_output)
 
+    def test_randomness_test(self):
+        rng = random.Random(5)
+        sequences = [[C] * 60, [C, D] * 30, [D, C] * 30 + [D]]
+        sequences += [[rng.choice([C, D]) if rng.random() < mix else C for _ in range(120)] for mix in (0.2, 0.6, 1)]
+        for data in sequences:
+            history = MatchHistory()
+            test = RandomnessTest()
+            for length in range(1, len(data) + 1):
+                history.record(ACTIONS[data[length - 1]], COOPERATE)
+                test.sync(history.sides[0])
+                prefix = data[:length]
+                self.assertEqual(test.alternating, Tools.is_alternating_pattern(prefix))
+                if length >= 2:
+                    self.assertEqual(test.looks_random(), Tools.check_randomness(prefix))
+        # A replaced side is counted from scratch.
+        test.sync(MatchHistory().sides[0])
+        self.assertEqual((test.count, test.p_value()), (0, 1.0))
+
+    def test_proportion_test(self):
+        test = ProportionTest(0.7)
+        for action in [C] * 7 + [D] * 3:
+            test.update(action)
+        self.assertEqual((test.count, test.cooperations, test.z_score()), (10, 7, 0))
+        for action in [D] * 30:
+            test.update(action)
+        self.assertTrue(test.differs())
+        self.assertEqual(Tools.compare_samples([C] * 28 + [D] * 12, [D] * 33 + [C] * 7), test.differs())
+        history = MatchHistory()
+        history.sides[0].extend([COOPERATE] * 20)
+        self.assertAlmostEqual(ProportionTest(0.7).sync(history.sides[0]).z_score(), -0.3 / (0.21 / 20) ** 0.5)
+
+    def test_chi_squared_2x2(self):
+        from scipy.stats import chi2_contingency
+        for table in ([[12, 3], [7.5, 7.5]], [[0, 20], [10, 10]], [[5, 5], [5, 5]], [[40, 2], [3, 61]]):
+            statistic, p_value, _, _ = chi2_contingency(table)
+            self.assertAlmostEqual(Tools.chi_squared_2x2(table)[0], statistic)
+            self.assertAlmostEqual(Tools.chi_squared_2x2(table)[1], p_value)
+        self.assertRaises(ValueError, Tools.chi_squared_2x2, [[0, 0], [3, 4]])
+        # Without scipy, check_randomness gives the same answers from the pure Python test.
+        sequences = [[C] * 30, [C, C, D] * 10, [C, D, D, C] * 8, [D] * 20 + [C] * 5]
+        with_scipy = [Tools.check_randomness(data) for data in sequences]
+        imported = GameTools._chi2_contingency
+        GameTools._chi2_contingency = False
+        try:
+            self.assertEqual([Tools.check_randomness(data) for data in sequences], with_scipy)
+        finally:
+            GameTools._chi2_contingency = imported
+
     def test_is_alternating_pattern(self):
         test_list = list()
         cycle_list = cycle([C, D])
@@ -673,6 +862,893 @@ class ToolsTester(unittest.TestCase):
         self.assertFalse(test_result)
 
 
+class ArrayEngineTester(unittest.TestCase):
+
+    array_strategies = [TitForTat, AlwaysDefect, AlwaysCooperate, GenerousTitForTat, Grudger, Graaskamp, Nydegger,
+                        TitForTwoTats, Shubik, WinStayLooseShift, Benjo, ModalTFT, ModalDefector, Downing,
+                        DefectOnce, CooperateOnce, Tester, Davis]
+
+    def test_supports(self):
+        self.assertTrue(ArrayRunner.supports(TitForTat, Grudger()))
+        self.assertFalse(ArrayRunner.supports(TitForTat, Joss))
+        self.assertRaises(ValueError, GameRunner, 10, False, 'fortran')
+
+    def test_run_game_matches_python_engine(self):
+        for strategy1 in self.array_strategies:
+            for strategy2 in self.array_strategies:
+                python_players = strategy1(), strategy2()
+                array_players = strategy1(), strategy2()
+                _, python_score1, _, python_score2 = GameRunner(120, False).run_game(*python_players)
+                _, array_score1, _, array_score2 = GameRunner(120, False, 'array').run_game(*array_players)
+                self.assertEqual((python_score1, python_score2), (array_score1, array_score2))
+                for python_player, array_player in zip(python_players, array_players):
+                    self.assertEqual(python_player.history, array_player.history)
+                    self.assertIs(python_player.choice, array_player.choice)
+
+    def test_tournament_matches_python_engine(self):
+        tournament = Tournament(self.array_strategies, num_games_per_match=60, noise=False)
+        array_tournament = Tournament(self.array_strategies, num_games_per_match=60, noise=False, engine='array')
+        self.assertEqual(tournament.run_tournament(), array_tournament.run_tournament())
+
+        # Joss and Random have no array kernel and fall back to the GameRunner loop.
+        mixed = Tournament([TitForTat, Joss, Random], num_games_per_match=10, engine='array').run_tournament()
+        self.assertEqual(set(mixed), {'TitForTat', 'Joss', 'Random'})
+
+
+class ParallelTournamentTester(unittest.TestCase):
+
+    strategies = [TitForTat, AlwaysDefect, GenerousTitForTat, Grudger, Graaskamp, Shubik, SteinAndRapoport, Davis]
+
+    def test_workers_match_serial(self):
+        for engine in ENGINES:
+            serial = Tournament(self.strategies, 50, engine=engine, verbose=False).run_tournament()
+            parallel = Tournament(self.strategies, 50, engine=engine, workers=2, verbose=False).run_tournament()
+            self.assertEqual(serial, parallel)
+
+            # round_robin plays the same pairs through play_pairs, with workers or without.
+            serial = Tournament(self.strategies, 50, engine=engine, verbose=False).round_robin()
+            parallel = Tournament(self.strategies, 50, engine=engine, workers=2, verbose=False).round_robin()
+            self.assertEqual(serial, parallel)
+
+    def test_seeded_runs_match(self):
+        strategies = self.strategies + [Joss, Random, TidemanChieruzzi, Feld]
+        for engine in ENGINES:
+            serial = Tournament(strategies, 50, True, engine=engine, verbose=False, seed=3).run_tournament()
+            parallel = Tournament(strategies, 50, True, engine=engine, workers=2, verbose=False, seed=3)
+            self.assertEqual(serial, parallel.run_tournament())
+            self.assertEqual(Tournament(strategies, 50, True, engine=engine, verbose=False, seed=3).round_robin(),
+                             Tournament(strategies, 50, True, engine=engine, verbose=False, seed=3).round_robin())
+        self.assertNotEqual(serial, Tournament(strategies, 50, True, verbose=False, seed=4).run_tournament())
+
+        # A seeded game replays exactly, and each player gets its own stream.
+        joss, score1, _, score2 = GameRunner(100, True, verbose=False, seed=11).run_game(Joss(), Random())
+        self.assertEqual(GameRunner(100, True, verbose=False, seed=11).run_game(Joss(), Random())[1::2],
+                         (score1, score2))
+        self.assertIs(Joss().rng, random)
+        joss.reset()
+        self.assertIs(joss.rng, random)
+
+    def test_seeded_noise_matches_across_engines(self):
+        strategies = ArrayEngineTester.array_strategies
+        for noise in (True, GeometricNoise((0.05, 0.01)), BurstyNoise(0.05, 3, perception=True)):
+            self.assertEqual(Tournament(strategies, 60, noise, verbose=False, seed=5).run_tournament(),
+                             Tournament(strategies, 60, noise, 'array', verbose=False, seed=5).run_tournament())
+
+    def test_workers_fill_cache(self):
+        with tempfile.TemporaryDirectory() as directory:
+            cache = ResultCache(os.path.join(directory, 'results.sqlite'), store_interactions=True)
+            Tournament([TitForTat, AlwaysDefect, Joss], 20, cache=cache, workers=2, verbose=False).run_tournament()
+            self.assertEqual(len(cache), 4)
+            key = cache.key(AlwaysDefect, TitForTat, 20, PRISONERS_DILEMMA)
+            self.assertEqual(cache.get_interactions(key), (bytes([DEFECT] * 20), bytes([COOPERATE] + [DEFECT] * 19)))
+            cache.close()
+
+
+class RepeatTester(unittest.TestCase):
+
+    strategies = [TitForTat, AlwaysDefect, GenerousTitForTat, Joss, Random, Grudger]
+
+    def test_repetitions_are_seeded(self):
+        tournament = Tournament(self.strategies, 50, True, verbose=False, seed=7)
+        repeated = tournament.repeat(4)
+        self.assertEqual(repeated.scores.shape, (4, 6))
+        self.assertEqual(repeated.count, 4)
+        # Repetition r plays the tournament seeded with the r-th child of the seed.
+        for repetition in (0, 3):
+            scores = Tournament(self.strategies, 50, True, verbose=False,
+                                seed=np.random.SeedSequence(7, spawn_key=(repetition,))).round_robin()
+            self.assertEqual(repeated.scores[repetition].tolist(), [scores[name] for name in repeated.names])
+        self.assertEqual(len(set(map(tuple, repeated.scores.tolist()))), 4)
+        np.testing.assert_array_equal(tournament.repeat(4, workers=2).scores, repeated.scores)
+        np.testing.assert_array_equal(tournament.repeat(2, method='tournament').scores[0],
+                                      [Tournament(self.strategies, 50, True, verbose=False,
+                                                  seed=np.random.SeedSequence(7, spawn_key=(0,))
+                                                  ).run_tournament()[name] for name in repeated.names])
+        # The tournament itself is left as it was.
+        self.assertEqual(set(tournament.scores.values()), {0})
+        self.assertRaises(ValueError, tournament.repeat, 2, method='league')
+        self.assertRaises(ValueError, tournament.repeat, 0)
+
+    def test_seed_sequence_seed(self):
+        # A tournament seeded with a SeedSequence, as Sweep seeds them, repeats with the children of that sequence.
+        seed = np.random.SeedSequence(7, spawn_key=(2,))
+        repeated = Tournament(self.strategies, 30, True, verbose=False, seed=seed).repeat(2)
+        scores = Tournament(self.strategies, 30, True, verbose=False,
+                            seed=np.random.SeedSequence(7, spawn_key=(2, 1))).round_robin()
+        self.assertEqual(repeated.scores[1].tolist(), [scores[name] for name in repeated.names])
+
+    def test_statistics(self):
+        repeated = Tournament(self.strategies, 50, True, verbose=False, seed=2).repeat(30)
+        np.testing.assert_allclose(repeated.mean, repeated.scores.mean(axis=0))
+        np.testing.assert_allclose(repeated.std, repeated.scores.std(axis=0, ddof=1))
+        intervals = repeated.confidence_intervals(seed=1)
+        self.assertTrue((intervals[:, 0] <= repeated.mean).all() and (repeated.mean <= intervals[:, 1]).all())
+        np.testing.assert_array_equal(intervals, repeated.confidence_intervals(seed=1))
+        self.assertTrue((repeated.confidence_intervals(0.5, seed=1)[:, 1] <= intervals[:, 1]).all())
+        ranks = repeated.ranks
+        self.assertEqual(sorted(ranks[0].tolist()), list(range(1, 7)))
+        np.testing.assert_allclose(repeated.rank_frequencies.sum(axis=0), 1)
+        np.testing.assert_allclose(repeated.rank_stability,
+                                   repeated.rank_frequencies[np.arange(6), repeated.mean_ranks - 1])
+        self.assertIn('GenerousTitForTat', repeated.summary())
+
+        # Without noise or random strategies every repetition is the same.
+        fixed = Tournament([TitForTat, AlwaysDefect, Grudger], 50, verbose=False).repeat(3)
+        np.testing.assert_array_equal(fixed.std, 0)
+        np.testing.assert_array_equal(fixed.confidence_intervals()[:, 0], fixed.mean)
+        np.testing.assert_array_equal(fixed.rank_stability, 1)
+
+    def test_partial_results(self):
+        repetitions = Tournament(self.strategies, 30, True, verbose=False, seed=1).iter_repeat(5, workers=2)
+        partial = next(repetitions)
+        self.assertEqual(partial.count, 1)
+        self.assertEqual(np.isnan(partial.scores).all(axis=1).sum(), 4)
+        self.assertEqual(partial.mean.shape, (6,))
+        repetitions.close()
+
+
+class AdaptiveRepetitionTester(unittest.TestCase):
+
+    strategies = [TitForTat, AlwaysDefect, GenerousTitForTat, ModalTFT, Joss, Grudger]
+
+    def test_samples_match_repeat(self):
+        tournament = Tournament(self.strategies, 50, True, verbose=False, seed=4)
+        # With every match capped at three samples, they are the matches of the first three repetitions.
+        result = AdaptiveRepetition(tournament, 'tournament', confidence=1, initial=3, max_samples=3).run()
+        np.testing.assert_allclose(result.scores, tournament.repeat(3, method='tournament').mean)
+        np.testing.assert_array_equal(result.samples, 3)
+        self.assertFalse(result.converged)
+        self.assertEqual((result.turns_played, result.turns_saved), (36 * 3 * 50, 0))
+        parallel = AdaptiveRepetition(Tournament(self.strategies, 50, True, verbose=False, seed=4, workers=2),
+                                      'tournament', confidence=1, initial=3, max_samples=3).run()
+        np.testing.assert_array_equal(parallel.scores, result.scores)
+
+        # A SeedSequence seed, as Sweep gives its tournaments, is sampled like its repetitions.
+        seeded = Tournament(self.strategies, 50, True, verbose=False, seed=np.random.SeedSequence(4, spawn_key=(1,)))
+        result = AdaptiveRepetition(seeded, 'tournament', confidence=1, initial=2, max_samples=2).run()
+        np.testing.assert_allclose(result.scores, seeded.repeat(2, method='tournament').mean)
+
+    def test_adaptive_sampling(self):
+        tournament = Tournament(self.strategies, 100, True, verbose=False, seed=2)
+        result = AdaptiveRepetition(tournament, confidence=0.9, max_samples=100).run()
+        self.assertTrue(result.converged)
+        self.assertTrue((result.confidences >= 0.9).all())
+        self.assertEqual(sorted(result.order.tolist()), list(range(6)))
+        self.assertTrue((np.diff(result.scores[result.order]) <= 0).all())
+        # Only the round robin's upper triangle is played, and not every match as often as the most sampled one.
+        self.assertEqual(np.tril(result.samples, -1).sum(), 0)
+        self.assertGreater(result.turns_saved, 0)
+        self.assertEqual(result.turns_played, result.samples.sum() * 100)
+        self.assertEqual(result.turns_saved + result.turns_played, 21 * result.samples.max() * 100)
+        self.assertIn('ModalTFT', AdaptiveRepetition.summary(result))
+
+        # Without noise, deterministic strategies play each match once.
+        fixed = AdaptiveRepetition(Tournament(self.strategies[:4], 60, verbose=False), 'tournament').run()
+        scores = Tournament(self.strategies[:4], 60, verbose=False).run_tournament()
+        self.assertEqual(fixed.scores.tolist(), [scores[name] for name in fixed.names])
+        np.testing.assert_array_equal(fixed.samples, 1)
+        self.assertTrue(fixed.converged)
+        np.testing.assert_array_equal(fixed.standard_errors, 0)
+
+        # The time budget stops the run after the first batch.
+        budget = AdaptiveRepetition(tournament, confidence=0.9999, time_budget=0).run()
+        self.assertEqual(budget.rounds, 1)
+        self.assertFalse(budget.converged)
+        self.assertRaises(ValueError, AdaptiveRepetition, tournament, initial=1)
+
+
+class SweepTester(unittest.TestCase):
+
+    strategies = [TitForTat, AlwaysDefect, GenerousTitForTat, Joss, Grudger]
+    grid = dict(noise=[0, 0.05], num_games=[10, 40], payoff_matrices={'pd': PRISONERS_DILEMMA,
+                                                                       'sd': PayoffMatrix.snowdrift()},
+                repetitions=2, seed=6, verbose=False)
+
+    def test_table(self):
+        sweep = Sweep(self.strategies, **self.grid)
+        table = sweep.run()
+        self.assertEqual(tuple(table), sweep_module.COLUMNS)
+        self.assertEqual(len(table['strategy']), 2 * 2 * 2 * 2 * 5)
+        # Every point is the tournament its seed gives, played between fresh objects.
+        for point in (sweep.points()[0], sweep.points()[-1]):
+            scores = Tournament(self.strategies, point.num_games, point.noise, payoff_matrix=point.payoff[1],
+                                verbose=False, seed=point.seed, workers=2).round_robin()
+            rows = ((table['noise'] == Sweep.label(point.noise)) & (table['num_games'] == point.num_games)
+                    & (table['payoff'] == point.payoff[0]) & (table['repetition'] == point.repetition))
+            self.assertEqual(dict(zip(table['strategy'][rows].tolist(), table['score'][rows].tolist())), scores)
+            self.assertEqual(sorted(table['rank'][rows].tolist()), [1, 2, 3, 4, 5])
+        self.assertTrue(((0 <= table['cooperation_rate']) & (table['cooperation_rate'] <= 1)).all())
+        np.testing.assert_allclose(table['payoff_per_turn'], table['score'] / (5 * table['num_games']))
+        for column, values in Sweep(self.strategies, workers=2, **self.grid).run().items():
+            np.testing.assert_array_equal(values, table[column])
+
+        with tempfile.TemporaryDirectory() as directory:
+            for name in ('sweep.csv', 'sweep.npz'):
+                path = os.path.join(directory, name)
+                Sweep.save(table, path)
+                loaded = Sweep.load(path)
+                for column, values in table.items():
+                    np.testing.assert_array_equal(loaded[column], values)
+
+    def test_cache_and_command_line(self):
+        with tempfile.TemporaryDirectory() as directory:
+            cache = ResultCache(os.path.join(directory, 'results.sqlite'))
+            first = Sweep(self.strategies, cache=cache, **self.grid).run()
+            # Grudger, TitForTat, AlwaysDefect and GenerousTitForTat make 10 deterministic pairs, at 4 points.
+            self.assertEqual((len(cache), cache.hits), (40, 0))
+            second = Sweep(self.strategies, cache=cache, **self.grid).run()
+            self.assertEqual(cache.hits, 40)
+            for column, values in first.items():
+                np.testing.assert_array_equal(second[column], values)
+            cache.close()
+
+            path = os.path.join(directory, 'sweep.csv')
+            with contextlib.redirect_stdout(io.StringIO()) as output:
+                sweep_module.main(['TitForTat', 'AlwaysDefect', '--noise', '0', '0.1', '--num-games', '20',
+                                   '--payoff', 'prisoners_dilemma', '3,0,5,1', '--seed', '1', '--output', path])
+            self.assertIn('Wrote 8 rows', output.getvalue())
+            table = Sweep.load(path)
+            self.assertEqual(sorted(set(table['payoff'].tolist())), ['3,0,5,1', 'prisoners_dilemma'])
+            self.assertEqual(table['score'][:2].tolist(), [60 + 19, 20 + 24])
+
+    def test_main_overlapping_sets(self):
+        # Each strategy is entered once, whether it is named on its own or is in more than one of the sets given.
+        names = [strategy.__name__ for strategy in dict.fromkeys(strategy_set('memory_one') +
+                                                                 strategy_set('deterministic'))]
+        tables = list()
+        with tempfile.TemporaryDirectory() as directory:
+            for arguments in (['memory_one', 'deterministic', 'TitForTat'], names):
+                path = os.path.join(directory, 'sweep.csv')
+                with contextlib.redirect_stdout(io.StringIO()):
+                    sweep_module.main(arguments + ['--num-games', '20', '--seed', '1', '--output', path])
+                tables.append(Sweep.load(path))
+        self.assertEqual(len(tables[0]['strategy']), len(names))
+        for column, values in tables[1].items():
+            np.testing.assert_array_equal(tables[0][column], values)
+
+
+class PairwiseMatrixTester(unittest.TestCase):
+
+    strategies = [TitForTat, AlwaysDefect, AlwaysCooperate, Grudger]
+
+    def test_matrices(self):
+        tournament = Tournament(self.strategies, 10, verbose=False)
+        tournament.run_tournament()
+        tft, adf, aco, grud = range(4)
+        self.assertEqual(tournament.payoffs[adf, aco], 5.0)
+        self.assertEqual(tournament.payoffs[tft, adf], 0.9)
+        self.assertEqual(tournament.payoffs[tft, tft], 3.0)
+        self.assertEqual(tournament.cooperation_rates[tft, adf], 0.1)
+        self.assertTrue((tournament.cooperation_rates[aco] == 1).all())
+        self.assertEqual((tournament.wins[adf, tft], tournament.wins[tft, adf]), (2, 0))
+        self.assertEqual(tournament.draws[tft, aco], 2)
+        # Each ordering of a pair adds one side to each cell, and a strategy playing itself adds both.
+        self.assertTrue((tournament.match_counts == 2).all())
+        # Row totals are the scores, less the second side of each strategy playing itself.
+        self.assertEqual((tournament.score_totals.sum(axis=1) - tournament.score_totals.diagonal() / 2).tolist(),
+                         [tournament.scores[name] for name in tournament.strategy_names])
+
+    def test_matrices_match_across_paths(self):
+        strategies = self.strategies + [Shubik, Davis]
+        serial = Tournament(strategies, 40, verbose=False)
+        serial.run_tournament()
+        with tempfile.TemporaryDirectory() as directory:
+            cache = ResultCache(os.path.join(directory, 'results.sqlite'))
+            for tournament in (Tournament(strategies, 40, engine='array', verbose=False),
+                               Tournament(strategies, 40, workers=2, verbose=False),
+                               Tournament(strategies, 40, cache=cache, verbose=False),
+                               Tournament(strategies, 40, cache=cache, verbose=False)):
+                tournament.run_tournament()
+                for name in ('score_totals', 'cooperation_totals', 'wins', 'draws', 'match_counts'):
+                    self.assertEqual(getattr(tournament, name).tolist(), getattr(serial, name).tolist())
+            self.assertEqual(cache.hits, 36)
+
+            round_robin = Tournament(strategies, 40, verbose=False)
+            round_robin.round_robin()
+            self.assertEqual(round_robin.match_counts.diagonal().tolist(), [2] * len(strategies))
+            self.assertEqual(round_robin.cooperation_rates[2, 2], 1.0)
+
+            path = os.path.join(directory, 'matrices.npz')
+            serial.save_matrices(path)
+            with np.load(path) as saved:
+                self.assertEqual(saved['strategies'].tolist(), serial.strategy_names)
+                self.assertEqual(saved['payoffs'].tolist(), serial.payoffs.tolist())
+            cache.close()
+
+
+class ReporterTester(unittest.TestCase):
+
+    strategies = [TitForTat, AlwaysDefect, Grudger]
+
+    def test_text_reporter(self):
+        output = io.StringIO()
+        reporter = TextReporter(output, buffer_size=4)
+        scores = Tournament(self.strategies, 10, reporter=reporter).run_tournament()
+        lines = output.getvalue().splitlines()
+        self.assertEqual(len(lines), 9)
+        self.assertEqual(lines[1], f"{'TitForTat':>20} vs {'AlwaysDefect':<20} {9:>20} : 14 ")
+
+        reporter.leaderboard(scores, 10)
+        self.assertEqual(output.getvalue().splitlines()[-2], f"{'AlwaysDefect':>20}: {scores['AlwaysDefect']}")
+
+        # The default reporter prints the same lines.
+        printed = io.StringIO()
+        with contextlib.redirect_stdout(printed):
+            Tournament(self.strategies, 10).run_tournament()
+        self.assertEqual(printed.getvalue().splitlines(), lines)
+
+    def test_json_lines_reporter(self):
+        output = io.StringIO()
+        tournament = Tournament(self.strategies, 10, reporter=JsonLinesReporter(output))
+        results = list(tournament.iter_round_robin())
+        self.assertEqual(len(results), 6)
+        self.assertEqual(results[1], MatchResult('TitForTat', 9, 'AlwaysDefect', 14, 10, 1, 0))
+        records = [json.loads(line) for line in output.getvalue().splitlines()]
+        self.assertEqual(records[1], {'type': 'match', **results[1]._asdict()})
+
+        tournament.reporter.leaderboard(tournament.scores, 10)
+        self.assertEqual(json.loads(output.getvalue().splitlines()[-1]),
+                         {'type': 'leaderboard', 'num_games': 10, 'scores': tournament.scores})
+
+    def test_silent_reporter(self):
+        printed = io.StringIO()
+        with contextlib.redirect_stdout(printed):
+            GameRunner(10, False, reporter=SilentReporter()).run_game(TitForTat(), Grudger())
+            Tournament(self.strategies, 10, verbose=False).run_tournament()
+        self.assertEqual(printed.getvalue(), '')
+
+
+class InteractionLogTester(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'interactions.gtil')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_round_trip(self):
+        strategies = [TitForTat, AlwaysDefect, Joss, Grudger]
+        with InteractionLogWriter(self.path) as writer:
+            scores = Tournament(strategies, 300, True, verbose=False, seed=2, interaction_log=writer).run_tournament()
+        parallel_path = os.path.join(self.directory.name, 'parallel.gtil')
+        with InteractionLogWriter(parallel_path) as writer:
+            Tournament(strategies, 300, True, verbose=False, seed=2, workers=2, interaction_log=writer).run_tournament()
+
+        with InteractionLog(self.path) as log, InteractionLog(parallel_path) as parallel_log:
+            self.assertEqual(len(log), 16)
+            totals = dict.fromkeys(scores, 0)
+            for match in range(len(log)):
+                player1, player2 = log.players(match)
+                player1_score, player2_score = log.scores(match)
+                # A strategy playing itself is only credited with player 1's score.
+                totals[player1] += player1_score
+                if player1 != player2:
+                    totals[player2] += player2_score
+                # The log holds the moves that were scored.
+                moves1, moves2 = log.moves(match)
+                outcomes = PRISONERS_DILEMMA.as_array()
+                self.assertEqual(outcomes[moves1, moves2].sum(), player1_score)
+                self.assertEqual(outcomes[moves2, moves1].sum(), player2_score)
+                self.assertEqual(log.outcomes(match).tolist(), parallel_log.outcomes(match).tolist())
+            self.assertEqual(totals, scores)
+
+            match = log.find('AlwaysDefect', 'TitForTat')[0]
+            self.assertEqual(log.payoff_types(match)[:2], 'TP')
+            packed = log.packed(log.find('Joss', 'Joss')[0])
+            self.assertEqual(len(packed), 75)
+            del packed
+
+        # Long runs of the same outcome are stored as run lengths.
+        with InteractionLogWriter(self.path) as writer:
+            Tournament([TitForTat, AlwaysDefect], 300, verbose=False, interaction_log=writer).run_tournament()
+        with InteractionLog(self.path) as log:
+            lengths, outcomes = log.runs(log.find('AlwaysDefect', 'TitForTat')[0])
+            self.assertEqual((lengths.tolist(), outcomes.tolist()), ([1, 299], [2, 3]))
+            self.assertIsNone(log.packed(0))
+            del lengths, outcomes
+
+    def test_round_robin(self):
+        strategies = [TitForTat, WinStayLooseShift, Davis]
+        with InteractionLogWriter(self.path) as writer:
+            tournament = Tournament(strategies, 50, True, verbose=False, seed=4, interaction_log=writer)
+            results = list(tournament.iter_round_robin())
+        with InteractionLog(self.path) as log:
+            self.assertEqual([log.players(match) for match in range(len(log))],
+                             [(result.player1, result.player2) for result in results])
+            for match, result in enumerate(results):
+                moves1, moves2 = log.moves(match)
+                self.assertEqual(PRISONERS_DILEMMA.as_array()[moves1, moves2].sum(), result.player1_score)
+                self.assertEqual(PRISONERS_DILEMMA.as_array()[moves2, moves1].sum(), result.player2_score)
+
+
+class EvolutionTester(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tournament = Tournament([TitForTat, AlwaysDefect, AlwaysCooperate, Grudger], 100, verbose=False)
+        cls.tournament.run_tournament()
+
+    def test_moran_fixation(self):
+        moran = MoranProcess.from_tournament(self.tournament, 30, seed=1)
+        for mutant, resident in (('AlwaysDefect', 'AlwaysCooperate'), ('TitForTat', 'AlwaysDefect')):
+            probability, result = moran.fixation_probability(mutant, resident, replicates=2000)
+            exact = moran.exact_fixation_probability(mutant, resident)
+            self.assertAlmostEqual(probability, exact, delta=4 * (exact * (1 - exact) / 2000) ** 0.5 + 0.005)
+            self.assertEqual(result.unfixed, 0)
+            self.assertAlmostEqual(result.fixation_probabilities.sum(), 1)
+        # Without selection, a single mutant fixes with probability 1 / population size.
+        neutral = MoranProcess(np.ones((2, 2)), 10, selection_intensity=0, seed=2)
+        self.assertAlmostEqual(neutral.fixation_probability(1, 0, replicates=4000)[0], 0.1, delta=0.02)
+        self.assertAlmostEqual(neutral.exact_fixation_probability(1, 0), 0.1)
+
+    def test_replicates(self):
+        moran = MoranProcess.from_tournament(self.tournament, 20, seed=3)
+        result = moran.run(replicates=200, max_generations=500)
+        self.assertEqual(result.final_counts.shape, (200, 4))
+        self.assertTrue((result.final_counts.sum(axis=1) == 20).all())
+        self.assertEqual(MoranProcess.from_tournament(self.tournament, 20, seed=3).run(replicates=200,
+                         max_generations=500).final_counts.tolist(), result.final_counts.tolist())
+        self.assertIn('AlwaysDefect', MoranProcess.summary(result))
+
+        wright_fisher = MoranProcess.from_tournament(self.tournament, 50, mutation_rate=0.01, process='wright-fisher',
+                                                    seed=4)
+        result = wright_fisher.run([[50, 0, 0, 0], [0, 25, 25, 0]], max_generations=50)
+        self.assertEqual((result.generations, result.final_counts.sum()), (50, 100))
+        self.assertRaises(ValueError, MoranProcess, np.ones((2, 3)), 10)
+        self.assertRaises(ValueError, moran.run, [10, 0, 0, 0])
+
+    def test_replicator_dynamics(self):
+        dynamics = ReplicatorDynamics.from_tournament(self.tournament)
+        result = dynamics.run([[0, 0.5, 0.5, 0], [0.1, 0.9, 0, 0]])
+        # AlwaysDefect exploits AlwaysCooperate to extinction, but a large enough share of TitForTat resists it.
+        self.assertAlmostEqual(result.shares[0, 1], 1, places=4)
+        self.assertEqual(result.shares[1].argmax(), 0)
+        self.assertTrue(result.converged.all())
+        self.assertEqual(result.shares[0, 0], 0)
+        self.assertIn('AlwaysDefect', ReplicatorDynamics.summary(result))
+
+        # The sucker's payoff is 0, so shift the payoffs for the discrete method.
+        discrete = ReplicatorDynamics(self.tournament.payoffs + 1, method='discrete').run([0, 0.5, 0.5, 0])
+        self.assertAlmostEqual(discrete.shares[0, 1], 1, places=4)
+        self.assertEqual(discrete.steps[0], discrete.times[0])
+
+        # Stag hunt: the stag hunters need more than 3/4 of the population to win, so their basin is a quarter of
+        # the simplex.
+        stag_hunt = ReplicatorDynamics([[4, 0], [3, 3]], seed=5)
+        basins, result = stag_hunt.basins(2000)
+        self.assertAlmostEqual(basins[0], 0.25, delta=0.03)
+        self.assertAlmostEqual(basins.sum(), 1)
+        self.assertEqual(result.shares.shape, (2000, 2))
+        self.assertRaises(ValueError, ReplicatorDynamics, [[1, 2]])
+        self.assertRaises(ValueError, ReplicatorDynamics, [[1, 0], [0, 1]], method='discrete')
+        self.assertRaises(ValueError, stag_hunt.run, [-1, 2])
+
+
+class MemoryOneTester(unittest.TestCase):
+    pairs = [(TitForTat, WinStayLooseShift), (TitForTat, TitForTat), (AlwaysDefect, WinStayLooseShift),
+             (WinStayLooseShift, AlwaysCooperate)]
+
+    def test_noiseless(self):
+        solver = MemoryOneSolver()
+        # Without noise the expected scores are the scores of the match.
+        scores = solver.expected_scores(self.pairs, False, 101)
+        runner = GameRunner(101, False, verbose=False)
+        for pair, expected in zip(self.pairs, scores):
+            self.assertEqual(runner.play_turns(pair[0](), pair[1]()), tuple(expected))
+        # Long run: WinStayLooseShift alternates C and D against AlwaysDefect.
+        self.assertEqual(solver.expected_scores(self.pairs, False).round(9).tolist(),
+                         [[3, 3], [3, 3], [3, 0.5], [3, 3]])
+
+    def test_matches_simulation(self):
+        solver = MemoryOneSolver()
+        repeats = 1000
+        for noise in (0.05, BernoulliNoise(0.05, perception=True), BernoulliNoise((0.02, 0.1))):
+            expected = solver.expected_scores(self.pairs, noise, 200)
+            seeds = [np.random.SeedSequence(7, spawn_key=(k,)) for k in range(repeats * len(self.pairs))]
+            _, scores = ArrayRunner(200, noise, PRISONERS_DILEMMA).run_matches(
+                [pair for pair in self.pairs for _ in range(repeats)], seeds=seeds)
+            simulated = scores.reshape(2, len(self.pairs), repeats).mean(axis=2).T
+            np.testing.assert_allclose(simulated, expected, rtol=0.01)
+
+        # The stochastic strategies are memory-one too.
+        runner = GameRunner(100, 0.05, verbose=False, seed=3)
+        simulated = np.mean([runner.play_turns(Joss(), TitForTat()) for _ in range(1000)], axis=0)
+        np.testing.assert_allclose(simulated, solver.expected_scores([(Joss, TitForTat)], 0.05, 100)[0], rtol=0.02)
+
+    def test_levels_and_long_run(self):
+        solver = MemoryOneSolver()
+        scores = solver.expected_scores(self.pairs, [0.01, 0.1, GeometricNoise(0.01)])
+        self.assertEqual(scores.shape, (3, 4, 2))
+        np.testing.assert_allclose(scores[0], scores[2])
+        # The long run payoff per turn is the limit of the finite horizon average.
+        np.testing.assert_allclose(solver.expected_scores(self.pairs, 0.1, 100000) / 100000, scores[1], atol=1e-4)
+        self.assertAlmostEqual(solver.expected_scores([(TitForTat, TitForTat)], 0.01)[0, 0], 2.25)
+
+        strategies = [TitForTat, AlwaysDefect, Random]
+        payoffs = solver.payoffs(strategies)
+        self.assertEqual(payoffs.shape, (3, 3))
+        self.assertAlmostEqual(payoffs[1, 0], solver.expected_scores([(AlwaysDefect, TitForTat)])[0, 0])
+        rule = MemoryOne([1, 0, 1, 0], name='TFT')
+        np.testing.assert_allclose(solver.expected_scores([(rule, AlwaysDefect)], 0.02, 50),
+                                   solver.expected_scores([(TitForTat, AlwaysDefect)], 0.02, 50))
+
+        self.assertRaises(ValueError, solver.expected_scores, [(Grofman, TitForTat)])
+        self.assertRaises(ValueError, solver.expected_scores, self.pairs, BurstyNoise(0.01))
+        self.assertRaises(ValueError, MemoryOne, [1, 0, 2, 0])
+
+    def test_population_tournament(self):
+        deterministic = [TitForTat, AlwaysDefect, AlwaysCooperate, WinStayLooseShift]
+        population = MemoryOneTournament(deterministic, 100, chunk_size=5, verbose=False)
+        self.assertEqual(population.run_tournament(), Tournament(deterministic, 100, verbose=False).run_tournament())
+
+        # Copies of Joss and TitForTat as an array, against the exact payoffs.
+        vectors = np.array([Joss.memory_one] * 60 + [TitForTat.memory_one] * 60)
+        population = MemoryOneTournament(vectors, 100, 0.05, seed=1, pairwise=True, verbose=False)
+        scores = population.run_tournament()
+        self.assertEqual((len(scores), population.payoffs.shape), (120, (120, 120)))
+        self.assertIn('MemoryOne0', scores)
+        exact = MemoryOneSolver().payoffs([Joss, TitForTat], 0.05, 100)
+        blocks = population.payoffs.reshape(2, 60, 2, 60).mean(axis=(1, 3))
+        np.testing.assert_allclose(blocks, exact, rtol=0.02)
+        self.assertEqual(MemoryOneTournament(vectors, 100, 0.05, seed=1, verbose=False).run_tournament(), scores)
+
+        output = io.StringIO()
+        population = MemoryOneTournament([TitForTat, MemoryOne([1, 0, 0, 1], name='WSLS')], 10,
+                                         reporter=TextReporter(output))
+        population.reporter.leaderboard(population.run_tournament(), 10)
+        self.assertIn("                WSLS: 90\n", output.getvalue())
+        self.assertRaises(ValueError, MemoryOneTournament, np.ones((3, 3)))
+        self.assertRaises(ValueError, MemoryOneTournament, [TitForTat, TitForTat])
+
+
+class StateMachineTester(unittest.TestCase):
+    encoded = [Grudger, TitForTwoTats, DefectOnce, CooperateOnce, Tester, Davis, Shubik]
+
+    @staticmethod
+    def scripted_moves(strategy_class, opponent_actions):
+        """The moves the Python class plays against a fixed sequence of opponent moves."""
+        player = strategy_class()
+        history = MatchHistory(len(opponent_actions))
+        player.history = history.view(0)
+        played = []
+        for opponent_action in opponent_actions:
+            played.append(player.action)
+            history.record(player.action, opponent_action)
+            player.strategy()
+        return played
+
+    def test_encodings_match_python(self):
+        rng = np.random.default_rng(0)
+        sequences = [[COOPERATE] * 200, [DEFECT] * 200, [COOPERATE, DEFECT] * 100, [DEFECT, COOPERATE] * 100]
+        sequences += [[Action(move) for move in (rng.random(200) < rate).tolist()]
+                      for rate in (0.02, 0.1, 0.5, 0.9) for _ in range(5)]
+        for strategy_class in self.encoded:
+            for opponent_actions in sequences:
+                self.assertEqual(strategy_class.finite_state_machine.play(opponent_actions),
+                                 self.scripted_moves(strategy_class, opponent_actions), strategy_class.__name__)
+
+    def test_table_runner_matches_array_engine(self):
+        opponents = [TitForTat, AlwaysDefect, WinStayLooseShift, GenerousTitForTat, Graaskamp] + self.encoded
+        pairs = [(strategy_class, opponent) for strategy_class in self.encoded for opponent in opponents]
+        machine_pairs = [(strategy_class, opponent) for strategy_class, opponent in pairs
+                         if opponent.finite_state_machine is not None]
+        columns = [pairs.index(pair) for pair in machine_pairs]
+        columns += [len(pairs) + column for column in columns]
+        for noise in (False, 0.05, BernoulliNoise(0.05, perception=True)):
+            seeds = [np.random.SeedSequence(3, spawn_key=(k,)) for k in range(len(pairs))]
+            array_moves, array_scores = ArrayRunner(200, noise, PRISONERS_DILEMMA).run_matches(pairs, seeds=seeds)
+            table_moves, table_scores = TableRunner(200, noise).run_matches(
+                machine_pairs, seeds=[seeds[pairs.index(pair)] for pair in machine_pairs])
+            for k, column in enumerate(columns):
+                pair = machine_pairs[k % len(machine_pairs)]
+                if noise == 0.05 and Tester in pair:
+                    # Tester's machine follows the moves it means to play, not the ones noise flipped.
+                    continue
+                self.assertEqual(table_moves[:, k].tolist(), array_moves[:, column].tolist(), (noise, pair))
+                self.assertEqual(table_scores[k], array_scores[column])
+
+    def test_adapter(self):
+        noise = BernoulliNoise(0.05, perception=True)
+        for strategy_class in self.encoded:
+            adapter = StateMachineStrategy.of(strategy_class.finite_state_machine, 'Machine')
+            self.assertEqual(adapter().name, 'Machine')
+            for opponent in (TitForTat, Joss, Random, Shubik):
+                expected = GameRunner(200, noise, verbose=False, seed=11).run_game(strategy_class(), opponent())
+                played = GameRunner(200, noise, verbose=False, seed=11).run_game(adapter(), opponent())
+                self.assertEqual((played[1], played[3]), (expected[1], expected[3]), strategy_class.__name__)
+        # The machine state lets the python engine skip ahead through cycles.
+        adapter = StateMachineStrategy.of(Tester.finite_state_machine, 'Machine')
+        self.assertEqual(GameRunner(1000, False, verbose=False).run_game(adapter(), AlwaysCooperate())[1],
+                         GameRunner(1000, False, verbose=False, fast_forward=False).run_game(Tester(),
+                                                                                           AlwaysCooperate())[1])
+
+    def test_horizon_and_validation(self):
+        self.assertIsNone(Davis.finite_state_machine.horizon)
+        self.assertEqual(len(Davis.finite_state_machine), 21)
+        self.assertEqual(Shubik.finite_state_machine.horizon, 200)
+        self.assertRaises(ValueError, TableRunner(201).run_matches, [(Shubik, TitForTat)])
+        longer = FiniteStateMachine.from_step(Shubik.machine_step, ((COOPERATE, 0, 0), COOPERATE), 300)
+        moves, _ = TableRunner(300).run_matches([(longer, Grudger)])
+        self.assertEqual(moves.shape, (301, 2))
+        self.assertRaises(ValueError, TableRunner(10).run_matches, [(TitForTat, Grudger)])
+        self.assertRaises(ValueError, FiniteStateMachine, [C, D], [[0, 1]])
+        self.assertRaises(ValueError, FiniteStateMachine, [C, D], [[0, 1], [1, 2]])
+
+
+class LookupTableTester(unittest.TestCase):
+
+    def test_tables_of_known_strategies(self):
+        tables = {TitForTat: LookupTable.from_function(1, lambda own, opp: opp[-1]),
+                  WinStayLooseShift: LookupTable.from_function(1, lambda own, opp: own[-1] ^ opp[-1]),
+                  TitForTwoTats: LookupTable.from_function(2, lambda own, opp: DEFECT if opp == (DEFECT, DEFECT)
+                                                           else COOPERATE),
+                  AlwaysDefect: LookupTable([D] * 4, [D])}
+        self.assertEqual(tables[TitForTat].responses.tolist(), [0, 1, 0, 1])
+        pairs = [(TitForTat, TitForTwoTats), (WinStayLooseShift, AlwaysDefect), (TitForTwoTats, WinStayLooseShift),
+                 (TitForTwoTats, TitForTat), (AlwaysDefect, AlwaysDefect)]
+        for noise in (False, 0.05, BernoulliNoise(0.05, perception=True)):
+            seeds = [np.random.SeedSequence(2, spawn_key=(k,)) for k in range(len(pairs))]
+            expected = ArrayRunner(300, noise, PRISONERS_DILEMMA).run_matches(pairs, seeds=seeds)
+            played = LookupRunner(300, noise).run_matches([(tables[a], tables[b]) for a, b in pairs], seeds=seeds)
+            self.assertEqual(played[0].tolist(), expected[0].tolist())
+            self.assertEqual(played[1].tolist(), expected[1].tolist())
+
+    def test_adapter_matches_engine(self):
+        rng = np.random.default_rng(1)
+        # Mixed depths in one batch.
+        tables = [LookupTable.random(depth, rng) for depth in (1, 3, 6)]
+        classes = [LookupTableStrategy.of(table, f"Table{i}") for i, table in enumerate(tables)]
+        for noise in (False, 0.05):
+            pairs = [(i, j) for i in range(3) for j in range(3)]
+            seeds = [np.random.SeedSequence(4).spawn(3)[0] for _ in pairs]
+            _, scores = LookupRunner(200, noise).run_matches([(tables[i], tables[j]) for i, j in pairs], seeds=seeds)
+            for k, (i, j) in enumerate(pairs):
+                result = GameRunner(200, noise, verbose=False, seed=4).run_game(classes[i](), classes[j]())
+                self.assertEqual((result[1], result[3]), (scores[k], scores[len(pairs) + k]))
+
+        payoffs = LookupRunner(50).payoffs(tables, chunk_size=4)
+        _, scores = LookupRunner(50).run_matches([(tables[2], tables[0])])
+        self.assertEqual(payoffs.shape, (3, 3))
+        self.assertEqual(payoffs[2, 0], scores[0] / 50)
+
+    def test_windows(self):
+        table = LookupTable.from_function(2, lambda own, opp: DEFECT if own == (COOPERATE, DEFECT) and opp[0] == DEFECT
+                                          else COOPERATE)
+        self.assertEqual(LookupTable.key([C, D]), 1)
+        self.assertEqual(LookupTable.window(2, 2), (DEFECT, COOPERATE))
+        self.assertEqual(table.actions[LookupTable.key([C, D]) << 2 | LookupTable.key([D, C])], DEFECT)
+        self.assertEqual(table.responses.sum(), 2)
+        self.assertRaises(ValueError, LookupTable, [C] * 8)
+        self.assertRaises(ValueError, LookupTable, [C] * 16, [C])
+        self.assertRaises(ValueError, LookupTable, np.full(4, 2))
+        self.assertRaises(ValueError, LookupRunner(10).run_matches, [(TitForTat, TitForTat)])
+
+
+class ResultCacheTester(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'results.sqlite')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_tournament_cache(self):
+        strategies = [TitForTat, AlwaysDefect, Grudger]
+        cache = ResultCache(self.path, store_interactions=True)
+        scores = Tournament(strategies, 30, cache=cache).run_tournament()
+        self.assertEqual((cache.hits, cache.misses, len(cache)), (0, 9, 9))
+        cache.close()
+
+        cache = ResultCache(self.path)
+        self.assertEqual(Tournament(strategies, 30, cache=cache, engine='array').run_tournament(), scores)
+        self.assertEqual(cache.hits, 9)
+        # Joss is stochastic, so its pairs are played every time and never stored.
+        Tournament(strategies + [Joss], 30, cache=cache).run_tournament()
+        self.assertEqual((cache.hits, len(cache)), (18, 9))
+
+        key = cache.key(AlwaysDefect, TitForTat, 30, PRISONERS_DILEMMA)
+        self.assertEqual(cache.get(key), (30 * 1 + 4, 29 * 1))
+        self.assertEqual(cache.get_interactions(key), (bytes([DEFECT] * 30), bytes([COOPERATE] + [DEFECT] * 29)))
+        self.assertNotEqual(key, cache.key(AlwaysDefect, TitForTat, 31, PRISONERS_DILEMMA))
+        self.assertNotEqual(key, cache.key(AlwaysDefect, Grudger, 30, PRISONERS_DILEMMA))
+        cache.close()
+
+    def test_engine_source_in_key(self):
+        key = ResultCache(':memory:').key(Grudger, Shubik, 30, PRISONERS_DILEMMA)
+        getsource = result_cache.inspect.getsource
+        # The auto engine plays these two with the TableRunner, so an edit to StateMachine must give a new key.
+        edited = mock.patch.object(result_cache.inspect, 'getsource',
+                                   lambda obj: getsource(obj) + ('# edited' if obj.__name__ == 'StateMachine' else ''))
+        with edited:
+            self.assertNotEqual(ResultCache(':memory:').key(Grudger, Shubik, 30, PRISONERS_DILEMMA), key)
+
+    def test_prune(self):
+        cache = ResultCache(self.path)
+        for index in range(10):
+            cache.put(f'key{index}', 'TitForTat', 'Grudger', 10, 30, 30)
+        cache.get('key0')
+        # Keep room for two entries. key0 was used most recently, then key9.
+        self.assertEqual(cache.prune(2 * cache.total_bytes() // 10), 8)
+        self.assertEqual(sorted(entry[0] for entry in cache.connection.execute("SELECT key FROM results")),
+                         ['key0', 'key9'])
+        cache.close()
+
+        # The command line interface.
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            result_cache.main(['--path', self.path, 'stats'])
+            result_cache.main(['--path', self.path, 'list'])
+            result_cache.main(['--path', self.path, 'prune', '--max-bytes', '0'])
+        self.assertIn('Entries: 2', output.getvalue())
+        self.assertIn('Evicted 2 entries', output.getvalue())
+
+
+class StrategyPoolTester(unittest.TestCase):
+
+    def setUp(self):
+        self.classes = [TitForTat, AlwaysDefect, Joss, Graaskamp, TidemanChieruzzi, Random, Shubik, WinStayLooseShift,
+                        Benjo, Downing, Feld, Tullock, Tester, SteinAndRapoport, Davis,
+                        StateMachineStrategy.of(Shubik.finite_state_machine, 'Machine'),
+                        LookupTableStrategy.of(LookupTable.from_function(1, lambda own, opp: opp[-1]), 'Table')]
+
+    @staticmethod
+    def state(player):
+        """The value of every slot but the history and the rng, with the counts inside the statistical tests."""
+        slots = [slot for cls in type(player).__mro__ for slot in getattr(cls, '__slots__', ())
+                 if slot not in ('history', 'rng')]
+        return {slot: vars(value) if hasattr(value, '__dict__') else value
+                for slot, value in ((slot, getattr(player, slot)) for slot in slots)}
+
+    def test_slots(self):
+        for strategy_class in self.classes:
+            self.assertFalse(hasattr(strategy_class(), '__dict__'), strategy_class.__name__)
+
+    def test_reset(self):
+        for strategy_class in self.classes:
+            player = strategy_class()
+            fresh = self.state(player)
+            GameRunner(200, noise=True, verbose=False, seed=3).run_game(player, Random())
+            player.reset()
+            self.assertEqual(self.state(player), fresh, strategy_class.__name__)
+            self.assertEqual(len(player.history['own'].actions()), 0)
+            self.assertIs(player.rng, random)
+
+    def test_pool(self):
+        pool = GameTools.StrategyPool()
+        player = pool.acquire(Shubik)
+        GameRunner(50, False, verbose=False).run_game(player, AlwaysDefect())
+        moves = player.history['own'].actions()
+        pool.release(player)
+        self.assertIs(pool.acquire(Shubik), player)
+        self.assertEqual(player.retaliations, 0)
+        # The moves of the last match were kept by the old history.
+        self.assertEqual(len(moves), 50)
+        self.assertIsNot(pool.acquire(Shubik), player)
+
+    def test_round_robin_reuses_objects(self):
+        settings = dict(num_games_per_match=100, noise=True, verbose=False, seed=11)
+        GameTools._strategy_pool.clear()
+        # Classes made by of() cannot be sent to the workers.
+        classes = self.classes[:-2]
+        fresh = Tournament(classes, **settings).round_robin()
+        self.assertEqual(Tournament(classes, **settings).round_robin(), fresh)
+        self.assertEqual(Tournament(classes, workers=2, **settings).round_robin(), fresh)
+
+
+class StrategyRegistryTester(unittest.TestCase):
+
+    def test_registry(self):
+        self.assertIs(REGISTRY['TitForTat'], TitForTat)
+        self.assertNotIn('StateMachineStrategy', REGISTRY)
+        StateMachineStrategy.of(Grudger.finite_state_machine, 'Unlisted')
+        self.assertNotIn('Unlisted', REGISTRY)
+
+        self.assertEqual(TitForTat.fast_paths(), ('array', 'memory_one'))
+        self.assertEqual(Grudger.fast_paths(), ('array', 'table'))
+        self.assertEqual(Joss.fast_paths(), ('memory_one',))
+        self.assertEqual(LookupTableStrategy.of(LookupTable([C, D] * 8), 'Table').memory_depth, 2)
+
+    def test_strategy_sets(self):
+        # In the order of Axelrod's results, as the hand-kept list was.
+        self.assertEqual(strategy_set('first_tournament'),
+                         [TitForTat, TidemanChieruzzi, Nydegger, Grofman, Shubik, SteinAndRapoport, Grudger, Davis,
+                          Graaskamp, Downing, Feld, Joss, Tullock, Random])
+        self.assertEqual(strategy_set('stochastic'), [Joss, Random, Grofman, Feld, Tullock])
+        self.assertEqual(strategy_set('all'),
+                         [TitForTat, AlwaysDefect, AlwaysCooperate, GenerousTitForTat, Grudger, Joss, Graaskamp,
+                          TidemanChieruzzi, Nydegger, TitForTwoTats, Random, Shubik, WinStayLooseShift, Benjo, ModalTFT,
+                          ModalDefector, Downing, Grofman, Feld, Tullock, Tester, SteinAndRapoport, Davis])
+        self.assertNotIn(DefectOnce, strategy_set('all'))
+        self.assertIn(DefectOnce, find_strategies(max_memory_depth=1, include_unready=True))
+        self.assertEqual(find_strategies(deterministic=True, max_memory_depth=1),
+                         [TitForTat, AlwaysDefect, AlwaysCooperate, WinStayLooseShift])
+        self.assertEqual(find_strategies(uses_match_length=True), [TidemanChieruzzi, SteinAndRapoport])
+        self.assertNotIn(Joss, strategy_set('array'))
+        self.assertRaises(ValueError, strategy_set, 'everything')
+
+    def test_auto_engine(self):
+        from StateMachine import TableRunner
+        tournament = Tournament([], 200, noise=False, engine='auto')
+        self.assertIs(tournament.batch_runner(Grudger, Davis), TableRunner)
+        self.assertIs(tournament.batch_runner(Grudger, TitForTat), ArrayRunner)
+        self.assertIsNone(tournament.batch_runner(Grudger, Joss))
+        # Shubik's machine is compiled for matches of up to 200 turns, and Tester's only follows it without noise.
+        self.assertIs(Tournament([], 250, engine='auto').batch_runner(Shubik, Grudger), ArrayRunner)
+        self.assertIs(Tournament([], 200, True, engine='auto').batch_runner(Tester, Grudger), ArrayRunner)
+
+        strategies = strategy_set('all') + [LookupTableStrategy.of(LookupTable.from_function(
+            2, lambda own, opp: opp[-1] if opp[0] == opp[1] else own[-1]), 'Table')]
+        for noise in (False, True, BernoulliNoise(0.05, perception=True)):
+            for num_games in (60, 250):
+                python = Tournament(strategies, num_games, noise, verbose=False, seed=5)
+                auto = Tournament(strategies, num_games, noise, 'auto', verbose=False, seed=5)
+                self.assertEqual(python.run_tournament(), auto.run_tournament())
+                self.assertEqual(python.cooperation_totals.tolist(), auto.cooperation_totals.tolist())
+
+    def test_fixed_pairs_played_once(self):
+        tournament = Tournament([TitForTat, AlwaysDefect, Grudger, Joss], 30, verbose=False)
+        played = list()
+        play_serial = tournament.play_serial
+        tournament.play_serial = lambda pairs, indices: played.extend(indices) or play_serial(pairs, indices)
+        tournament.run_tournament()
+        fixed_totals = tournament.score_totals[:3, :3].tolist()
+        # Each of the 9 fixed pairs in one order or the other, and all 7 with Joss.
+        self.assertEqual(len(played), 6 + 7)
+        # AlwaysDefect met TitForTat as player 1 and as player 2, and the second match was the first one swapped.
+        self.assertEqual((tournament.wins[1, 0], tournament.wins[0, 1]), (2, 0))
+        self.assertEqual(tournament.score_totals[1, 0], 2 * GameRunner(30, False, verbose=False).run_game(
+            AlwaysDefect(), TitForTat())[1])
+        tournament.run_tournament()
+        self.assertEqual(len(played), 6 + 14)
+        self.assertEqual(tournament.score_totals[:3, :3].tolist(),
+                         [[2 * total for total in row] for row in fixed_totals])
+        self.assertFalse(Tournament([TitForTat], 30, noise=True).fixed(TitForTat, TitForTat))
+
+        # The fixed pairs of a repetition are played once and shared, without changing the scores.
+        repeated = Tournament([TitForTat, Grudger, Joss], 30, verbose=False, seed=2)
+        scores = repeated.repeat(3).scores
+        self.assertEqual(len(repeated.fixed_results), 4)
+        self.assertEqual(Tournament([TitForTat, Grudger, Joss], 30, verbose=False, seed=2).repeat(
+            3, workers=2).scores.tolist(), scores.tolist())
+
+
+class ImportTimeTester(unittest.TestCase):
+    # The longest import Strategies may take, in seconds. numpy is most of it, scipy is left for the chi-squared test.
+    IMPORT_BUDGET = 0.5
+
+    def test_import_time(self):
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        output = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import Strategies'], cwd=root,
+                                capture_output=True, text=True, check=True).stderr
+        # Each line is "import time: self | cumulative | module", in microseconds, indented by import depth.
+        imports = re.findall(r'^import time:\s+\d+ \|\s+(\d+) \| +(\S+)$', output, re.MULTILINE)
+        modules = {module: int(cumulative) / 1e6 for cumulative, module in imports}
+        self.assertNotIn('scipy', modules)
+        self.assertLess(modules['Strategies'], self.IMPORT_BUDGET)
+
+
 # Run tests:
 if __name__ == '__main__':
     unittest.main()